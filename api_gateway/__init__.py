@@ -1,28 +1,131 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, current_app, g
 from flask_cors import CORS
 import os
+import sys
 from dotenv import load_dotenv
 import jwt
 from functools import wraps
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.ingest import CoalescingQueue, ingest_config_from_env
+from common.access_log import access_log_config_from_env, init_access_log, REQUEST_ID_HEADER
+from common.compression import compression_config_from_env, init_compression
+from common.json_provider import init_json_provider, json_config_from_env
+from common.metrics import init_metrics, metrics_enabled_from_env
+from common.serving import debug_from_env
+from upstream import init_upstreams, upstream_config_from_env
+from token_cache import VerifiedTokenCache, token_cache_config_from_env
+from rate_limit import create_rate_limiter, rate_limit_config_from_env, retry_after_header
+from circuit_breaker import breaker_config_from_env
+
 def create_app():
     load_dotenv()
     
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=list(PASSTHROUGH_HEADERS) + [REQUEST_ID_HEADER])
+    app.debug = debug_from_env()
     
     # Configure app
     app.config.update(
         SECRET_KEY=os.getenv('JWT_SECRET_KEY'),
         AUTH_SERVICE_URL=os.getenv('AUTH_SERVICE_URL', 'http://localhost:5001'),
         TASK_SERVICE_URL=os.getenv('TASK_SERVICE_URL', 'http://localhost:5002'),
-        SUGGESTION_SERVICE_URL=os.getenv('SUGGESTION_SERVICE_URL', 'http://localhost:5003')
+        SUGGESTION_SERVICE_URL=os.getenv('SUGGESTION_SERVICE_URL', 'http://localhost:5003'),
+        UPSTREAM=upstream_config_from_env(),
+        BREAKER=breaker_config_from_env(),
+        SUGGESTION_INGEST=ingest_config_from_env('SUGGESTION_INGEST'),
+        TOKEN_CACHE=token_cache_config_from_env(),
+        RATE_LIMIT=rate_limit_config_from_env(),
+        ACCESS_LOG=access_log_config_from_env(),
+        JSON=json_config_from_env(),
+        COMPRESSION=compression_config_from_env(),
+        METRICS_ENABLED=metrics_enabled_from_env()
     )
+    init_json_provider(app)
+    init_compression(app)
+    init_access_log(app, 'api_gateway')
+    init_metrics(app, 'api_gateway')
+    init_token_cache(app)
+    init_rate_limiter(app)
+    init_upstreams(app)
+    init_suggestion_ingest(app)
     
     return app
 
+def init_suggestion_ingest(app):
+    """Queue suggestion updates and send them to the suggestion service in batches."""
+    client = app.extensions['upstreams']['suggestion']
+
+    def send_batch(deltas):
+        response = client.post('/suggestions/batch', json={
+            'suggestions': [
+                {'task_text': text, 'delta': delta} for text, delta in deltas.items()
+            ]
+        })
+        response.raise_for_status()
+
+    queue = CoalescingQueue(send_batch, name='suggestion_ingest', **app.config['SUGGESTION_INGEST'])
+    app.extensions['suggestion_ingest'] = queue
+
+    def ingest_stats():
+        return queue.stats(), 200
+
+    app.add_url_rule('/ingest', 'ingest_stats', ingest_stats, methods=['GET'])
+    return queue
+
+def init_rate_limiter(app):
+    """Create the token bucket limiter and add Retry-After to requests shed by an upstream cap."""
+    limiter = create_rate_limiter(**app.config['RATE_LIMIT'])
+    app.extensions['rate_limiter'] = limiter
+
+    # Set by the upstream clients when a concurrency cap or open breaker refused a call
+    @app.after_request
+    def add_shed_retry_after(response):
+        retry_after = g.get('shed_retry_after')
+        if retry_after and response.status_code == 503 and 'Retry-After' not in response.headers:
+            response.headers['Retry-After'] = retry_after_header(retry_after)
+        return response
+
+    def rate_limit_stats():
+        return limiter.stats(), 200
+
+    app.add_url_rule('/ratelimit', 'rate_limit_stats', rate_limit_stats, methods=['GET'])
+    return limiter
+
+def init_token_cache(app):
+    """Build the verified-token cache; the JWT secret is read once, here."""
+    cache = VerifiedTokenCache(app.config['SECRET_KEY'], **app.config['TOKEN_CACHE'])
+    app.extensions['token_cache'] = cache
+
+    def token_cache_stats():
+        return cache.stats(), 200
+
+    app.add_url_rule('/tokens/cache', 'token_cache_stats', token_cache_stats, methods=['GET'])
+    return cache
+
+def upstream(name):
+    """Return the pooled client for a downstream service ('auth', 'task' or 'suggestion')."""
+    return current_app.extensions['upstreams'][name]
+
+def decode_token(auth_header, verifier):
+    """Verify a 'Bearer <token>' header value and return its claims.
+
+    Raises jwt.InvalidTokenError (or jwt.ExpiredSignatureError) on failure.
+    """
+    parts = auth_header.split()
+    if len(parts) != 2:
+        raise jwt.InvalidTokenError('Malformed Authorization header')
+    return verifier.verify(parts[1])  # parts[0] is the 'Bearer' prefix
+
 def token_required(f):
-    """Decorator to check valid JWT token."""
+    """Decorator to check valid JWT token.
+
+    The verified user_id is kept on g and forwarded to the services by the
+    upstream clients.
+    """
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
@@ -31,24 +134,91 @@ def token_required(f):
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
-            token = token.split()[1]  # Remove 'Bearer ' prefix
-            jwt.decode(
-                token, 
-                os.getenv('JWT_SECRET_KEY'), 
-                algorithms=['HS256']
-            )
+            claims = decode_token(token, current_app.extensions['token_cache'])
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'error': 'Invalid token'}), 401
-            
+
+        g.user_id = claims.get('user_id')
+        limited = rate_limit_response(f"user:{g.user_id}")
+        if limited is not None:
+            return limited
         return f(*args, **kwargs)
     
     return decorated
 
+def rate_limited(f):
+    """Decorator applying the rate limits to an unauthenticated route, per client address."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        limited = rate_limit_response(f"ip:{request.remote_addr}")
+        if limited is not None:
+            return limited
+        return f(*args, **kwargs)
+
+    return decorated
+
+def rate_limit_response(subject):
+    """A 429 with Retry-After if subject is over a limit on this route, otherwise None."""
+    wait = current_app.extensions['rate_limiter'].check(request.endpoint, subject)
+    if not wait:
+        return None
+    response = jsonify({'error': 'Too many requests'})
+    response.headers['Retry-After'] = retry_after_header(wait)
+    return response, 429
+
+# Upstream response headers that are forwarded to the client
+PASSTHROUGH_HEADERS = ('X-Next-Cursor', 'Retry-After', 'ETag', 'Cache-Control')
+
+# Kept on relayed streams so event streams are not cached or buffered by proxies
+STREAM_HEADERS = ('Cache-Control', 'X-Accel-Buffering')
+
+def conditional_headers():
+    """The client's If-None-Match, for forwarding on a read that supports ETags."""
+    etag = request.headers.get('If-None-Match')
+    return {'If-None-Match': etag} if etag else {}
+
 def handle_service_error(response):
-    """Handle common service error responses."""
-    try:
-        return jsonify(response.json()), response.status_code
-    except Exception:
+    """Relay a service response to the client.
+
+    JSON bodies are forwarded byte for byte rather than parsed and encoded
+    again; anything else (e.g. a proxy's HTML error page) becomes a 503.
+    """
+    if response.status_code == 304:
+        # The client's copy is current: relay the validators with no body
+        proxied = Response(status=304)
+    elif response.headers.get('Content-Type', '').startswith('application/json'):
+        proxied = Response(response.content, status=response.status_code,
+                           content_type=response.headers['Content-Type'])
+    else:
         return jsonify({'error': 'Service unavailable'}), 503
+    for header in PASSTHROUGH_HEADERS:
+        if header in response.headers:
+            proxied.headers[header] = response.headers[header]
+    return proxied
+
+def stream_service_response(response):
+    """Relay a streamed upstream response chunk by chunk without buffering it."""
+    if response.status_code >= 400:
+        try:
+            return handle_service_error(response)
+        finally:
+            response.close()
+
+    def generate():
+        try:
+            for chunk in response.iter_content(chunk_size=None):
+                yield chunk
+        finally:
+            response.close()
+
+    proxied = Response(
+        generate(),
+        status=response.status_code,
+        content_type=response.headers.get('Content-Type')
+    )
+    for header in STREAM_HEADERS:
+        if header in response.headers:
+            proxied.headers[header] = response.headers[header]
+    return proxied
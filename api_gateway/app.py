@@ -1,5 +1,4 @@
 from routes import app
 
 if __name__ == '__main__':
-    print("check")
     app.run(port=5000) 
\ No newline at end of file
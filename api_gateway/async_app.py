@@ -0,0 +1,637 @@
+"""asyncio entry point for the API gateway.
+
+Serves the same routes as routes.py on aiohttp, so thousands of idle client
+connections and in-flight proxy calls share one event loop instead of one
+worker thread each. Suggestion updates after task creation go through the
+same batching queue as the Flask gateway. Run with `python async_app.py` in
+place of `app.py`.
+"""
+import os
+import time
+import asyncio
+import logging
+from functools import wraps
+
+import jwt
+from aiohttp import web, ClientTimeout
+from dotenv import load_dotenv
+
+from __init__ import decode_token, PASSTHROUGH_HEADERS, STREAM_HEADERS
+from common.ingest import CoalescingQueue, ingest_config_from_env
+from common.access_log import AccessLog, access_log_config_from_env, REQUEST_ID_HEADER
+from common.compression import Compressor, compression_config_from_env, weak_etag
+from common.metrics import MetricsRegistry, metrics_enabled_from_env, CONTENT_TYPE
+from upstream import upstream_config_from_env
+from token_cache import VerifiedTokenCache, token_cache_config_from_env
+from circuit_breaker import breaker_config_from_env
+from rate_limit import (
+    create_rate_limiter, rate_limit_config_from_env, concurrency_config_from_env, retry_after_header
+)
+from async_upstream import (
+    AsyncUpstreamClient, AsyncUpstreamResponse, ASYNC_UPSTREAM_ERRORS,
+    current_user_id, current_request_id, shed_retry_after
+)
+
+logger = logging.getLogger(__name__)
+
+routes = web.RouteTableDef()
+
+# Bodies this large are compressed on a worker thread rather than the event loop
+EXECUTOR_COMPRESS_SIZE = 64 * 1024
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Authorization, Content-Type',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Expose-Headers': ', '.join(PASSTHROUGH_HEADERS + (REQUEST_ID_HEADER,))
+}
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Time every request by route pattern, as init_metrics does for the Flask apps."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        route = request.match_info.route.resource
+        request.app['request_histogram'].observe(
+            time.perf_counter() - start, 'api_gateway', request.method,
+            route.canonical if route is not None else 'unmatched', status
+        )
+
+
+@web.middleware
+async def access_log_middleware(request, handler):
+    """Tag the request with an ID and write a sampled JSON access line for it."""
+    access_log = request.app['access_log']
+    request_id = access_log.request_id(request.headers.get(REQUEST_ID_HEADER))
+    request['request_id'] = request_id
+    reset = current_request_id.set(request_id)
+    start = time.perf_counter()
+    try:
+        response = await handler(request)
+    except web.HTTPException as e:
+        response = e
+    finally:
+        current_request_id.reset(reset)
+    if not response.prepared:
+        response.headers[REQUEST_ID_HEADER] = request_id
+
+    duration_ms = (time.perf_counter() - start) * 1000
+    if access_log.should_log(response.status, duration_ms):
+        fields = {
+            'request_id': request_id,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status,
+            'duration_ms': round(duration_ms, 2),
+            'bytes': response.content_length,
+            'remote_addr': request.remote,
+            'user_id': request.get('user_id')
+        }
+        if access_log.capture_bodies:
+            fields['request_body'] = access_log.body(await request.read(), request.content_type)
+            if isinstance(response, web.Response):
+                fields['response_body'] = access_log.body(response.body, response.content_type)
+        access_log.log(fields)
+
+    if isinstance(response, web.HTTPException):
+        raise response
+    return response
+
+
+@web.middleware
+async def shed_middleware(request, handler):
+    """Add Retry-After to a 503 caused by an upstream concurrency cap."""
+    reset = shed_retry_after.set(None)
+    try:
+        response = await handler(request)
+        retry_after = shed_retry_after.get()
+    finally:
+        shed_retry_after.reset(reset)
+    if retry_after and response.status == 503 and not response.prepared:
+        response.headers.setdefault('Retry-After', retry_after_header(retry_after))
+    return response
+
+
+@web.middleware
+async def compression_middleware(request, handler):
+    """Compress buffered JSON responses as init_compression does for the Flask gateway."""
+    response = await handler(request)
+    compressor = request.app['compressor']
+    if (response.prepared or not isinstance(response, web.Response)
+            or not isinstance(response.body, bytes)
+            or not compressor.applies(response.status, response.content_type,
+                                      response.headers.get('Content-Encoding'))):
+        return response
+    vary = response.headers.get('Vary')
+    response.headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+    body = response.body
+    coding = compressor.negotiate(request.headers.get('Accept-Encoding'), len(body))
+    if coding is None:
+        return response
+    if len(body) >= EXECUTOR_COMPRESS_SIZE:
+        body = await asyncio.get_running_loop().run_in_executor(None, compressor.compress, body, coding)
+    else:
+        body = compressor.compress(body, coding)
+    response.body = body
+    response.headers['Content-Encoding'] = coding
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = weak_etag(response.headers['ETag'])
+    return response
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Mirror the permissive Flask-CORS setup of the synchronous gateway."""
+    if request.method == 'OPTIONS':
+        response = web.Response(status=200)
+    else:
+        response = await handler(request)
+    if not response.prepared:  # streamed responses set their headers before sending
+        response.headers.update(CORS_HEADERS)
+    return response
+
+
+def json_error(message, status):
+    return web.json_response({'error': message}, status=status)
+
+
+def token_required(handler):
+    """Decorator to check valid JWT token.
+
+    The verified user_id is forwarded to the services for the duration of the
+    handler; it is reset afterwards because keep-alive requests share a task.
+    """
+    @wraps(handler)
+    async def decorated(request):
+        token = request.headers.get('Authorization')
+
+        if not token:
+            return json_error('Token is missing', 401)
+
+        try:
+            claims = decode_token(token, request.app['token_cache'])
+        except jwt.ExpiredSignatureError:
+            return json_error('Token has expired', 401)
+        except jwt.InvalidTokenError:
+            return json_error('Invalid token', 401)
+
+        request['user_id'] = claims.get('user_id')
+        limited = rate_limit_response(request, handler.__name__, f"user:{request['user_id']}")
+        if limited is not None:
+            return limited
+        reset = current_user_id.set(claims.get('user_id'))
+        try:
+            return await handler(request)
+        finally:
+            current_user_id.reset(reset)
+
+    return decorated
+
+
+def rate_limited(handler):
+    """Decorator applying the rate limits to an unauthenticated route, per client address."""
+    @wraps(handler)
+    async def decorated(request):
+        limited = rate_limit_response(request, handler.__name__, f"ip:{request.remote}")
+        if limited is not None:
+            return limited
+        return await handler(request)
+
+    return decorated
+
+
+def rate_limit_response(request, route, subject):
+    """A 429 with Retry-After if subject is over a limit on route, otherwise None."""
+    wait = request.app['rate_limiter'].check(route, subject)
+    if not wait:
+        return None
+    response = json_error('Too many requests', 429)
+    response.headers['Retry-After'] = retry_after_header(wait)
+    return response
+
+
+def conditional_headers(request):
+    """The client's If-None-Match, for forwarding on a read that supports ETags."""
+    etag = request.headers.get('If-None-Match')
+    return {'If-None-Match': etag} if etag else {}
+
+
+def handle_service_error(response):
+    """Relay a service response to the client.
+
+    JSON bodies are forwarded byte for byte rather than parsed and encoded
+    again; anything else (e.g. a proxy's HTML error page) becomes a 503.
+    """
+    if response.status_code == 304:
+        # The client's copy is current: relay the validators with no body
+        proxied = web.Response(status=304)
+    elif response.headers.get('Content-Type', '').startswith('application/json'):
+        proxied = web.Response(body=response.content, status=response.status_code,
+                               headers={'Content-Type': response.headers['Content-Type']})
+    else:
+        return json_error('Service unavailable', 503)
+    for header in PASSTHROUGH_HEADERS:
+        if header in response.headers:
+            proxied.headers[header] = response.headers[header]
+    return proxied
+
+
+async def stream_service_response(request, client, path, params, timeout=None):
+    """Relay a streamed upstream response chunk by chunk without buffering it."""
+    options = {'timeout': timeout} if timeout is not None else {}
+    resp = await client.open_stream('GET', path, params=params, **options)
+    try:
+        if resp.status >= 400:
+            body = await resp.read()
+            return handle_service_error(AsyncUpstreamResponse(resp.status, resp.headers, body))
+
+        response = web.StreamResponse(status=resp.status, headers={
+            'Content-Type': resp.headers.get('Content-Type', 'application/octet-stream'),
+            **{header: resp.headers[header] for header in STREAM_HEADERS if header in resp.headers},
+            **CORS_HEADERS
+        })
+        await response.prepare(request)
+        async for chunk in resp.content.iter_any():
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+    finally:
+        resp.release()
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+def upstream(request, name):
+    return request.app['upstreams'][name]
+
+
+def queue_suggestion_updates(request, task_texts):
+    """Count new tasks towards suggestions, unless the suggestion service is known to be down."""
+    # Suggestion frequencies are best effort; an open breaker drops them instead of piling them up
+    if upstream(request, 'suggestion').breaker.is_open():
+        logger.debug("Suggestion circuit open, skipping %d suggestion updates", len(task_texts))
+        return
+    # Updated in batches off the request path
+    for task_text in task_texts:
+        request.app['suggestion_ingest'].add(task_text)
+
+
+# Auth routes
+@routes.post('/auth/register')
+@rate_limited
+async def register(request):
+    try:
+        response = await upstream(request, 'auth').post('/register', json=await read_json(request))
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS as e:
+        logger.error("Connection error to auth service: %s", e)
+        return json_error('Auth service unavailable', 503)
+
+
+@routes.post('/auth/login')
+@rate_limited
+async def login(request):
+    try:
+        response = await upstream(request, 'auth').post('/login', json=await read_json(request))
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS as e:
+        logger.error("Connection error during login: %s", e)
+        return json_error('Auth service unavailable', 503)
+
+
+@routes.post('/auth/refresh')
+@rate_limited
+async def refresh_token(request):
+    try:
+        response = await upstream(request, 'auth').post('/refresh', json=await read_json(request))
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS as e:
+        logger.error("Connection error during token refresh: %s", e)
+        return json_error('Auth service unavailable', 503)
+
+
+@routes.post('/auth/logout')
+@rate_limited
+async def logout(request):
+    try:
+        response = await upstream(request, 'auth').post('/logout', json=await read_json(request))
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS as e:
+        logger.error("Connection error during logout: %s", e)
+        return json_error('Auth service unavailable', 503)
+
+
+# Task routes
+@routes.post('/tasks')
+@token_required
+async def create_task(request):
+    data = await read_json(request) or {}
+    try:
+        response = await upstream(request, 'task').post('/tasks', json=data)
+    except ASYNC_UPSTREAM_ERRORS as e:
+        logger.error("Connection error creating task: %s", e)
+        return json_error('Task service unavailable', 503)
+
+    if response.status_code == 201:
+        queue_suggestion_updates(request, [data.get('task_text')])
+
+    return handle_service_error(response)
+
+
+# Registered before /tasks/{user_id}, which would otherwise match it
+@routes.get('/tasks/events')
+@token_required
+async def task_events(request):
+    """Relay the caller's task change events (Server-Sent Events)."""
+    client = upstream(request, 'task')
+    try:
+        # No read timeout: the stream stays open, with keepalive comments while idle
+        return await stream_service_response(
+            request, client, f"/tasks/events/{request['user_id']}", {},
+            timeout=ClientTimeout(sock_connect=client.timeout.sock_connect)
+        )
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.get('/tasks/{user_id}')
+@token_required
+async def get_tasks(request):
+    try:
+        response = await upstream(request, 'task').get(
+            f"/tasks/{request.match_info['user_id']}",
+            params=dict(request.query),
+            headers=conditional_headers(request)
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.put('/tasks/complete/{task_id}')
+@token_required
+async def complete_task(request):
+    try:
+        response = await upstream(request, 'task').put(
+            f"/tasks/complete/{request.match_info['task_id']}"
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.get('/tasks/history/{user_id}')
+@token_required
+async def get_task_history(request):
+    try:
+        path = f"/tasks/history/{request.match_info['user_id']}"
+        if request.query.get('stream'):
+            return await stream_service_response(request, upstream(request, 'task'), path, dict(request.query))
+
+        response = await upstream(request, 'task').get(
+            path, params=dict(request.query), headers=conditional_headers(request)
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.put('/tasks/{task_id}')
+@token_required
+async def update_task(request):
+    try:
+        response = await upstream(request, 'task').put(
+            f"/tasks/{request.match_info['task_id']}",
+            json=await read_json(request)
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.get('/tasks')
+@token_required
+async def get_tasks_by_status(request):
+    # limit / cursor / fields / stream pass straight through to the task service
+    params = {**request.query, 'status': request.query.get('status', 'pending')}
+    try:
+        if request.query.get('stream'):
+            return await stream_service_response(request, upstream(request, 'task'), '/tasks', params)
+
+        response = await upstream(request, 'task').get(
+            '/tasks', params=params, headers=conditional_headers(request)
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.delete('/tasks/{task_id}')
+@token_required
+async def delete_task(request):
+    try:
+        response = await upstream(request, 'task').delete(f"/tasks/{request.match_info['task_id']}")
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.post('/tasks/batch/create')
+@token_required
+async def create_tasks_batch(request):
+    try:
+        response = await upstream(request, 'task').post('/tasks/batch/create', json=await read_json(request))
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+    if response.status_code == 201:
+        # Queue a suggestion update for every task that was created
+        queue_suggestion_updates(request, [
+            result['task'].get('task_text')
+            for result in response.json().get('results', []) if result.get('status') == 201
+        ])
+
+    return handle_service_error(response)
+
+
+@routes.post('/tasks/batch/{action:complete|delete}')
+@token_required
+async def update_tasks_batch(request):
+    try:
+        response = await upstream(request, 'task').post(
+            f"/tasks/batch/{request.match_info['action']}",
+            json=await read_json(request)
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+@routes.get('/tasks/export/{user_id}')
+@token_required
+async def export_tasks(request):
+    try:
+        return await stream_service_response(
+            request, upstream(request, 'task'),
+            f"/tasks/export/{request.match_info['user_id']}", dict(request.query)
+        )
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Task service unavailable', 503)
+
+
+# Suggestion routes
+@routes.get('/suggestions')
+@token_required
+async def get_suggestions(request):
+    try:
+        response = await upstream(request, 'suggestion').get(
+            '/suggestions',
+            params={'q': request.query.get('q', '')},
+            headers=conditional_headers(request)
+        )
+        return handle_service_error(response)
+    except ASYNC_UPSTREAM_ERRORS:
+        return json_error('Suggestion service unavailable', 503)
+
+
+@routes.get('/upstreams')
+async def upstream_stats(request):
+    return web.json_response(
+        {name: client.stats() for name, client in request.app['upstreams'].items()}
+    )
+
+
+@routes.get('/breakers')
+async def breaker_stats(request):
+    return web.json_response(
+        {name: client.breaker.stats() for name, client in request.app['upstreams'].items()}
+    )
+
+
+@routes.get('/ratelimit')
+async def rate_limit_stats(request):
+    return web.json_response(request.app['rate_limiter'].stats())
+
+
+@routes.get('/compression')
+async def compression_stats(request):
+    return web.json_response(request.app['compressor'].stats())
+
+
+@routes.get('/tokens/cache')
+async def token_cache_stats(request):
+    return web.json_response(request.app['token_cache'].stats())
+
+
+@routes.get('/metrics')
+async def metrics(request):
+    if request.app['metrics'] is None:
+        raise web.HTTPNotFound()
+    return web.Response(body=request.app['metrics'].render(), headers={'Content-Type': CONTENT_TYPE})
+
+
+@routes.get('/logs/stats')
+async def access_log_stats(request):
+    return web.json_response(request.app['access_log'].stats())
+
+
+@routes.get('/ingest')
+async def ingest_stats(request):
+    return web.json_response(request.app['suggestion_ingest'].stats())
+
+
+async def start_upstreams(app):
+    for client in app['upstreams'].values():
+        await client.start()
+
+    loop = asyncio.get_running_loop()
+    suggestion_client = app['upstreams']['suggestion']
+
+    def send_batch(deltas):
+        # Runs on the queue's flusher thread; the request itself runs on the event loop
+        future = asyncio.run_coroutine_threadsafe(suggestion_client.post('/suggestions/batch', json={
+            'suggestions': [
+                {'task_text': text, 'delta': delta} for text, delta in deltas.items()
+            ]
+        }), loop)
+        response = future.result()
+        if response.status_code >= 400:
+            raise RuntimeError(f'Suggestion service returned {response.status_code}')
+
+    app['suggestion_ingest'] = CoalescingQueue(
+        send_batch, name='suggestion_ingest', **ingest_config_from_env('SUGGESTION_INGEST')
+    )
+
+
+async def close_upstreams(app):
+    # The final flush blocks on the event loop, so it must run off-loop
+    await asyncio.get_running_loop().run_in_executor(None, app['suggestion_ingest'].close)
+    for client in app['upstreams'].values():
+        await client.close()
+
+
+def create_async_app():
+    load_dotenv()
+
+    metrics = MetricsRegistry('api_gateway') if metrics_enabled_from_env() else None
+    # Outside the access log, which records the uncompressed body
+    middlewares = [compression_middleware, access_log_middleware, cors_middleware, shed_middleware]
+    if metrics is not None:
+        middlewares.insert(0, metrics_middleware)
+
+    app = web.Application(middlewares=middlewares)
+    app['access_log'] = AccessLog('api_gateway', **access_log_config_from_env())
+    app['compressor'] = Compressor(**compression_config_from_env())
+    app['metrics'] = metrics
+    if metrics is not None:
+        app['request_histogram'] = metrics.histogram(
+            'http_request_duration_seconds', 'Time to handle a request, by route.',
+            ('service', 'method', 'route', 'status')
+        )
+    # The JWT secret is read once, here
+    app['token_cache'] = VerifiedTokenCache(
+        os.getenv('JWT_SECRET_KEY'), **token_cache_config_from_env()
+    )
+    app['rate_limiter'] = create_rate_limiter(**rate_limit_config_from_env())
+    options = dict(upstream_config_from_env(), metrics=metrics, breaker_config=breaker_config_from_env())
+    app['upstreams'] = {
+        'auth': AsyncUpstreamClient(
+            'auth', os.getenv('AUTH_SERVICE_URL', 'http://localhost:5001'), **options,
+            **concurrency_config_from_env('auth')
+        ),
+        'task': AsyncUpstreamClient(
+            'task', os.getenv('TASK_SERVICE_URL', 'http://localhost:5002'), **options,
+            **concurrency_config_from_env('task')
+        ),
+        'suggestion': AsyncUpstreamClient(
+            'suggestion', os.getenv('SUGGESTION_SERVICE_URL', 'http://localhost:5003'), **options,
+            **concurrency_config_from_env('suggestion')
+        )
+    }
+    app.on_startup.append(start_upstreams)
+    app.on_cleanup.append(close_upstreams)
+    app.add_routes(routes)
+    return app
+
+
+if __name__ == '__main__':
+    # create_async_app() routes logging through the JSON writer; aiohttp's own
+    # access log would duplicate it
+    web.run_app(
+        create_async_app(), port=int(os.getenv('GATEWAY_PORT', 5000)),
+        backlog=4096, access_log=None
+    )
@@ -0,0 +1,216 @@
+import json
+import time
+import asyncio
+import contextvars
+
+import aiohttp
+
+from common.identity import USER_ID_HEADER
+from common.access_log import REQUEST_ID_HEADER
+from upstream import IDEMPOTENT_METHODS, upstream_histogram
+from rate_limit import ConcurrencyLimit
+from circuit_breaker import CircuitBreaker
+
+# Errors that mean the upstream could not be reached or answered in time
+ASYNC_UPSTREAM_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+RETRY_STATUSES = (502, 503, 504)
+
+# user_id verified by token_required for the request being handled on this task
+current_user_id = contextvars.ContextVar('current_user_id', default=None)
+
+# X-Request-ID of the request being handled on this task
+current_request_id = contextvars.ContextVar('current_request_id', default=None)
+
+# Retry-After of an upstream cap that shed part of the request being handled on this task
+shed_retry_after = contextvars.ContextVar('shed_retry_after', default=None)
+
+
+class AsyncUpstreamSaturated(aiohttp.ClientConnectionError):
+    """Raised without contacting the upstream when its concurrency cap is reached."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} upstream is at its concurrency limit')
+        self.retry_after = retry_after
+
+
+class AsyncCircuitOpen(aiohttp.ClientConnectionError):
+    """Raised without contacting the upstream while its circuit breaker is open."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} upstream circuit is open')
+        self.retry_after = retry_after
+
+
+def forwarded_headers(headers=None):
+    """Merge the request ID and trusted identity headers into a request's headers."""
+    forwarded = {}
+    if current_request_id.get():
+        forwarded[REQUEST_ID_HEADER] = current_request_id.get()
+    if current_user_id.get():
+        forwarded[USER_ID_HEADER] = current_user_id.get()
+    return {**forwarded, **(headers or {})}
+
+
+class AsyncUpstreamResponse:
+    """Fully-read upstream response, so handlers never hold a pooled connection."""
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = body
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncUpstreamClient:
+    """asyncio counterpart of upstream.UpstreamClient built on aiohttp."""
+
+    def __init__(self, name, base_url, pool_size=20, connect_timeout=2,
+                 read_timeout=10, retries=2, backoff_factor=0.1, metrics=None,
+                 max_concurrency=0, retry_after=1, breaker_config=None):
+        self.name = name
+        self.concurrency = ConcurrencyLimit(max_concurrency, retry_after)
+        self.breaker = CircuitBreaker(name, **(breaker_config or {'enabled': False}))
+        self._histogram = upstream_histogram(metrics) if metrics is not None else None
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=connect_timeout,
+            sock_read=read_timeout
+        )
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = None
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'server_errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0
+        }
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    def _admit(self):
+        """Refuse the call up front if the upstream is at its cap or its breaker is open."""
+        if not self.concurrency.acquire():
+            self._shed(AsyncUpstreamSaturated(self.name, self.concurrency.retry_after))
+        if not self.breaker.allow():
+            self.concurrency.release()
+            self._shed(AsyncCircuitOpen(self.name, self.breaker.retry_after()))
+
+    @staticmethod
+    def _shed(error):
+        shed_retry_after.set(error.retry_after)
+        raise error
+
+    async def request(self, method, path, **kwargs):
+        """Send a request, retrying idempotent methods with exponential backoff."""
+        self._admit()
+        start = time.perf_counter()
+        try:
+            response = await self._request(method, path, **kwargs)
+        except ASYNC_UPSTREAM_ERRORS:
+            self.breaker.record(True, time.perf_counter() - start)
+            raise
+        finally:
+            self.concurrency.release()
+        self.breaker.record(response.status_code >= 500, time.perf_counter() - start)
+        return response
+
+    async def _request(self, method, path, **kwargs):
+        retryable = method in IDEMPOTENT_METHODS
+        kwargs['headers'] = forwarded_headers(kwargs.get('headers'))
+        attempt = 0
+        start = time.perf_counter()
+
+        while True:
+            try:
+                async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as resp:
+                    body = await resp.read()
+                    response = AsyncUpstreamResponse(resp.status, resp.headers, body)
+            except ASYNC_UPSTREAM_ERRORS as e:
+                # A refused connection never reached the service, so any method may retry it
+                safe = retryable or isinstance(e, aiohttp.ClientConnectorError)
+                if safe and attempt < self.retries:
+                    attempt += 1
+                    await asyncio.sleep(self.backoff_factor * (2 ** (attempt - 1)))
+                    continue
+                self._record(time.perf_counter() - start, method, 'error', error=True)
+                raise
+
+            if retryable and response.status_code in RETRY_STATUSES and attempt < self.retries:
+                attempt += 1
+                await asyncio.sleep(self.backoff_factor * (2 ** (attempt - 1)))
+                continue
+
+            self._record(time.perf_counter() - start, method, response.status_code,
+                         server_error=response.status_code >= 500)
+            return response
+
+    async def open_stream(self, method, path, **kwargs):
+        """Start a request and return the live aiohttp response for streaming.
+
+        The caller must release() it. Streams are not retried.
+        """
+        self._admit()
+        kwargs['headers'] = forwarded_headers(kwargs.get('headers'))
+        start = time.perf_counter()
+        try:
+            # Only the wait for the response headers counts against the cap
+            resp = await self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except ASYNC_UPSTREAM_ERRORS:
+            elapsed = time.perf_counter() - start
+            self.breaker.record(True, elapsed)
+            self._record(elapsed, method, 'error', error=True)
+            raise
+        finally:
+            self.concurrency.release()
+        elapsed = time.perf_counter() - start
+        self.breaker.record(resp.status >= 500, elapsed)
+        self._record(elapsed, method, resp.status, server_error=resp.status >= 500)
+        return resp
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request('PUT', path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request('DELETE', path, **kwargs)
+
+    def _record(self, elapsed, method, status, error=False, server_error=False):
+        if self._histogram is not None:
+            self._histogram.observe(elapsed, self.name, method, status)
+        # Single event-loop thread: no lock needed
+        self._stats['requests'] += 1
+        self._stats['latency_total'] += elapsed
+        self._stats['latency_max'] = max(self._stats['latency_max'], elapsed)
+        if error:
+            self._stats['errors'] += 1
+        if server_error:
+            self._stats['server_errors'] += 1
+
+    def stats(self):
+        """Return a snapshot of the latency and error counters."""
+        stats = dict(self._stats)
+        stats['latency_avg'] = (
+            stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+        )
+        stats['name'] = self.name
+        stats['base_url'] = self.base_url
+        stats['concurrency'] = self.concurrency.stats()
+        return stats
@@ -0,0 +1,144 @@
+"""Per-upstream circuit breakers for the gateway.
+
+A breaker watches the outcome of the last BREAKER_WINDOW calls to its
+upstream. A call fails when it errors, times out or returns a 5xx, and is
+slow when it takes longer than BREAKER_SLOW_CALL_MS. The breaker opens when
+too many of those recent calls failed or were slow. While it is open, calls
+fail at once, with no connection attempt and no thread left waiting on a
+stalled service. After BREAKER_OPEN_SECONDS it goes half-open and lets
+BREAKER_HALF_OPEN_CALLS trial calls through. If they all succeed the
+breaker closes; if any fails it opens again.
+"""
+import os
+import time
+import threading
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def breaker_config_from_env():
+    """Read circuit breaker settings from the environment."""
+    return {
+        'enabled': os.getenv('BREAKER_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+        'window': int(os.getenv('BREAKER_WINDOW', 20)),
+        'min_calls': int(os.getenv('BREAKER_MIN_CALLS', 10)),
+        'error_rate': float(os.getenv('BREAKER_ERROR_RATE', 0.5)),
+        'slow_call_ms': float(os.getenv('BREAKER_SLOW_CALL_MS', 2000)),
+        'slow_rate': float(os.getenv('BREAKER_SLOW_RATE', 0.8)),
+        'open_seconds': float(os.getenv('BREAKER_OPEN_SECONDS', 10)),
+        'half_open_calls': int(os.getenv('BREAKER_HALF_OPEN_CALLS', 3))
+    }
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state for one upstream; safe to share between threads."""
+
+    def __init__(self, name, enabled=True, window=20, min_calls=10, error_rate=0.5,
+                 slow_call_ms=2000, slow_rate=0.8, open_seconds=10, half_open_calls=3,
+                 clock=time.monotonic):
+        self.name = name
+        self.enabled = enabled
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call_ms / 1000
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)  # (failed, slow) per recent call
+        self._opened_at = self._half_open_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self):
+        """True if a call may go ahead now; the caller must then record() its outcome."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._start_trials(now)
+            elif self.state == HALF_OPEN and now - self._half_open_at >= self.open_seconds:
+                # Trials that never reported back, e.g. cancelled requests, must not wedge it
+                self._start_trials(now)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def _start_trials(self, now):
+        self._half_open_at = now
+        self._trials = self._trial_successes = 0
+
+    def is_open(self):
+        """True while calls would be rejected, for callers that can skip optional work."""
+        with self._lock:
+            return self.enabled and self.state == OPEN and (
+                self._clock() - self._opened_at < self.open_seconds
+            )
+
+    def retry_after(self):
+        """Seconds until the breaker next lets a trial call through."""
+        with self._lock:
+            if self.state != OPEN:
+                return 1
+            return max(1, self.open_seconds - (self._clock() - self._opened_at))
+
+    def record(self, failed, elapsed):
+        """Record the outcome of an allowed call."""
+        if not self.enabled:
+            return
+        slow = elapsed >= self.slow_call
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['failures'] += failed
+            self._stats['slow_calls'] += slow
+
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self.state = CLOSED
+                        self._calls.clear()
+                return
+            if self.state == OPEN:
+                # A call that started before the breaker opened
+                return
+
+            self._calls.append((failed, slow))
+            if len(self._calls) >= self.min_calls:
+                failures = sum(1 for call_failed, _ in self._calls if call_failed)
+                slow_calls = sum(1 for _, call_slow in self._calls if call_slow)
+                if (failures / len(self._calls) >= self.error_rate
+                        or slow_calls / len(self._calls) >= self.slow_rate):
+                    self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self._stats['opened'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self.state if self.enabled else 'disabled'
+            stats['recent_calls'] = len(self._calls)
+            stats['recent_failures'] = sum(1 for failed, _ in self._calls if failed)
+            if self.state == OPEN:
+                stats['open_for'] = round(self._clock() - self._opened_at, 3)
+        stats['name'] = self.name
+        return stats
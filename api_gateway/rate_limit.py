@@ -0,0 +1,281 @@
+"""Per-user and per-route token buckets and per-upstream concurrency caps.
+
+Every subject (the JWT user_id, or the client address on the unauthenticated
+auth routes) has one bucket for all of its traffic. It also has one bucket
+for each route with its own limit, e.g. typeahead on /suggestions or login.
+A bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+A request takes one token from each bucket that applies. If a bucket is
+empty, the request is rejected with 429 and a Retry-After of the seconds
+until the next token.
+
+The memory store keeps buckets per gateway process. With several gateway
+processes, RATE_LIMIT_BACKEND=redis shares them through a local Redis
+server. If Redis cannot be reached, requests are let through and counted,
+so the limiter never takes the gateway down with it.
+
+Concurrency caps are separate: each upstream client admits at most
+max_concurrency requests at once. Beyond that it sheds the request
+immediately with 503 and Retry-After, rather than queueing it.
+"""
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# name=rate:burst per route (tokens per second, bucket size); names are the route functions
+DEFAULT_ROUTE_LIMITS = (
+    'get_suggestions=5:10,login=0.2:5,register=0.05:3,refresh_token=0.5:5,'
+    'create_tasks_batch=1:5,update_tasks_batch=1:5,export_tasks=0.2:2,task_events=0.2:3'
+)
+
+
+def parse_route_limits(spec):
+    """Parse 'get_suggestions=5:10,login=0.2:5' into {name: (rate, burst)}; a rate of 0 drops the limit."""
+    limits = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, limit = item.partition('=')
+        rate, _, burst = limit.partition(':')
+        if float(rate) > 0:
+            limits[name.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+def rate_limit_config_from_env():
+    """Read rate limiter settings from the environment."""
+    return {
+        'enabled': os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+        'backend': os.getenv('RATE_LIMIT_BACKEND', 'memory'),
+        'user_rate': float(os.getenv('RATE_LIMIT_USER_RATE', 20)),
+        'user_burst': float(os.getenv('RATE_LIMIT_USER_BURST', 40)),
+        'routes': parse_route_limits(os.getenv('RATE_LIMIT_ROUTES', DEFAULT_ROUTE_LIMITS)),
+        'max_keys': int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000)),
+        'redis_url': os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    }
+
+
+def concurrency_config_from_env(name):
+    """Concurrency cap for one upstream: UPSTREAM_MAX_CONCURRENCY_<NAME>, else UPSTREAM_MAX_CONCURRENCY."""
+    default = os.getenv('UPSTREAM_MAX_CONCURRENCY', 64)
+    return {
+        'max_concurrency': int(os.getenv(f'UPSTREAM_MAX_CONCURRENCY_{name.upper()}', default)),
+        'retry_after': float(os.getenv('UPSTREAM_SHED_RETRY_AFTER', 1))
+    }
+
+
+def retry_after_header(seconds):
+    """Retry-After takes whole seconds; round up so a client retrying on time succeeds."""
+    return str(max(1, math.ceil(seconds)))
+
+
+class MemoryBucketStore:
+    """Token buckets in this process, least recently used evicted beyond max_keys."""
+
+    backend = 'memory'
+
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def take(self, key, rate, burst):
+        """Take a token; returns 0 if one was available, else seconds until one is."""
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # An evicted bucket comes back full, which only ever errs towards allowing
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key, rate, burst):
+        """Give back a token taken for a request that another limit then rejected."""
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is not None:
+                tokens, updated = state
+                self._buckets[key] = (min(burst, tokens + 1), updated)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RedisBucketStore:
+    """Token buckets shared by every gateway process through a local Redis server."""
+
+    backend = 'redis'
+
+    # Refill and take in one round trip; Redis' clock is used so processes agree
+    TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+    REFUND_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(burst, tokens + 1)))
+end
+return 0
+"""
+
+    def __init__(self, redis_url='redis://localhost:6379/0', prefix='ratelimit:'):
+        import redis  # optional dependency, only needed for this backend
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(redis_url, socket_timeout=0.05)
+        self._take = self._client.register_script(self.TAKE_SCRIPT)
+        self._refund = self._client.register_script(self.REFUND_SCRIPT)
+        self.errors = 0
+
+    def take(self, key, rate, burst):
+        try:
+            return float(self._take(keys=[self.prefix + key], args=[rate, burst]))
+        except Exception as e:
+            # Fail open: an unreachable limiter must not reject every request
+            self.errors += 1
+            logger.warning("Redis rate limit check failed: %s", e)
+            return 0.0
+
+    def refund(self, key, rate, burst):
+        try:
+            self._refund(keys=[self.prefix + key], args=[burst])
+        except Exception as e:
+            # The token stays spent, which only ever errs towards limiting
+            self.errors += 1
+            logger.warning("Redis rate limit refund failed: %s", e)
+
+    def __len__(self):
+        return 0
+
+
+class RateLimiter:
+    """Applies the per-subject and per-route limits to a request."""
+
+    def __init__(self, store, user_rate=20, user_burst=40, routes=None):
+        self.store = store
+        self.user_limit = (user_rate, user_burst)
+        self.route_limits = dict(routes or {})
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited_user': 0, 'limited_route': 0}
+
+    def check(self, route, subject):
+        """Seconds the subject must wait before calling route again, or 0 to go ahead."""
+        route_limit = self.route_limits.get(route)
+        if route_limit is not None:
+            wait = self.store.take(f'{route}:{subject}', *route_limit)
+            if wait:
+                self._count('limited_route')
+                return wait
+        if self.user_limit[0] > 0:
+            wait = self.store.take(subject, *self.user_limit)
+            if wait:
+                # The request is not served, so it must not use up the route's allowance
+                if route_limit is not None:
+                    self.store.refund(f'{route}:{subject}', *route_limit)
+                self._count('limited_user')
+                return wait
+        self._count('allowed')
+        return 0.0
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = self.store.backend
+        stats['buckets'] = len(self.store)
+        stats['backend_errors'] = self.store.errors
+        stats['user_limit'] = {'rate': self.user_limit[0], 'burst': self.user_limit[1]}
+        stats['route_limits'] = {
+            name: {'rate': rate, 'burst': burst} for name, (rate, burst) in self.route_limits.items()
+        }
+        return stats
+
+
+class NullRateLimiter:
+    """Limiter that admits everything, for RATE_LIMIT_ENABLED=false."""
+
+    def check(self, route, subject):
+        return 0.0
+
+    def stats(self):
+        return {'backend': 'none'}
+
+
+def create_rate_limiter(enabled=True, backend='memory', user_rate=20, user_burst=40,
+                        routes=None, max_keys=100000, redis_url=None):
+    """Build the limiter selected in config ('memory' or 'redis' store)."""
+    if not enabled:
+        return NullRateLimiter()
+    if backend == 'redis':
+        store = RedisBucketStore(redis_url)
+    else:
+        store = MemoryBucketStore(max_keys)
+    return RateLimiter(store, user_rate, user_burst, routes)
+
+
+class ConcurrencyLimit:
+    """Admits up to max_concurrency requests at once and refuses the rest without waiting."""
+
+    def __init__(self, max_concurrency=64, retry_after=1):
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stats = {'admitted': 0, 'shed': 0, 'in_flight_max': 0}
+
+    def acquire(self):
+        """True if the request may go ahead; the caller must release() it afterwards."""
+        with self._lock:
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                self._stats['shed'] += 1
+                return False
+            self._in_flight += 1
+            self._stats['admitted'] += 1
+            self._stats['in_flight_max'] = max(self._stats['in_flight_max'], self._in_flight)
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'in_flight': self._in_flight,
+                'max_concurrency': self.max_concurrency
+            }
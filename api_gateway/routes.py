@@ -1,133 +1,146 @@
-from __init__ import create_app, token_required, handle_service_error
-from flask import request, jsonify
-import requests
+from __init__ import (
+    create_app, token_required, rate_limited, handle_service_error, stream_service_response, upstream,
+    conditional_headers
+)
+from upstream import UPSTREAM_ERRORS
+from flask import request, jsonify, g
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 app = create_app()
-app.debug = True  # Enable debug mode
+
+def queue_suggestion_updates(task_texts):
+    """Count new tasks towards suggestions, unless the suggestion service is known to be down."""
+    # Suggestion frequencies are best effort; an open breaker drops them instead of piling them up
+    if upstream('suggestion').breaker.is_open():
+        logger.debug("Suggestion circuit open, skipping %d suggestion updates", len(task_texts))
+        return
+    # Updated in batches off the request path
+    for task_text in task_texts:
+        app.extensions['suggestion_ingest'].add(task_text)
 
 # Auth routes
 @app.route('/auth/register', methods=['POST'])
+@rate_limited
 def register():
     try:
         data = request.get_json()
-        logger.debug(f"Registration request received with data: {data}")
-        
-        auth_service_url = app.config['AUTH_SERVICE_URL']
-        logger.debug(f"Sending request to auth service at: {auth_service_url}")
-        
-        response = requests.post(
-            f"{auth_service_url}/register", 
-            json=data
-        )
+        response = upstream('auth').post('/register', json=data)
         
-        logger.debug(f"Auth service response: {response.status_code} - {response.text}")
+        logger.debug("Auth service response: %s", response.status_code)
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"Connection error to auth service: {e}")
+    except UPSTREAM_ERRORS as e:
+        logger.error("Connection error to auth service: %s", e)
         return jsonify({'error': 'Auth service unavailable'}), 503
     except Exception as e:
-        logger.error(f"Unexpected error during registration: {e}")
+        logger.error("Unexpected error during registration: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/auth/login', methods=['POST'])
+@rate_limited
 def login():
     try:
         data = request.get_json()
-        logger.debug(f"Login request received with data: {data}")
-        
-        response = requests.post(
-            f"{app.config['AUTH_SERVICE_URL']}/login", 
-            json=data
-        )
-        logger.debug(f"Login response: {response.status_code}")
+        response = upstream('auth').post('/login', json=data)
+        logger.debug("Login response: %s", response.status_code)
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"Connection error during login: {e}")
+    except UPSTREAM_ERRORS as e:
+        logger.error("Connection error during login: %s", e)
         return jsonify({'error': 'Auth service unavailable'}), 503
     except Exception as e:
-        logger.error(f"Unexpected error during login: {e}")
+        logger.error("Unexpected error during login: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/auth/refresh', methods=['POST'])
+@rate_limited
+def refresh_token():
+    try:
+        response = upstream('auth').post('/refresh', json=request.get_json(silent=True))
+        return handle_service_error(response)
+    except UPSTREAM_ERRORS as e:
+        logger.error("Connection error during token refresh: %s", e)
+        return jsonify({'error': 'Auth service unavailable'}), 503
+
+@app.route('/auth/logout', methods=['POST'])
+@rate_limited
+def logout():
+    try:
+        response = upstream('auth').post('/logout', json=request.get_json(silent=True))
+        return handle_service_error(response)
+    except UPSTREAM_ERRORS as e:
+        logger.error("Connection error during logout: %s", e)
+        return jsonify({'error': 'Auth service unavailable'}), 503
+
 # Task routes
 @app.route('/tasks', methods=['POST'])
 @token_required
 def create_task():
     try:
         data = request.get_json()
-        logger.debug(f"Create task request received with data: {data}")
         
         # Create task
-        response = requests.post(
-            f"{app.config['TASK_SERVICE_URL']}/tasks", 
-            json=data
-        )
+        response = upstream('task').post('/tasks', json=data)
         
         if response.status_code == 201:
-            logger.debug("Task created successfully, adding to suggestions")
-            # Add to suggestions
-            suggestion_response = requests.post(
-                f"{app.config['SUGGESTION_SERVICE_URL']}/suggestions/add",
-                json={'task_text': data.get('task_text')}
-            )
-            logger.debug(f"Suggestion service response: {suggestion_response.status_code}")
+            queue_suggestion_updates([data.get('task_text')])
         
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"Connection error creating task: {e}")
+    except UPSTREAM_ERRORS as e:
+        logger.error("Connection error creating task: %s", e)
         return jsonify({'error': 'Task service unavailable'}), 503
     except Exception as e:
-        logger.error(f"Unexpected error creating task: {e}")
+        logger.error("Unexpected error creating task: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/tasks/<user_id>', methods=['GET'])
 @token_required
 def get_tasks(user_id):
     try:
-        logger.debug(f"Get tasks request received for user - api gateway: {user_id}")
-        response = requests.get(
-            f"{app.config['TASK_SERVICE_URL']}/tasks/{user_id}"
+        logger.debug("Get tasks request received for user - api gateway: %s", user_id)
+        response = upstream('task').get(
+            f"/tasks/{user_id}", params=request.args.to_dict(), headers=conditional_headers()
         )
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Task service unavailable'}), 503
 
 @app.route('/tasks/complete/<task_id>', methods=['PUT'])
 @token_required
 def complete_task(task_id):
     try:
-        response = requests.put(
-            f"{app.config['TASK_SERVICE_URL']}/tasks/complete/{task_id}"
-        )
+        response = upstream('task').put(f"/tasks/complete/{task_id}")
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Task service unavailable'}), 503
 
 @app.route('/tasks/history/<user_id>', methods=['GET'])
 @token_required
 def get_task_history(user_id):
     try:
-        response = requests.get(
-            f"{app.config['TASK_SERVICE_URL']}/tasks/history/{user_id}"
+        if request.args.get('stream'):
+            return stream_service_response(upstream('task').get(
+                f"/tasks/history/{user_id}",
+                params=request.args.to_dict(),
+                stream=True
+            ))
+
+        response = upstream('task').get(
+            f"/tasks/history/{user_id}",
+            params=request.args.to_dict(),
+            headers=conditional_headers()
         )
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Task service unavailable'}), 503
 
 @app.route('/tasks/<task_id>', methods=['PUT'])
 @token_required
 def update_task(task_id):
     try:
-        response = requests.put(
-            f"{app.config['TASK_SERVICE_URL']}/tasks/{task_id}", 
-            json=request.get_json()
-        )
+        response = upstream('task').put(f"/tasks/{task_id}", json=request.get_json())
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Task service unavailable'}), 503
 
 @app.route('/tasks', methods=['GET'])
@@ -137,14 +150,72 @@ def get_tasks_by_status():
         status = request.args.get('status', 'pending')
         user_id = request.args.get('user_id')
         
-        logger.debug(f"Get tasks request received for status: {status}, user: {user_id}")
+        logger.debug("Get tasks request received for status: %s, user: %s", status, user_id)
         
-        response = requests.get(
-            f"{app.config['TASK_SERVICE_URL']}/tasks",
-            params={'status': status, 'user_id': user_id}
-        )
+        # limit / cursor / fields / stream pass straight through to the task service
+        params = {**request.args.to_dict(), 'status': status, 'user_id': user_id}
+        if request.args.get('stream'):
+            return stream_service_response(upstream('task').get('/tasks', params=params, stream=True))
+
+        response = upstream('task').get('/tasks', params=params, headers=conditional_headers())
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
+        return jsonify({'error': 'Task service unavailable'}), 503
+
+@app.route('/tasks/batch/create', methods=['POST'])
+@token_required
+def create_tasks_batch():
+    try:
+        data = request.get_json()
+        response = upstream('task').post('/tasks/batch/create', json=data)
+
+        if response.status_code == 201:
+            # Queue a suggestion update for every task that was created
+            queue_suggestion_updates([
+                result['task'].get('task_text')
+                for result in response.json().get('results', []) if result.get('status') == 201
+            ])
+
+        return handle_service_error(response)
+    except UPSTREAM_ERRORS:
+        return jsonify({'error': 'Task service unavailable'}), 503
+
+@app.route('/tasks/batch/<action>', methods=['POST'])
+@token_required
+def update_tasks_batch(action):
+    if action not in ('complete', 'delete'):
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        response = upstream('task').post(f"/tasks/batch/{action}", json=request.get_json())
+        return handle_service_error(response)
+    except UPSTREAM_ERRORS:
+        return jsonify({'error': 'Task service unavailable'}), 503
+
+@app.route('/tasks/export/<user_id>', methods=['GET'])
+@token_required
+def export_tasks(user_id):
+    try:
+        return stream_service_response(upstream('task').get(
+            f"/tasks/export/{user_id}",
+            params=request.args.to_dict(),
+            stream=True
+        ))
+    except UPSTREAM_ERRORS:
+        return jsonify({'error': 'Task service unavailable'}), 503
+
+@app.route('/tasks/events', methods=['GET'])
+@token_required
+def task_events():
+    """Relay the caller's task change events (Server-Sent Events)."""
+    client = upstream('task')
+    try:
+        # No read timeout: the stream stays open, with keepalive comments while idle
+        return stream_service_response(client.get(
+            f"/tasks/events/{g.user_id}",
+            stream=True,
+            timeout=(client.timeout[0], None)
+        ))
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Task service unavailable'}), 503
 
 # Suggestion routes
@@ -152,56 +223,33 @@ def get_tasks_by_status():
 @token_required
 def get_suggestions():
     try:
-        response = requests.get(
-            f"{app.config['SUGGESTION_SERVICE_URL']}/suggestions",
-            params={'q': request.args.get('q', '')}
+        response = upstream('suggestion').get(
+            '/suggestions',
+            params={'q': request.args.get('q', '')},
+            headers=conditional_headers()
         )
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Suggestion service unavailable'}), 503 
 
 # Add error handlers
 @app.errorhandler(404)
 def not_found_error(error):
-    logger.error(f"404 error: {error}")
+    logger.error("404 error: %s", error)
     return jsonify({'error': 'Not found'}), 404
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"500 error: {error}")
+    logger.error("500 error: %s", error)
     return jsonify({'error': 'Internal server error'}), 500
 
-# Add before_request handler for logging
-@app.before_request
-def before_request():
-    logger.debug(f"""
-    Request:
-    - Method: {request.method}
-    - URL: {request.url}
-    - Headers: {dict(request.headers)}
-    - Data: {request.get_json(silent=True)}
-    """)
-
-# Add after_request handler for logging
-@app.after_request
-def after_request(response):
-    logger.debug(f"""
-    Response:
-    - Status: {response.status_code}
-    - Headers: {dict(response.headers)}
-    - Data: {response.get_data(as_text=True)}
-    """)
-    return response
-
 # Add this new route
 @app.route('/tasks/<task_id>', methods=['DELETE'])
 @token_required
 def delete_task(task_id):
     try:
-        response = requests.delete(
-            f"{app.config['TASK_SERVICE_URL']}/tasks/{task_id}"
-        )
+        response = upstream('task').delete(f"/tasks/{task_id}")
         return handle_service_error(response)
-    except requests.exceptions.ConnectionError:
+    except UPSTREAM_ERRORS:
         return jsonify({'error': 'Task service unavailable'}), 503
   
\ No newline at end of file
@@ -0,0 +1,68 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import jwt
+
+
+def token_cache_config_from_env():
+    """Read verified-token cache settings from the environment."""
+    return {
+        'max_entries': int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', 10000))
+    }
+
+
+class VerifiedTokenCache:
+    """Verify JWTs once and remember their claims until they expire.
+
+    Entries are keyed by the SHA-256 digest of the token, so raw tokens are
+    never held in memory, and bounded LRU-style. A cached token is still
+    rejected with ExpiredSignatureError once its exp passes. Tokens that fail
+    verification are not cached.
+    """
+
+    def __init__(self, secret, max_entries=10000, algorithms=('HS256',)):
+        self.secret = secret
+        self.max_entries = max_entries
+        self.algorithms = list(algorithms)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def verify(self, token):
+        """Return the token's claims, raising jwt.InvalidTokenError if it is not valid."""
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at is not None and expires_at <= time.time():
+                    del self._entries[key]
+                    self._stats['expirations'] += 1
+                    raise jwt.ExpiredSignatureError('Signature has expired')
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return claims
+            self._stats['misses'] += 1
+
+        claims = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        expires_at = claims.get('exp')
+
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return claims
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        return stats
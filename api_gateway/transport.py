@@ -0,0 +1,109 @@
+"""How the gateway reaches each service: over HTTP, or in-process.
+
+In a split deployment every upstream call is an HTTP request. In the
+single-process monolith (monolith.py), the service apps are loaded into the
+gateway's process. An upstream set to the 'inprocess' transport then calls
+its service's WSGI app directly: the request skips the socket and the HTTP
+parsing, but still runs through the service's routes and request hooks.
+
+The in-process transport is a requests adapter. The upstream client, with
+its breakers, concurrency caps, metrics and streamed responses, works the
+same with either transport. Select it per service with
+<NAME>_SERVICE_TRANSPORT, or for all of them with SERVICE_TRANSPORT.
+"""
+import os
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+HTTP = 'http'
+IN_PROCESS = 'inprocess'
+
+# Service WSGI apps loaded into this process, by upstream name
+_local_apps = {}
+
+
+def transport_from_env(name):
+    """'http' or 'inprocess' for one upstream: <NAME>_SERVICE_TRANSPORT, else SERVICE_TRANSPORT."""
+    return os.getenv(f'{name.upper()}_SERVICE_TRANSPORT') or os.getenv('SERVICE_TRANSPORT', HTTP)
+
+
+def register_local_app(name, app):
+    """Make a service app loaded into this process available to the in-process transport."""
+    _local_apps[name] = app
+
+
+def local_app(name):
+    try:
+        return _local_apps[name]
+    except KeyError:
+        raise RuntimeError(
+            f"{name} uses the in-process transport but its app is not loaded; "
+            f"run monolith.py or set {name.upper()}_SERVICE_TRANSPORT=http"
+        ) from None
+
+
+class WSGIBody:
+    """The response body as the raw stream of a requests Response."""
+
+    def __init__(self, app_iter):
+        self._app_iter = app_iter
+
+    def stream(self, chunk_size=None, decode_content=True):
+        # Chunks are passed on as the app yields them, so event streams stay live
+        for chunk in self._app_iter:
+            if chunk:
+                yield chunk
+
+    def close(self):
+        close = getattr(self._app_iter, 'close', None)
+        if close is not None:
+            close()
+
+    def release_conn(self):
+        self.close()
+
+
+class WSGIAdapter(BaseAdapter):
+    """requests adapter that answers by calling a WSGI app in this process."""
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        # Timeouts cannot interrupt an in-process call; the breaker still sees slow calls
+        scheme, _, rest = request.url.partition('://')
+        host, _, path = rest.partition('/')
+        path, _, query = path.partition('?')
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+        environ = EnvironBuilder(
+            path='/' + path,
+            base_url=f'{scheme}://{host}',
+            query_string=query,
+            method=request.method,
+            headers=list(request.headers.items()),
+            data=body
+        ).get_environ()
+
+        app_iter, status, headers = run_wsgi_app(self.app, environ)
+        response = Response()
+        response.status_code = int(status.split(' ', 1)[0])
+        response.reason = status.partition(' ')[2]
+        response.headers = CaseInsensitiveDict(headers.to_wsgi_list())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = WSGIBody(app_iter)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        if not stream:
+            # Read the whole body now, as the HTTP transport does
+            response.content
+            response.raw.close()
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+
+import requests
+from flask import g, has_app_context
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.identity import USER_ID_HEADER
+from common.access_log import REQUEST_ID_HEADER
+from common.metrics import add_span
+from rate_limit import ConcurrencyLimit, concurrency_config_from_env
+from circuit_breaker import CircuitBreaker
+from transport import IN_PROCESS, WSGIAdapter, local_app, transport_from_env
+
+# Errors that mean the upstream could not be reached or answered in time
+UPSTREAM_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# Only these are retried on read errors / 5xx; POST is never replayed
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+
+class UpstreamSaturated(requests.exceptions.ConnectionError):
+    """Raised without contacting the upstream when its concurrency cap is reached.
+
+    It is a ConnectionError, so routes answer it with their usual 503; the
+    gateway adds the Retry-After kept on g.
+    """
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} upstream is at its concurrency limit')
+        self.retry_after = retry_after
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """Raised without contacting the upstream while its circuit breaker is open."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} upstream circuit is open')
+        self.retry_after = retry_after
+
+
+def upstream_config_from_env():
+    """Read upstream client settings from the environment."""
+    return {
+        'pool_size': int(os.getenv('UPSTREAM_POOL_SIZE', 20)),
+        'connect_timeout': float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 2)),
+        'read_timeout': float(os.getenv('UPSTREAM_READ_TIMEOUT', 10)),
+        'retries': int(os.getenv('UPSTREAM_RETRIES', 2)),
+        'backoff_factor': float(os.getenv('UPSTREAM_BACKOFF', 0.1))
+    }
+
+
+def forwarded_headers():
+    """Request ID and trusted identity of the request being proxied, for the upstream."""
+    if not has_app_context():
+        return {}
+    headers = {}
+    if g.get('request_id'):
+        headers[REQUEST_ID_HEADER] = g.request_id
+    if g.get('user_id'):
+        headers[USER_ID_HEADER] = g.user_id
+    return headers
+
+
+def upstream_histogram(metrics):
+    return metrics.histogram(
+        'upstream_request_duration_seconds', 'Gateway to service round trip, by upstream.',
+        ('upstream', 'method', 'status')
+    )
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client for one downstream service."""
+
+    def __init__(self, name, base_url, pool_size=20, connect_timeout=2,
+                 read_timeout=10, retries=2, backoff_factor=0.1, metrics=None,
+                 max_concurrency=0, retry_after=1, breaker_config=None, transport='http'):
+        self.name = name
+        self.transport = transport
+        self.concurrency = ConcurrencyLimit(max_concurrency, retry_after)
+        self.breaker = CircuitBreaker(name, **(breaker_config or {'enabled': False}))
+        self._histogram = upstream_histogram(metrics) if metrics is not None else None
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+            pool_block=False
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if transport == IN_PROCESS:
+            # Longest prefix wins, so only this service's URLs skip the network
+            self.session.mount(self.base_url, WSGIAdapter(local_app(name)))
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'server_errors': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0
+        }
+
+    def _admit(self):
+        """Refuse the call up front if the upstream is at its cap or its breaker is open."""
+        if not self.concurrency.acquire():
+            self._shed(UpstreamSaturated(self.name, self.concurrency.retry_after))
+        if not self.breaker.allow():
+            self.concurrency.release()
+            self._shed(CircuitOpen(self.name, self.breaker.retry_after()))
+
+    @staticmethod
+    def _shed(error):
+        if has_app_context():
+            g.shed_retry_after = error.retry_after
+        raise error
+
+    def request(self, method, path, **kwargs):
+        """Send a request to the upstream, recording latency and failures."""
+        self._admit()
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs['headers'] = {**forwarded_headers(), **(kwargs.get('headers') or {})}
+        start = time.perf_counter()
+        try:
+            # A streamed body is read after this returns, outside the cap
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException:
+            elapsed = time.perf_counter() - start
+            self.breaker.record(True, elapsed)
+            self._record(elapsed, method, 'error', error=True)
+            raise
+        finally:
+            self.concurrency.release()
+        elapsed = time.perf_counter() - start
+        self.breaker.record(response.status_code >= 500, elapsed)
+        self._record(elapsed, method, response.status_code,
+                     server_error=response.status_code >= 500)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def _record(self, elapsed, method, status, error=False, server_error=False):
+        if self._histogram is not None:
+            self._histogram.observe(elapsed, self.name, method, status)
+            add_span(f'upstream_{self.name}', elapsed)
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['latency_total'] += elapsed
+            self._stats['latency_max'] = max(self._stats['latency_max'], elapsed)
+            if error:
+                self._stats['errors'] += 1
+            if server_error:
+                self._stats['server_errors'] += 1
+
+    def stats(self):
+        """Return a snapshot of the latency and error counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['latency_avg'] = (
+            stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+        )
+        stats['name'] = self.name
+        stats['base_url'] = self.base_url
+        stats['transport'] = self.transport
+        stats['concurrency'] = self.concurrency.stats()
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+def client_options_from_env(name):
+    """Settings that differ per upstream: its concurrency cap and its transport."""
+    return dict(concurrency_config_from_env(name), transport=transport_from_env(name))
+
+
+def init_upstreams(app):
+    """Build one client per downstream service from the *_SERVICE_URL settings."""
+    options = dict(
+        app.config.get('UPSTREAM', {}),
+        metrics=app.extensions.get('metrics'),
+        breaker_config=app.config.get('BREAKER')
+    )
+    app.extensions['upstreams'] = {
+        'auth': UpstreamClient(
+            'auth', app.config['AUTH_SERVICE_URL'], **options, **client_options_from_env('auth')
+        ),
+        'task': UpstreamClient(
+            'task', app.config['TASK_SERVICE_URL'], **options, **client_options_from_env('task')
+        ),
+        'suggestion': UpstreamClient(
+            'suggestion', app.config['SUGGESTION_SERVICE_URL'], **options,
+            **client_options_from_env('suggestion')
+        )
+    }
+
+    def upstream_stats():
+        return {name: client.stats() for name, client in app.extensions['upstreams'].items()}, 200
+
+    def breaker_stats():
+        return {name: client.breaker.stats() for name, client in app.extensions['upstreams'].items()}, 200
+
+    app.add_url_rule('/upstreams', 'upstream_stats', upstream_stats, methods=['GET'])
+    app.add_url_rule('/breakers', 'breaker_stats', breaker_stats, methods=['GET'])
+    return app.extensions['upstreams']
@@ -1,27 +1,72 @@
 from flask import Flask
 from flask_cors import CORS
 import os
+import sys
 from dotenv import load_dotenv
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.db_pool import init_db_pool, pool_config_from_env
+from common.access_log import access_log_config_from_env, init_access_log
+from common.json_provider import init_json_provider, json_config_from_env
+from common.metrics import init_metrics, metrics_enabled_from_env
+from common.serving import debug_from_env
+from password_hasher import PasswordHasher, hasher_config_from_env
+from tokens import token_config_from_env
+
 def create_app():
     load_dotenv()
     
     app = Flask(__name__)
     CORS(app)
+    app.debug = debug_from_env()
+
+    # orjson-backed jsonify() and get_json()
+    app.config['JSON'] = json_config_from_env()
+    init_json_provider(app)
+
+    # Structured JSON access log
+    app.config['ACCESS_LOG'] = access_log_config_from_env()
+    init_access_log(app, 'auth_service')
+
+    # Latency histograms served at /metrics
+    app.config['METRICS_ENABLED'] = metrics_enabled_from_env()
+    init_metrics(app, 'auth_service')
     
     # Configure app
     app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    app.config['TOKENS'] = token_config_from_env()
     
     # Database configuration
     app.config['MYSQL_CONFIG'] = {
         'host': os.getenv('DB_HOST'),
+        'port': int(os.getenv('DB_PORT', 3306)),
         'user': os.getenv('DB_USER'),
         'password': os.getenv('DB_PASSWORD'),
         'database': os.getenv('DB_NAME')
     }
+    app.config['MYSQL_POOL'] = pool_config_from_env()
+    init_db_pool(app, name='auth_service')
+
+    # Bounded bcrypt worker pool
+    app.config['BCRYPT'] = hasher_config_from_env()
+    init_password_hasher(app)
     
     return app
 
+def init_password_hasher(app):
+    """Create the bcrypt worker pool and expose its queue counters."""
+    hasher = PasswordHasher(**app.config['BCRYPT'])
+    app.extensions['password_hasher'] = hasher
+
+    def hasher_stats():
+        return hasher.stats(), 200
+
+    app.add_url_rule('/hasher', 'hasher_stats', hasher_stats, methods=['GET'])
+    return hasher
+
 # Utility functions for auth service
 def generate_password_hash(password):
     """Generate password hash."""
@@ -1,26 +1,36 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from __init__ import create_app
+from password_hasher import HasherBusyError
+from tokens import (
+    RefreshTokenError, issue_access_token, issue_refresh_token,
+    rotate_refresh_token, revoke_refresh_token
+)
+from flask import request, jsonify
 import mysql.connector
-import bcrypt
-import jwt
 import uuid
-from datetime import datetime, timedelta
-import os
-from dotenv import load_dotenv
+from datetime import datetime
 
-load_dotenv()
+app = create_app()
 
-app = Flask(__name__)
-CORS(app)
+def get_db_connection():
+    return app.extensions['db_pool'].get_connection()
 
-# MySQL Configuration
-db_config = {
-    'host': 'localhost',
-    'port': 3306,
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': 'todo_db'
-}
+def hasher():
+    return app.extensions['password_hasher']
+
+def token_response(access_token, refresh_token, user_id):
+    return {
+        'token': access_token,
+        'refresh_token': refresh_token,
+        'expires_in': app.config['TOKENS']['access_ttl'],
+        'user_id': user_id
+    }
+
+@app.errorhandler(HasherBusyError)
+def hasher_busy(error):
+    # Shed load quickly instead of queueing behind a burst of logins
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 @app.route('/register', methods=['POST'])
 def register():
@@ -47,7 +57,7 @@ def register():
             }), 400
 
         # Connect to database
-        conn = mysql.connector.connect(**db_config)
+        conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
         try:
@@ -57,8 +67,7 @@ def register():
                 return jsonify({'error': 'Email already registered'}), 409
 
             # Hash password
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
+            hashed_password = hasher().hash(password)
             
             # Generate UUID for user_id
             user_id = str(uuid.uuid4())
@@ -91,6 +100,8 @@ def register():
             cursor.close()
             conn.close()
 
+    except HasherBusyError:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
@@ -109,7 +120,7 @@ def login():
             return jsonify({'error': 'Email and password are required'}), 400
 
         # Connect to database
-        conn = mysql.connector.connect(**db_config)
+        conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
         try:
@@ -117,24 +128,16 @@ def login():
             cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
             user = cursor.fetchone()
 
-            if not user or not bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+            if not user or not hasher().check(password, user['password']):
                 return jsonify({'error': 'Invalid email or password'}), 401
 
-            # Generate JWT token
-            token = jwt.encode(
-                {
-                    'user_id': user['user_id'],
-                    'email': user['email'],
-                    'exp': datetime.utcnow() + timedelta(days=1)
-                },
-                os.getenv('JWT_SECRET_KEY', 'your-secret-key'),
-                algorithm='HS256'
-            )
+            # Short-lived access token plus a refresh token to renew it without a password
+            tokens = app.config['TOKENS']
+            token = issue_access_token(tokens, user['user_id'], user['email'])
+            refresh_token, _ = issue_refresh_token(tokens, cursor, user['user_id'])
+            conn.commit()
 
-            return jsonify({
-                'token': token,
-                'user_id': user['user_id']
-            }), 200
+            return jsonify(token_response(token, refresh_token, user['user_id'])), 200
 
         except mysql.connector.Error as err:
             print(f"Database Error: {err}")
@@ -143,9 +146,54 @@ def login():
             cursor.close()
             conn.close()
 
+    except HasherBusyError:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
+@app.route('/refresh', methods=['POST'])
+def refresh():
+    data = request.get_json(silent=True) or {}
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        try:
+            token, refresh_token, user_id = rotate_refresh_token(
+                app.config['TOKENS'], cursor, data.get('refresh_token')
+            )
+        except RefreshTokenError as e:
+            conn.commit()  # keeps a family revoked for token reuse
+            return jsonify({'error': str(e)}), 401
+        conn.commit()
+        return jsonify(token_response(token, refresh_token, user_id)), 200
+    except mysql.connector.Error as err:
+        print(f"Database Error: {err}")
+        return jsonify({'error': f'Database error occurred: {str(err)}'}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/logout', methods=['POST'])
+def logout():
+    data = request.get_json(silent=True) or {}
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        try:
+            revoke_refresh_token(app.config['TOKENS'], cursor, data.get('refresh_token'))
+        except RefreshTokenError:
+            pass  # nothing to revoke; logging out still succeeds
+        conn.commit()
+        return jsonify({'message': 'Logged out'}), 200
+    except mysql.connector.Error as err:
+        print(f"Database Error: {err}")
+        return jsonify({'error': f'Database error occurred: {str(err)}'}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 if __name__ == '__main__':
-    app.run(port=5001, debug=True)
+    app.run(port=5001)
@@ -0,0 +1,100 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class HasherBusyError(Exception):
+    """Raised when every bcrypt worker is busy and the admission queue is full."""
+
+
+def hasher_config_from_env():
+    """Read bcrypt pool settings from the environment."""
+    pool_size = int(os.getenv('BCRYPT_POOL_SIZE', os.cpu_count() or 2))
+    return {
+        'pool_size': pool_size,
+        'max_queue': int(os.getenv('BCRYPT_MAX_QUEUE', pool_size * 4)),
+        'rounds': int(os.getenv('BCRYPT_ROUNDS', 12))
+    }
+
+
+class PasswordHasher:
+    """Run bcrypt on a fixed set of worker threads behind a bounded queue.
+
+    bcrypt releases the GIL, so pool_size threads hash in parallel on
+    pool_size cores while the request threads wait. At most
+    pool_size + max_queue hashes are admitted at once. Anything beyond that
+    fails immediately with HasherBusyError, so a login burst cannot take
+    every request thread with it.
+    """
+
+    def __init__(self, pool_size=4, max_queue=16, rounds=12):
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(pool_size + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            'completed': 0,
+            'rejected': 0,
+            'wait_total': 0.0,
+            'hash_total': 0.0
+        }
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HasherBusyError('Password hashing queue is full')
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._stats['wait_total'] += started - submitted
+                    self._stats['hash_total'] += time.perf_counter() - started
+
+        try:
+            return self._executor.submit(timed).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._stats['completed'] += 1
+            self._slots.release()
+
+    def hash(self, password):
+        """Return the bcrypt hash of password at the configured cost."""
+        return self._run(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds))
+        )
+
+    def check(self, password, hashed):
+        """Return True if password matches the stored bcrypt hash."""
+        if isinstance(hashed, str):
+            hashed = hashed.encode('utf-8')
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+        completed = stats['completed']
+        stats['wait_avg'] = stats['wait_total'] / completed if completed else 0.0
+        stats['hash_avg'] = stats['hash_total'] / completed if completed else 0.0
+        stats['pool_size'] = self.pool_size
+        stats['max_queue'] = self.max_queue
+        stats['rounds'] = self.rounds
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,130 @@
+"""Access and refresh tokens issued by the auth service.
+
+Access tokens are short-lived HS256 JWTs that the gateway verifies on its own.
+Refresh tokens are opaque '<token_id>.<secret>' strings. Only an HMAC of the
+secret is stored, in refresh_tokens keyed by token_id. Renewing access is then
+a primary-key lookup plus hmac.compare_digest, with no bcrypt.
+
+Every refresh rotates the token: the presented row is revoked and a new one
+is issued in the same family. If an already-rotated token is presented again
+after the grace period, it has probably been stolen, and the whole family is
+revoked.
+"""
+import os
+import hmac
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+
+import jwt
+
+
+class RefreshTokenError(Exception):
+    """Raised when a refresh token is unknown, expired, revoked or reused."""
+
+
+def token_config_from_env():
+    """Read token lifetimes and the refresh token HMAC key from the environment."""
+    secret = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
+    return {
+        'secret': secret,
+        'refresh_secret': os.getenv('REFRESH_TOKEN_SECRET', secret),
+        'access_ttl': int(os.getenv('ACCESS_TOKEN_TTL', 900)),
+        'refresh_ttl': int(os.getenv('REFRESH_TOKEN_TTL', 30 * 24 * 3600)),
+        'reuse_grace': int(os.getenv('REFRESH_REUSE_GRACE', 10))
+    }
+
+
+def issue_access_token(config, user_id, email):
+    return jwt.encode(
+        {
+            'user_id': user_id,
+            'email': email,
+            'exp': datetime.utcnow() + timedelta(seconds=config['access_ttl'])
+        },
+        config['secret'],
+        algorithm='HS256'
+    )
+
+
+def _digest(config, secret):
+    return hmac.new(
+        config['refresh_secret'].encode('utf-8'), secret.encode('utf-8'), hashlib.sha256
+    ).hexdigest()
+
+
+def issue_refresh_token(config, cursor, user_id, family_id=None):
+    """Insert a new refresh token row and return (token, token_id).
+
+    The caller commits.
+    """
+    token_id = secrets.token_hex(16)
+    secret = secrets.token_urlsafe(32)
+    cursor.execute(
+        """INSERT INTO refresh_tokens (token_id, family_id, user_id, token_hmac, expires_at)
+        VALUES (%s, %s, %s, %s, %s)""",
+        (token_id, family_id or token_id, user_id, _digest(config, secret),
+         datetime.utcnow() + timedelta(seconds=config['refresh_ttl']))
+    )
+    return f'{token_id}.{secret}', token_id
+
+
+def _lookup(config, cursor, token):
+    """Return the refresh_tokens row (locked) that token authenticates, or raise."""
+    token_id, _, secret = (token or '').partition('.')
+    if not token_id or not secret:
+        raise RefreshTokenError('Malformed refresh token')
+
+    cursor.execute(
+        """SELECT r.token_id, r.family_id, r.user_id, r.token_hmac, r.expires_at,
+                  r.revoked_at, r.replaced_by, u.email
+        FROM refresh_tokens r JOIN users u ON u.user_id = r.user_id
+        WHERE r.token_id = %s FOR UPDATE""",
+        (token_id,)
+    )
+    row = cursor.fetchone()
+    if not row or not hmac.compare_digest(row['token_hmac'], _digest(config, secret)):
+        raise RefreshTokenError('Invalid refresh token')
+    return row
+
+
+def revoke_family(cursor, family_id):
+    cursor.execute(
+        """UPDATE refresh_tokens SET revoked_at = UTC_TIMESTAMP()
+        WHERE family_id = %s AND revoked_at IS NULL""",
+        (family_id,)
+    )
+
+
+def rotate_refresh_token(config, cursor, token):
+    """Exchange a refresh token for (access_token, refresh_token, user_id).
+
+    The caller commits, including after a RefreshTokenError so that a
+    family revoked for reuse stays revoked.
+    """
+    row = _lookup(config, cursor, token)
+    now = datetime.utcnow()
+
+    if row['revoked_at'] is not None:
+        if row['replaced_by'] and now - row['revoked_at'] <= timedelta(seconds=config['reuse_grace']):
+            # Another tab rotated this token a moment ago; not a replay
+            raise RefreshTokenError('Refresh token already used')
+        revoke_family(cursor, row['family_id'])
+        raise RefreshTokenError('Refresh token has been revoked')
+    if row['expires_at'] <= now:
+        raise RefreshTokenError('Refresh token has expired')
+
+    refresh_token, token_id = issue_refresh_token(config, cursor, row['user_id'], row['family_id'])
+    cursor.execute(
+        """UPDATE refresh_tokens SET revoked_at = UTC_TIMESTAMP(), replaced_by = %s
+        WHERE token_id = %s""",
+        (token_id, row['token_id'])
+    )
+    access_token = issue_access_token(config, row['user_id'], row['email'])
+    return access_token, refresh_token, row['user_id']
+
+
+def revoke_refresh_token(config, cursor, token):
+    """Revoke the family the given refresh token belongs to (logout)."""
+    row = _lookup(config, cursor, token)
+    revoke_family(cursor, row['family_id'])
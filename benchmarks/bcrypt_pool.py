@@ -0,0 +1,132 @@
+"""Login throughput benchmark for the auth service's bcrypt worker pool.
+
+Simulates a login burst: many request threads check passwords through
+auth_service.password_hasher.PasswordHasher at once. Each configured pool
+size is reported separately. While the burst runs, a probe thread does a
+trivial request-sized task every few milliseconds. Its latency shows how
+much the burst slows the rest of the service.
+
+    python benchmarks/bcrypt_pool.py --logins 400 --clients 64 \
+        --pool-sizes 1 2 4 8 --rounds 10
+
+Results are printed as JSON. A rejected login is one that got a fast 503
+because the admission queue was full.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+import bcrypt
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'auth_service'))
+
+from password_hasher import PasswordHasher, HasherBusyError  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def ms(value):
+    return round(value * 1000, 2) if value is not None else None
+
+
+def run(pool_size, max_queue, rounds, logins, clients, hashed):
+    hasher = PasswordHasher(pool_size=pool_size, max_queue=max_queue, rounds=rounds)
+    latencies = []
+    rejected = 0
+    issued = 0
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def client():
+        nonlocal issued, rejected
+        while True:
+            with lock:
+                if issued >= logins:
+                    return
+                issued += 1
+            start = time.perf_counter()
+            try:
+                hasher.check('benchmark-password', hashed)
+            except HasherBusyError:
+                with lock:
+                    rejected += 1
+                    issued -= 1
+                time.sleep(0.005)  # a real client would honour Retry-After
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    probe_latencies = []
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            json.dumps([{'task_id': i, 'task_text': 'probe'} for i in range(50)])
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.002)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+    hasher.close()
+
+    latencies.sort()
+    probe_latencies.sort()
+    return {
+        'pool_size': pool_size,
+        'max_queue': max_queue,
+        'logins': len(latencies),
+        'rejected': rejected,
+        'elapsed_s': round(elapsed, 3),
+        'logins_per_s': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'probe_p99_ms': ms(percentile(probe_latencies, 99))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=400,
+                        help='successful password checks per pool size')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent request threads')
+    parser.add_argument('--pool-sizes', type=int, nargs='+',
+                        default=sorted({1, 2, os.cpu_count() or 2, (os.cpu_count() or 2) * 2}))
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help='admission queue length (default: 4 x pool size)')
+    parser.add_argument('--rounds', type=int, default=10, help='bcrypt cost factor')
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b'benchmark-password', bcrypt.gensalt(rounds=args.rounds))
+    results = {
+        'rounds': args.rounds,
+        'clients': args.clients,
+        'cpu_count': os.cpu_count(),
+        'runs': [
+            run(pool_size, args.max_queue if args.max_queue is not None else pool_size * 4,
+                args.rounds, args.logins, args.clients, hashed)
+            for pool_size in args.pool_sizes
+        ]
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
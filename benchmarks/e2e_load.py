@@ -0,0 +1,550 @@
+"""End-to-end load benchmark: all four services against a throwaway MySQL database.
+
+Creates a fresh database and applies database/schema.sql plus every
+migration. Seeds N users, M tasks per user and K suggestions, then starts
+the gateway, auth, task and suggestion services as manage_services.sh does.
+A mixed workload is driven through the gateway:
+
+- login
+- list pending tasks
+- create a task (which also feeds the suggestion service)
+- complete a task
+- typeahead bursts (one GET /suggestions per keystroke)
+
+Throughput and p50/p95/p99 latency are reported per endpoint as JSON.
+
+    python benchmarks/e2e_load.py --users 200 --tasks-per-user 50 \
+        --suggestions 5000 --duration 30 --concurrency 32 --output run.json
+
+The database comes from the DB_* settings in .env, on the same server the
+services normally use. Pass --mysqld to start a private server in a
+temporary data directory instead. Either way the benchmark database
+(todo_bench_<random>) is dropped at the end unless --keep-db is given.
+Compare runs by diffing their JSON: each report records the git commit and
+the settings used.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime, timedelta
+
+import bcrypt
+import aiohttp
+import mysql.connector
+from dotenv import load_dotenv
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'database'))
+
+import migrate  # noqa: E402
+
+SECRET = 'benchmark-secret'
+PASSWORD = 'benchmark-password'
+
+VERBS = ('buy', 'call', 'email', 'fix', 'pay', 'book', 'clean', 'review', 'send', 'plan')
+NOUNS = ('milk', 'mom', 'invoice', 'bike', 'rent', 'dentist', 'kitchen', 'report',
+         'parcel', 'trip', 'car', 'slides', 'groceries', 'taxes', 'garden')
+
+# Default share of each operation in the workload
+DEFAULT_MIX = 'login=5,list=45,create=15,complete=10,typeahead=25'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30, process=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f'Process on port {port} exited with {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Nothing listening on port {port}')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def ms(value):
+    return round(value * 1000, 2) if value is not None else None
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('login', 'list', 'create', 'complete', 'typeahead'):
+            raise argparse.ArgumentTypeError(f'Unknown operation: {name}')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Database
+
+@contextlib.contextmanager
+def private_mysqld(binary, log_dir):
+    """Run a disposable mysqld with an empty data directory; yields its settings."""
+    data_dir = tempfile.mkdtemp(prefix='todo-bench-mysql-')
+    port = free_port()
+    try:
+        subprocess.run(
+            [binary, '--no-defaults', '--initialize-insecure', f'--datadir={data_dir}'],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        with open(os.path.join(log_dir, 'mysqld.log'), 'w') as log:
+            server = subprocess.Popen([
+                binary, '--no-defaults', f'--datadir={data_dir}', f'--port={port}',
+                '--bind-address=127.0.0.1', f'--socket={os.path.join(data_dir, "mysqld.sock")}',
+                '--mysqlx=OFF', '--skip-log-bin'
+            ], stdout=log, stderr=log)
+        try:
+            wait_for_port(port, timeout=60, process=server)
+            yield {'host': '127.0.0.1', 'port': port, 'user': 'root', 'password': ''}
+        finally:
+            server.terminate()
+            server.wait()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def server_settings():
+    load_dotenv(os.path.join(PROJECT_ROOT, '.env'))
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', 3306)),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD') or ''
+    }
+
+
+def create_database(server, name):
+    """Create the benchmark database with the same schema migrate.py produces."""
+    conn = mysql.connector.connect(**server)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE `{name}`")
+    cursor.execute(f"USE `{name}`")
+    with open(os.path.join(PROJECT_ROOT, 'database', 'schema.sql')) as f:
+        for statement in migrate.split_statements(f.read()):
+            if not statement.upper().startswith(('CREATE DATABASE', 'USE ')):
+                cursor.execute(statement)
+    cursor.close()
+    # migrate.up() reports progress on stdout, which carries the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        failed = migrate.up(conn)
+    conn.close()
+    if failed:
+        raise RuntimeError('Migrations failed on the benchmark database')
+
+
+def drop_database(server, name):
+    conn = mysql.connector.connect(**server)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cursor.close()
+    conn.close()
+
+
+def suggestion_texts(count, rng):
+    texts = [f'{verb} {noun}' for verb in VERBS for noun in NOUNS]
+    while len(texts) < count:
+        texts.append(f'{rng.choice(VERBS)} {rng.choice(NOUNS)} {len(texts)}')
+    return texts[:count]
+
+
+def seed(server, name, users, tasks_per_user, suggestions, bcrypt_rounds, rng):
+    """Insert the dataset; returns {user_id: {'email', 'pending': [task_id, ...]}}."""
+    conn = mysql.connector.connect(database=name, **server)
+    cursor = conn.cursor()
+    # Every user shares one hash: logins still pay the full bcrypt cost
+    hashed = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=bcrypt_rounds)).decode('utf-8')
+    texts = suggestion_texts(max(suggestions, 1), rng)
+    now = datetime.utcnow()
+
+    accounts = {}
+    user_rows = []
+    task_rows = []
+    for i in range(users):
+        user_id = str(uuid.uuid4())
+        email = f'bench{i}@example.com'
+        user_rows.append((user_id, email, hashed, f'Bench User {i}', 'OTHER'))
+        accounts[user_id] = {'email': email, 'pending': []}
+        for _ in range(tasks_per_user):
+            task_id = str(uuid.uuid4())
+            completed = rng.random() < 0.3
+            deadline = now + timedelta(hours=rng.randint(-48, 240)) if rng.random() < 0.6 else None
+            task_rows.append((
+                task_id, user_id, rng.choice(texts), deadline,
+                completed, now - timedelta(hours=rng.randint(1, 48)) if completed else None
+            ))
+            if not completed:
+                accounts[user_id]['pending'].append(task_id)
+
+    cursor.executemany(
+        "INSERT INTO users (user_id, email, password, name, gender) VALUES (%s, %s, %s, %s, %s)",
+        user_rows
+    )
+    for start in range(0, len(task_rows), 1000):
+        cursor.executemany(
+            """INSERT INTO tasks (task_id, user_id, task_text, deadline, is_completed, completed_at)
+            VALUES (%s, %s, %s, %s, %s, %s)""",
+            task_rows[start:start + 1000]
+        )
+    if suggestions:
+        cursor.executemany(
+            "INSERT INTO task_suggestions (task_text, frequency) VALUES (%s, %s)",
+            [(text, rng.randint(1, 500)) for text in texts]
+        )
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return accounts, texts
+
+
+# Services
+
+def start_services(server, name, gateway_mode, log_dir):
+    """Start the four services (or the monolith) on free ports; returns (gateway_url, processes)."""
+    ports = {service: free_port() for service in ('gateway', 'auth', 'task', 'suggestion')}
+    env = dict(os.environ)
+    env.update({
+        'DB_HOST': server['host'],
+        'DB_PORT': str(server['port']),
+        'DB_USER': server['user'],
+        'DB_PASSWORD': server['password'],
+        'DB_NAME': name,
+        'JWT_SECRET_KEY': SECRET,
+        'AUTH_SERVICE_URL': f"http://127.0.0.1:{ports['auth']}",
+        'TASK_SERVICE_URL': f"http://127.0.0.1:{ports['task']}",
+        'SUGGESTION_SERVICE_URL': f"http://127.0.0.1:{ports['suggestion']}",
+        'GATEWAY_PORT': str(ports['gateway']),
+        # A few sessions drive all the load, so per-user limits would cap the run
+        'RATE_LIMIT_ENABLED': 'false'
+    })
+
+    def flask_command(module, port):
+        return [sys.executable, '-c', (
+            f"import {module}; "
+            f"{module}.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False, use_reloader=False)"
+        )]
+
+    if gateway_mode == 'monolith':
+        # Gateway and services in one process, with no HTTP between them
+        commands = [('gateway', '.', flask_command('monolith', ports['gateway']))]
+    else:
+        commands = [
+            ('auth', 'auth_service', flask_command('app', ports['auth'])),
+            ('task', 'task_service', flask_command('app', ports['task'])),
+            ('suggestion', 'suggestion_service', flask_command('app', ports['suggestion'])),
+            ('gateway', 'api_gateway', [sys.executable, 'async_app.py'] if gateway_mode == 'async'
+                else flask_command('routes', ports['gateway']))
+        ]
+
+    processes = []
+    for service, directory, command in commands:
+        log = open(os.path.join(log_dir, f'{service}.log'), 'w')
+        processes.append(subprocess.Popen(
+            command, cwd=os.path.join(PROJECT_ROOT, directory), env=env, stdout=log, stderr=log
+        ))
+        log.close()
+    try:
+        for (service, _, _), process in zip(commands, processes):
+            wait_for_port(ports[service], process=process)
+    except RuntimeError:
+        stop_services(processes)
+        raise
+    return f"http://127.0.0.1:{ports['gateway']}", processes
+
+
+def stop_services(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+# Workload
+
+class Recorder:
+    """Latencies and statuses per endpoint label."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, label, seconds, status):
+        entry = self.samples.setdefault(label, {'latencies': [], 'statuses': {}})
+        entry['latencies'].append(seconds)
+        entry['statuses'][str(status)] = entry['statuses'].get(str(status), 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        everything = []
+        for label, entry in sorted(self.samples.items()):
+            latencies = sorted(entry['latencies'])
+            everything.extend(latencies)
+            errors = sum(count for status, count in entry['statuses'].items()
+                         if not status.isdigit() or int(status) >= 400)
+            endpoints[label] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'statuses': entry['statuses'],
+                'throughput_rps': round(len(latencies) / elapsed, 1),
+                'mean_ms': ms(sum(latencies) / len(latencies)),
+                'p50_ms': ms(percentile(latencies, 50)),
+                'p95_ms': ms(percentile(latencies, 95)),
+                'p99_ms': ms(percentile(latencies, 99)),
+                'max_ms': ms(latencies[-1])
+            }
+        everything.sort()
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': len(everything),
+            'throughput_rps': round(len(everything) / elapsed, 1) if elapsed else None,
+            'p50_ms': ms(percentile(everything, 50)),
+            'p95_ms': ms(percentile(everything, 95)),
+            'p99_ms': ms(percentile(everything, 99)),
+            'endpoints': endpoints
+        }
+
+
+class Session:
+    """One signed-in user as seen by the load generator."""
+
+    def __init__(self, user_id, email, pending):
+        self.user_id = user_id
+        self.email = email
+        self.pending = pending
+        self.token = None
+        self.etag = None
+
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+async def timed(http, recorder, label, method, url, **kwargs):
+    """Send one request, recording its latency; returns (status, body or None)."""
+    start = time.perf_counter()
+    try:
+        async with http.request(method, url, **kwargs) as resp:
+            body = await resp.read()
+            status = resp.status
+            etag = resp.headers.get('ETag')
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        recorder.record(label, time.perf_counter() - start, type(e).__name__)
+        return None, None, None
+    recorder.record(label, time.perf_counter() - start, status)
+    return status, body, etag
+
+
+async def login(http, recorder, base, session):
+    status, body, _ = await timed(
+        http, recorder, 'POST /auth/login', 'POST', f'{base}/auth/login',
+        json={'email': session.email, 'password': PASSWORD}
+    )
+    if status == 200:
+        session.token = json.loads(body)['token']
+    return status
+
+
+async def run_operation(operation, http, recorder, base, session, texts, rng, conditional):
+    if operation == 'login' or session.token is None:
+        await login(http, recorder, base, session)
+        return
+
+    if operation == 'complete' and session.pending:
+        task_id = session.pending.pop(rng.randrange(len(session.pending)))
+        status, _, _ = await timed(
+            http, recorder, 'PUT /tasks/complete/<task_id>', 'PUT',
+            f'{base}/tasks/complete/{task_id}', headers=session.headers()
+        )
+    elif operation == 'create':
+        body = {'user_id': session.user_id, 'task_text': rng.choice(texts)}
+        if rng.random() < 0.5:
+            body['deadline'] = (datetime.utcnow() + timedelta(days=rng.randint(1, 14))).strftime('%Y-%m-%d %H:%M:%S')
+        status, response_body, _ = await timed(
+            http, recorder, 'POST /tasks', 'POST', f'{base}/tasks',
+            headers=session.headers(), json=body
+        )
+        if status == 201:
+            session.pending.append(json.loads(response_body)['task_id'])
+    elif operation == 'typeahead':
+        # One request per keystroke while typing the start of a known task
+        text = rng.choice(texts)
+        status = None
+        for length in range(1, min(len(text), 8) + 1):
+            status, _, _ = await timed(
+                http, recorder, 'GET /suggestions', 'GET', f'{base}/suggestions',
+                headers=session.headers(), params={'q': text[:length]}
+            )
+    else:
+        headers = session.headers()
+        if conditional and session.etag:
+            headers['If-None-Match'] = session.etag
+        status, _, etag = await timed(
+            http, recorder, 'GET /tasks/<user_id>', 'GET', f'{base}/tasks/{session.user_id}',
+            headers=headers
+        )
+        if etag:
+            session.etag = etag
+
+    if status == 401:
+        session.token = None
+
+
+async def drive(base, accounts, texts, args, rng):
+    sessions = [
+        Session(user_id, account['email'], account['pending'])
+        for user_id, account in list(accounts.items())[:args.sessions]
+    ]
+    operations = list(args.mix)
+    weights = [args.mix[name] for name in operations]
+    recorder = Recorder()
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+        # Sign everyone in first; these logins are reported separately
+        warmup = Recorder()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def sign_in(session):
+            async with semaphore:
+                await login(http, warmup, base, session)
+
+        warmup_started = time.perf_counter()
+        await asyncio.gather(*(sign_in(session) for session in sessions))
+        warmup_elapsed = time.perf_counter() - warmup_started
+
+        deadline = time.perf_counter() + args.duration
+        issued = 0
+
+        async def client():
+            nonlocal issued
+            while time.perf_counter() < deadline and (not args.requests or issued < args.requests):
+                issued += 1
+                operation = rng.choices(operations, weights)[0]
+                await run_operation(
+                    operation, http, recorder, base, rng.choice(sessions), texts, rng, args.conditional
+                )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return warmup.report(max(warmup_elapsed, 1e-9)), recorder.report(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--tasks-per-user', type=int, default=50)
+    parser.add_argument('--suggestions', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=50,
+                        help='users signed in and driven by the workload')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--requests', type=int, default=0,
+                        help='stop after this many operations (0: run for --duration)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'operation weights (default {DEFAULT_MIX})')
+    parser.add_argument('--conditional', action='store_true',
+                        help='send If-None-Match on list reads, as a browser cache would')
+    parser.add_argument('--gateway', choices=['flask', 'async', 'monolith'], default='flask',
+                        help='monolith runs the gateway and services in one process')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12,
+                        help='cost of the seeded password hashes')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mysqld', help='start a private mysqld from this binary')
+    parser.add_argument('--keep-db', action='store_true')
+    parser.add_argument('--log-dir', help='where service logs go (default: a temp directory)')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix='todo-bench-logs-')
+    os.makedirs(log_dir, exist_ok=True)
+    name = f'todo_bench_{uuid.uuid4().hex[:8]}'
+
+    with contextlib.ExitStack() as stack:
+        server = stack.enter_context(private_mysqld(args.mysqld, log_dir)) if args.mysqld else server_settings()
+
+        create_database(server, name)
+        if not args.keep_db:
+            stack.callback(drop_database, server, name)
+        seed_started = time.perf_counter()
+        accounts, texts = seed(
+            server, name, args.users, args.tasks_per_user, args.suggestions, args.bcrypt_rounds, rng
+        )
+        seed_elapsed = time.perf_counter() - seed_started
+
+        try:
+            base, processes = start_services(server, name, args.gateway, log_dir)
+        except RuntimeError as e:
+            print(f'{e}; service logs are in {log_dir}', file=sys.stderr)
+            return 1
+        stack.callback(stop_services, processes)
+
+        logins, workload = asyncio.run(drive(base, accounts, texts, args, rng))
+
+    report = {
+        'git_revision': git_revision(),
+        'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'config': {
+            'users': args.users,
+            'tasks_per_user': args.tasks_per_user,
+            'suggestions': args.suggestions,
+            'sessions': min(args.sessions, args.users),
+            'duration_s': args.duration,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'mix': args.mix,
+            'conditional': args.conditional,
+            'gateway': args.gateway,
+            'bcrypt_rounds': args.bcrypt_rounds,
+            'seed': args.seed,
+            'database': 'private mysqld' if args.mysqld else f"{server['host']}:{server['port']}"
+        },
+        'seed_s': round(seed_elapsed, 3),
+        'logins': logins['endpoints'].get('POST /auth/login'),
+        'workload': workload,
+        'log_dir': log_dir
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
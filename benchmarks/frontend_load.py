@@ -0,0 +1,322 @@
+"""Page load benchmark: bytes transferred and time to first render of the task page.
+
+Compares two setups:
+
+- source: the files in the tree served by `python -m http.server`, and the
+  task list sent uncompressed. This is how the frontend was served before
+  build.py.
+- built: the output of frontend/build.py served by frontend/app.py, with the
+  gateway compressing the task list.
+
+Each setup loads login.html and then index.html, as a user signing in
+does, twice with one simulated browser cache: a first visit, then a repeat
+visit. The task list comes from the
+Flask gateway in front of a stub task service that returns --tasks rows.
+
+The number of bytes each response puts on the wire is measured. Time to
+first render is modelled on a link of --rtt-ms and --bandwidth-mbps, as
+three round trips: the page, then its stylesheets and scripts in parallel,
+then the task list that tasks.js requests on DOMContentLoaded. Each round
+trip costs one RTT, plus its bytes over the bandwidth, plus the slowest
+server time measured for it. A resource served from the cache costs
+nothing. Resources on other hosts (the Font Awesome CDN) are left out.
+
+    python benchmarks/frontend_load.py --tasks 200 --rtt-ms 50 --bandwidth-mbps 10
+
+Results are printed as JSON.
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+from urllib.parse import urljoin, urlparse
+
+import jwt
+import requests
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRONTEND_DIR = os.path.join(PROJECT_ROOT, 'frontend')
+GATEWAY_DIR = os.path.join(PROJECT_ROOT, 'api_gateway')
+SECRET = 'benchmark-secret'
+USER_ID = str(uuid.uuid4())
+
+# Render-blocking stylesheets and synchronous scripts
+BLOCKING_RESOURCE = re.compile(r'<link rel="stylesheet" href="([^"]+)"|<script src="([^"]+)"')
+
+# Browsers advertise both; the built setup serves brotli when it is installed
+ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Nothing listening on port {port}')
+
+
+def start_process(args, cwd, env=None):
+    return subprocess.Popen(
+        args, cwd=cwd, env=env or dict(os.environ),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def run_stub(port, tasks):
+    """Task service stand-in: every path returns the same list of `tasks` rows."""
+    from aiohttp import web
+
+    rows = [
+        {
+            'task_id': str(uuid.uuid4()),
+            'user_id': USER_ID,
+            'task_text': f'Follow up on item {i} from the weekly planning notes',
+            'deadline': 'Fri, 14 Nov 2025 17:00:00 GMT',
+            'reminder': 'Fri, 14 Nov 2025 16:00:00 GMT',
+            'is_completed': False,
+            'completed_at': None,
+            'created_at': 'Mon, 10 Nov 2025 09:30:00 GMT'
+        }
+        for i in range(tasks)
+    ]
+
+    async def handle(request):
+        return web.json_response(rows)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    web.run_app(app, host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def start_gateway(stub_url, port):
+    env = dict(os.environ)
+    env.update({
+        'JWT_SECRET_KEY': SECRET,
+        'AUTH_SERVICE_URL': stub_url,
+        'TASK_SERVICE_URL': stub_url,
+        'SUGGESTION_SERVICE_URL': stub_url,
+        'RATE_LIMIT_ENABLED': 'false'
+    })
+    code = (
+        "import routes; "
+        f"routes.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False, use_reloader=False)"
+    )
+    return start_process([sys.executable, '-c', code], GATEWAY_DIR, env)
+
+
+def start_source_frontend(port):
+    return start_process(
+        [sys.executable, '-m', 'http.server', str(port), '--bind', '127.0.0.1', '--directory', '.'],
+        FRONTEND_DIR
+    )
+
+
+def start_built_frontend(port, dist_dir):
+    env = dict(os.environ)
+    env.update({'FRONTEND_ASSETS': 'dist', 'FRONTEND_DIST_DIR': dist_dir, 'FRONTEND_PORT': str(port)})
+    return start_process([sys.executable, 'app.py'], FRONTEND_DIR, env)
+
+
+class Browser:
+    """Fetches like a browser with an HTTP cache, counting the bytes each response puts on the wire."""
+
+    def __init__(self, accept_encoding):
+        self.accept_encoding = accept_encoding
+        self.session = requests.Session()
+        self.cache = {}
+
+    def fetch(self, url, headers=None):
+        cached = self.cache.get(url)
+        if cached is not None and 'immutable' in cached['cache_control']:
+            return {'url': url, 'status': 'cached', 'bytes': 0, 'server_s': 0.0}
+
+        request_headers = {'Accept-Encoding': self.accept_encoding, **(headers or {})}
+        if cached is not None:
+            if cached['etag']:
+                request_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        start = time.perf_counter()
+        response = self.session.get(url, headers=request_headers, stream=True)
+        body = response.raw.read(decode_content=False)
+        elapsed = time.perf_counter() - start
+
+        status_line = len(f'HTTP/1.1 {response.status_code} {response.reason}\r\n')
+        header_bytes = status_line + sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + 2
+        if response.status_code == 200:
+            self.cache[url] = {
+                'cache_control': response.headers.get('Cache-Control', ''),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'body': body,
+                'encoding': response.headers.get('Content-Encoding')
+            }
+        return {
+            'url': url,
+            'status': response.status_code,
+            'encoding': response.headers.get('Content-Encoding'),
+            'bytes': header_bytes + len(body),
+            'server_s': elapsed
+        }
+
+    def page_text(self, url):
+        """The decoded HTML of a fetched page, from the cache."""
+        cached = self.cache[url]
+        body = cached['body']
+        if cached['encoding'] == 'gzip':
+            body = gzip.decompress(body)
+        elif cached['encoding'] == 'br':
+            import brotli  # optional dependency, only needed for this encoding
+            body = brotli.decompress(body)
+        return body.decode('utf-8')
+
+
+def round_trip(fetches, rtt, bandwidth):
+    """Modelled seconds for resources fetched in parallel; zero if all came from the cache."""
+    sent = [fetch for fetch in fetches if fetch['status'] != 'cached']
+    if not sent:
+        return 0.0
+    transfer = sum(fetch['bytes'] for fetch in sent) * 8 / bandwidth
+    return rtt + transfer + max(fetch['server_s'] for fetch in sent)
+
+
+def load_page(browser, frontend_url, page, gateway_url, token, rtt, bandwidth):
+    """Load one page as a browser would; return its fetches and modelled time to first render."""
+    page_url = f'{frontend_url}/templates/{page}'
+    html = browser.fetch(page_url)
+    host = urlparse(frontend_url).netloc
+    resources = [
+        urljoin(page_url, stylesheet or script)
+        for stylesheet, script in BLOCKING_RESOURCE.findall(browser.page_text(page_url))
+    ]
+    assets = [browser.fetch(url) for url in resources if urlparse(url).netloc == host]
+
+    rounds = [[html], assets]
+    if page == 'index.html':
+        # tasks.js loads the pending list on DOMContentLoaded
+        rounds.append([browser.fetch(
+            f'{gateway_url}/tasks?status=pending&user_id={USER_ID}',
+            headers={'Authorization': f'Bearer {token}'}
+        )])
+
+    fetches = [fetch for fetches_in_round in rounds for fetch in fetches_in_round]
+    return {
+        'requests': sum(1 for fetch in fetches if fetch['status'] != 'cached'),
+        'from_cache': sum(1 for fetch in fetches if fetch['status'] == 'cached'),
+        'bytes': sum(fetch['bytes'] for fetch in fetches),
+        'bytes_by_resource': {urlparse(fetch['url']).path: fetch['bytes'] for fetch in fetches},
+        'first_render_ms': round(sum(round_trip(r, rtt, bandwidth) for r in rounds) * 1000, 1)
+    }
+
+
+def run_setup(frontend_url, gateway_url, accept_encoding, token, args):
+    """First and repeat visits to each page, median of --runs fresh browsers."""
+    rtt = args.rtt_ms / 1000
+    bandwidth = args.bandwidth_mbps * 1e6
+    runs = []
+    for _ in range(args.runs):
+        browser = Browser(accept_encoding)
+        runs.append({
+            visit: {
+                page: load_page(browser, frontend_url, page, gateway_url, token, rtt, bandwidth)
+                for page in ('login.html', 'index.html')
+            }
+            for visit in ('first_visit', 'repeat_visit')
+        })
+
+    results = runs[0]
+    for visit, pages in results.items():
+        for page, result in pages.items():
+            result['first_render_ms'] = median(run[visit][page]['first_render_ms'] for run in runs)
+    return results
+
+
+def json_sizes(gateway_url, token):
+    """Bytes of one task list response in each content coding."""
+    sizes = {}
+    for coding in ('identity', 'gzip', 'br'):
+        response = requests.get(
+            f'{gateway_url}/tasks?status=pending&user_id={USER_ID}',
+            headers={'Authorization': f'Bearer {token}', 'Accept-Encoding': coding},
+            stream=True
+        )
+        body = response.raw.read(decode_content=False)
+        sizes[coding] = {'bytes': len(body), 'content_encoding': response.headers.get('Content-Encoding')}
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=200, help='rows in the stub task list')
+    parser.add_argument('--rtt-ms', type=float, default=50)
+    parser.add_argument('--bandwidth-mbps', type=float, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--stub', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stub:
+        run_stub(args.stub, args.tasks)
+        return
+
+    sys.path.insert(0, FRONTEND_DIR)
+    from build import build
+
+    token = jwt.encode({'user_id': USER_ID, 'exp': time.time() + 3600}, SECRET, algorithm='HS256')
+    ports = {name: free_port() for name in ('stub', 'gateway', 'source', 'built')}
+    processes = []
+    with tempfile.TemporaryDirectory() as dist_dir:
+        manifest = build(dist_dir)
+        try:
+            processes.append(start_process(
+                [sys.executable, os.path.abspath(__file__), '--stub', str(ports['stub']),
+                 '--tasks', str(args.tasks)],
+                PROJECT_ROOT
+            ))
+            processes.append(start_gateway(f"http://127.0.0.1:{ports['stub']}", ports['gateway']))
+            processes.append(start_source_frontend(ports['source']))
+            processes.append(start_built_frontend(ports['built'], dist_dir))
+            for port in ports.values():
+                wait_for_port(port)
+
+            gateway_url = f"http://127.0.0.1:{ports['gateway']}"
+            results = {
+                'tasks': args.tasks,
+                'rtt_ms': args.rtt_ms,
+                'bandwidth_mbps': args.bandwidth_mbps,
+                'built_assets': len(manifest),
+                'task_list': json_sizes(gateway_url, token),
+                'setups': {
+                    'source': run_setup(f"http://127.0.0.1:{ports['source']}", gateway_url,
+                                        'identity', token, args),
+                    'built': run_setup(f"http://127.0.0.1:{ports['built']}", gateway_url,
+                                       ACCEPT_ENCODING, token, args)
+                }
+            }
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
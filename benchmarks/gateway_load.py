@@ -0,0 +1,210 @@
+"""Load benchmark: Flask gateway (routes.py) vs asyncio gateway (async_app.py).
+
+Both gateways are started against a stub downstream service that answers
+every route after a fixed delay, so the numbers measure the gateway itself.
+
+    python benchmarks/gateway_load.py --requests 2000 --concurrency 50 200 \
+        --idle 2000 --delay-ms 20
+
+Results are printed as JSON.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import jwt
+import aiohttp
+from aiohttp import web
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GATEWAY_DIR = os.path.join(PROJECT_ROOT, 'api_gateway')
+SECRET = 'benchmark-secret'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_stub(port, delay):
+    """Downstream stand-in: every path returns a small task list after `delay` seconds."""
+    async def handle(request):
+        await asyncio.sleep(delay)
+        if request.method == 'POST' and request.path == '/tasks':
+            return web.json_response({'task_id': 'bench', 'task_text': 'bench'}, status=201)
+        return web.json_response([
+            {'task_id': str(i), 'task_text': f'task {i}', 'is_completed': False}
+            for i in range(20)
+        ])
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    web.run_app(app, host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Nothing listening on port {port}')
+
+
+def start_process(args, cwd, env):
+    return subprocess.Popen(
+        args, cwd=cwd, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def gateway_env(stub_url, port):
+    env = dict(os.environ)
+    env.update({
+        'JWT_SECRET_KEY': SECRET,
+        'AUTH_SERVICE_URL': stub_url,
+        'TASK_SERVICE_URL': stub_url,
+        'SUGGESTION_SERVICE_URL': stub_url,
+        'GATEWAY_PORT': str(port)
+    })
+    return env
+
+
+def start_flask_gateway(stub_url, port):
+    code = (
+        "import routes; "
+        f"routes.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False, use_reloader=False)"
+    )
+    return start_process([sys.executable, '-c', code], GATEWAY_DIR, gateway_env(stub_url, port))
+
+
+def start_async_gateway(stub_url, port):
+    return start_process([sys.executable, 'async_app.py'], GATEWAY_DIR, gateway_env(stub_url, port))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def open_idle_connections(port, count):
+    """Hold `count` connected-but-silent sockets open against the gateway."""
+    writers = []
+    for _ in range(count):
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writers.append(writer)
+        except OSError:
+            break
+    return writers
+
+
+async def drive(port, total, concurrency, idle):
+    token = jwt.encode({'user_id': 'bench', 'exp': time.time() + 3600}, SECRET, algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    base = f'http://127.0.0.1:{port}'
+    idle_writers = await open_idle_connections(port, idle)
+
+    latencies = []
+    errors = 0
+    issued = 0
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            nonlocal issued, errors
+            while issued < total:
+                issued += 1
+                # Mix of reads and task creation (which fans out to the suggestion service)
+                if issued % 5 == 0:
+                    request = session.post(f'{base}/tasks', headers=headers,
+                                           json={'user_id': 'bench', 'task_text': 'bench'})
+                else:
+                    request = session.get(f'{base}/tasks/bench', headers=headers)
+                start = time.perf_counter()
+                try:
+                    async with request as resp:
+                        await resp.read()
+                        if resp.status >= 400:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    for writer in idle_writers:
+        writer.close()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'idle_connections_held': len(idle_writers),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--idle', type=int, default=1000,
+                        help='idle client connections held open during each run')
+    parser.add_argument('--delay-ms', type=float, default=20,
+                        help='simulated downstream service time')
+    parser.add_argument('--stub', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stub:
+        run_stub(args.stub, args.delay_ms / 1000)
+        return
+
+    stub_port = free_port()
+    stub = start_process(
+        [sys.executable, os.path.abspath(__file__), '--stub', str(stub_port),
+         '--delay-ms', str(args.delay_ms)],
+        PROJECT_ROOT, dict(os.environ)
+    )
+    results = {'delay_ms': args.delay_ms, 'gateways': {}}
+    try:
+        wait_for_port(stub_port)
+        stub_url = f'http://127.0.0.1:{stub_port}'
+        for name, starter in (('flask', start_flask_gateway), ('async', start_async_gateway)):
+            port = free_port()
+            gateway = starter(stub_url, port)
+            try:
+                wait_for_port(port)
+                results['gateways'][name] = [
+                    asyncio.run(drive(port, args.requests, concurrency, args.idle))
+                    for concurrency in args.concurrency
+                ]
+            finally:
+                gateway.terminate()
+                gateway.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
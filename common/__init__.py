@@ -0,0 +1 @@
+"""Shared infrastructure used by the gateway and the backend services."""
@@ -0,0 +1,270 @@
+"""Structured, sampled access logging shared by the gateway and the services.
+
+Every log record goes onto a bounded in-memory queue. A background thread
+formats it as one JSON line and writes it out, so request threads never
+format or write log output themselves. If the queue is full, the record is
+dropped and counted rather than blocking the request.
+
+Access lines carry a request ID, the timing and the status. Successful
+requests are logged at ACCESS_LOG_SAMPLE_RATE; errors and slow requests are
+always logged. Request and response bodies are captured only when
+ACCESS_LOG_CAPTURE_BODIES is on. Captured bodies have sensitive fields
+redacted and are truncated to ACCESS_LOG_MAX_BODY bytes.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, request
+
+from common.identity import USER_ID_HEADER
+from common.metrics import request_spans
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+REDACTED = '[redacted]'
+
+# Bodies larger than this are not parsed for redaction, only summarized
+MAX_PARSE_BYTES = 64 * 1024
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_configured = {}
+_configure_lock = threading.Lock()
+
+
+def access_log_config_from_env():
+    """Read logging settings from the environment."""
+    return {
+        'level': os.getenv('LOG_LEVEL', 'INFO').upper(),
+        'path': os.getenv('ACCESS_LOG_PATH') or None,
+        'queue_size': int(os.getenv('ACCESS_LOG_QUEUE_SIZE', 10000)),
+        'sample_rate': float(os.getenv('ACCESS_LOG_SAMPLE_RATE', 1.0)),
+        'slow_ms': float(os.getenv('ACCESS_LOG_SLOW_MS', 1000)),
+        'capture_bodies': os.getenv('ACCESS_LOG_CAPTURE_BODIES', 'false').lower() in ('1', 'true', 'yes'),
+        'max_body': int(os.getenv('ACCESS_LOG_MAX_BODY', 1024)),
+        'redact': [
+            field.strip().lower()
+            for field in os.getenv(
+                'ACCESS_LOG_REDACT', 'password,token,refresh_token,authorization'
+            ).split(',') if field.strip()
+        ]
+    }
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra= fields."""
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'service': self.service,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller and leaves formatting to the writer."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The queue is in-process, so the record can be handed over unformatted
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(service, config):
+    """Route the root logger through the background JSON writer, once per process."""
+    with _configure_lock:
+        if 'handler' in _configured:
+            return _configured['handler']
+
+        if config['path']:
+            target = logging.FileHandler(config['path'])
+        else:
+            target = logging.StreamHandler(sys.stderr)
+        target.setFormatter(JSONFormatter(service))
+
+        handler = DroppingQueueHandler(queue.Queue(maxsize=config['queue_size']))
+        _start_writer(handler, target)
+        # A gunicorn app preloaded in the master forks without the writer thread
+        os.register_at_fork(after_in_child=lambda: _start_writer(handler, target))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(config['level'])
+        # The servers' own per-request lines duplicate the access log
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
+
+        _configured['handler'] = handler
+        return handler
+
+
+def _start_writer(handler, target):
+    """Give the handler a fresh queue and a writer thread in the current process."""
+    inherited = _configured.pop('listener', None)
+    if inherited is not None:
+        # Its thread stayed in the parent; stopping it here would wait on that queue
+        atexit.unregister(inherited.stop)
+    handler.queue = queue.Queue(maxsize=handler.queue.maxsize)
+    listener = QueueListener(handler.queue, target, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+    _configured['listener'] = listener
+
+
+def redact(value, fields):
+    """Replace the values of sensitive keys, at any depth, with a placeholder."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key.lower() in fields else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+class AccessLog:
+    """Decides which requests to log and builds their fields; framework neutral."""
+
+    def __init__(self, service, level='INFO', path=None, queue_size=10000, sample_rate=1.0,
+                 slow_ms=1000, capture_bodies=False, max_body=1024, redact=()):
+        self.logger = logging.getLogger(f'access.{service}')
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.capture_bodies = capture_bodies
+        self.max_body = max_body
+        self.redact_fields = frozenset(redact)
+        self.handler = configure_logging(service, {
+            'level': level, 'path': path, 'queue_size': queue_size
+        })
+
+    @staticmethod
+    def request_id(incoming=None):
+        """Keep a caller-supplied request ID, otherwise mint one."""
+        return incoming[:64] if incoming else uuid.uuid4().hex
+
+    def should_log(self, status, duration_ms):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return False
+        if status >= 400 or duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def body(self, raw, content_type):
+        """Redacted, size-capped rendering of a body for the log, or None."""
+        if not raw:
+            return None
+        if len(raw) > MAX_PARSE_BYTES:
+            return f'[{len(raw)} bytes]'
+        if content_type and 'json' in content_type:
+            try:
+                text = json.dumps(redact(json.loads(raw), self.redact_fields))
+            except ValueError:
+                text = raw.decode('utf-8', 'replace') if isinstance(raw, bytes) else raw
+        else:
+            text = raw.decode('utf-8', 'replace') if isinstance(raw, bytes) else raw
+        if len(text) > self.max_body:
+            return text[:self.max_body] + f'...[{len(text) - self.max_body} more]'
+        return text
+
+    def log(self, fields):
+        level = logging.ERROR if fields['status'] >= 500 else (
+            logging.WARNING if fields['status'] >= 400 else logging.INFO
+        )
+        self.logger.log(level, 'request', extra=fields)
+
+    def stats(self):
+        return {
+            'dropped': self.handler.dropped,
+            'queued': self.handler.queue.qsize(),
+            'sample_rate': self.sample_rate,
+            'capture_bodies': self.capture_bodies
+        }
+
+
+def init_access_log(app, service):
+    """Install JSON logging and a per-request access line on a Flask app."""
+    access_log = AccessLog(service, **app.config['ACCESS_LOG'])
+    app.extensions['access_log'] = access_log
+
+    @app.before_request
+    def start_access_log():
+        g.request_id = access_log.request_id(request.headers.get(REQUEST_ID_HEADER))
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def write_access_log(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        start = g.get('request_start')
+        if start is None:
+            return response
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        if not access_log.should_log(response.status_code, duration_ms):
+            return response
+
+        fields = {
+            'request_id': request_id,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'bytes': response.content_length,
+            'remote_addr': request.remote_addr,
+            'user_id': g.get('user_id') or request.headers.get(USER_ID_HEADER)
+        }
+        spans = request_spans()
+        if spans:
+            fields['spans_ms'] = spans
+        if access_log.capture_bodies:
+            fields['request_body'] = access_log.body(
+                request.get_data(cache=True), request.content_type
+            )
+            if not response.is_streamed and not response.direct_passthrough:
+                fields['response_body'] = access_log.body(
+                    response.get_data(), response.content_type
+                )
+        access_log.log(fields)
+        return response
+
+    def access_log_stats():
+        return access_log.stats(), 200
+
+    app.add_url_rule('/logs/stats', 'access_log_stats', access_log_stats, methods=['GET'])
+    return access_log
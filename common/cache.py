@@ -0,0 +1,170 @@
+import os
+import time
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def cache_config_from_env(prefix):
+    """Read cache settings such as <prefix>_BACKEND from the environment."""
+    return {
+        'backend': os.getenv(f'{prefix}_BACKEND', 'memory'),
+        'max_entries': int(os.getenv(f'{prefix}_MAX_ENTRIES', 10000)),
+        'ttl': float(os.getenv(f'{prefix}_TTL', 60)),
+        'redis_url': os.getenv(f'{prefix}_REDIS_URL', 'redis://localhost:6379/0')
+    }
+
+
+class BaseCache:
+    """Shared hit/miss accounting; backends implement _get, _set and _delete."""
+
+    def __init__(self, name):
+        self.name = name
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0}
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        value = self._get(key)
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._set(key, value, ttl)
+        self._count('sets')
+
+    def delete(self, *keys):
+        if keys:
+            self._delete(keys)
+            self._count('invalidations', len(keys))
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['name'] = self.name
+        stats['backend'] = self.backend
+        return stats
+
+
+class LRUCache(BaseCache):
+    """In-process LRU cache with a per-entry time to live."""
+
+    backend = 'memory'
+
+    def __init__(self, name='cache', max_entries=10000, ttl=60):
+        super().__init__(name)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats.update({'evictions': 0, 'expirations': 0})
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._count('expirations')
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count('evictions')
+
+    def _delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        return stats
+
+
+class RedisCache(BaseCache):
+    """Cache shared by every worker process through a local Redis server."""
+
+    backend = 'redis'
+
+    def __init__(self, name='cache', redis_url='redis://localhost:6379/0', ttl=60):
+        import redis  # optional dependency, only needed for this backend
+
+        super().__init__(name)
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(redis_url)
+        self._stats['errors'] = 0
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def _get(self, key):
+        try:
+            raw = self._client.get(self._key(key))
+        except Exception as e:
+            logger.warning("Redis cache %s get failed: %s", self.name, e)
+            self._count('errors')
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def _set(self, key, value, ttl):
+        try:
+            self._client.set(
+                self._key(key), pickle.dumps(value),
+                px=int((ttl if ttl is not None else self.ttl) * 1000)
+            )
+        except Exception as e:
+            logger.warning("Redis cache %s set failed: %s", self.name, e)
+            self._count('errors')
+
+    def _delete(self, keys):
+        try:
+            self._client.delete(*(self._key(key) for key in keys))
+        except Exception as e:
+            logger.warning("Redis cache %s delete failed: %s", self.name, e)
+            self._count('errors')
+
+
+class NullCache(BaseCache):
+    """Cache that never stores anything, for turning caching off."""
+
+    backend = 'none'
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value, ttl):
+        pass
+
+    def _delete(self, keys):
+        pass
+
+
+def create_cache(name, backend='memory', max_entries=10000, ttl=60, redis_url=None):
+    """Build the cache backend selected in config ('memory', 'redis' or 'none')."""
+    if backend == 'redis':
+        return RedisCache(name, redis_url=redis_url, ttl=ttl)
+    if backend == 'none':
+        return NullCache(name)
+    return LRUCache(name, max_entries=max_entries, ttl=ttl)
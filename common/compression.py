@@ -0,0 +1,175 @@
+"""Negotiated gzip and brotli compression of JSON and text responses.
+
+A response is compressed when the client's Accept-Encoding allows it, its
+content type is compressible and its body is at least COMPRESSION_MIN_SIZE
+bytes. Smaller bodies fit in a packet or two either way, and compressing
+them costs more CPU than it saves on the wire. Brotli is preferred when
+the brotli package is installed; otherwise gzip is used.
+
+Event streams and other streamed bodies are never compressed here. Each
+chunk has to reach the client as soon as it is written.
+"""
+import os
+import gzip
+import threading
+
+from flask import request
+
+# In order of preference when the client accepts several equally
+ENCODINGS = ('br', 'gzip')
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+_brotli = None
+
+
+def compression_config_from_env():
+    """Read response compression settings from the environment."""
+    return {
+        'enabled': os.getenv('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+        'min_size': int(os.getenv('COMPRESSION_MIN_SIZE', 1024)),
+        'gzip_level': int(os.getenv('COMPRESSION_GZIP_LEVEL', 6)),
+        'brotli_quality': int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    }
+
+
+def brotli_module():
+    """The brotli module, or None when it is not installed."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli  # optional dependency, only needed for this encoding
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def available_encodings():
+    return ENCODINGS if brotli_module() is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an Accept-Encoding header to its quality value."""
+    qualities = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding, available=ENCODINGS):
+    """The best coding from available that the client accepts, or None for identity."""
+    qualities = parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compressible(content_type):
+    mimetype = (content_type or '').split(';', 1)[0].strip().lower()
+    if mimetype == 'text/event-stream':
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def weak_etag(etag):
+    """The weak form of an ETag value: the compressed bytes differ, the content does not."""
+    if etag and not etag.startswith('W/'):
+        return f'W/{etag}'
+    return etag
+
+
+class Compressor:
+    """Compresses response bodies for the clients that accept it; safe to share between threads."""
+
+    def __init__(self, enabled=True, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = available_encodings()
+        self._lock = threading.Lock()
+        self._stats = {'compressed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def applies(self, status, content_type, content_encoding=None):
+        """True if responses like this one are compressed for some clients, so they Vary."""
+        return (self.enabled and 200 <= status < 300 and status not in (204, 206)
+                and not content_encoding and compressible(content_type))
+
+    def negotiate(self, accept_encoding, size):
+        """The coding to send a body of size bytes in, or None to send it as it is."""
+        if size < self.min_size:
+            return None
+        return choose_encoding(accept_encoding, self.encodings)
+
+    def compress(self, body, coding):
+        if coding == 'br':
+            compressed = brotli_module().compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        with self._lock:
+            self._stats['compressed'] += 1
+            self._stats['bytes_in'] += len(body)
+            self._stats['bytes_out'] += len(compressed)
+        return compressed
+
+    def compress_response(self, response):
+        """Compress a buffered Flask response in place if the request allows it."""
+        if (response.direct_passthrough or response.is_streamed
+                or not self.applies(response.status_code, response.mimetype,
+                                    response.headers.get('Content-Encoding'))):
+            return response
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        coding = self.negotiate(request.headers.get('Accept-Encoding'), len(body))
+        if coding is None:
+            return response
+        response.set_data(self.compress(body, coding))
+        response.headers['Content-Encoding'] = coding
+        if 'ETag' in response.headers:
+            response.headers['ETag'] = weak_etag(response.headers['ETag'])
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['min_size'] = self.min_size
+        stats['encodings'] = list(self.encodings)
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        return stats
+
+
+def init_compression(app):
+    """Compress a Flask app's JSON and text responses.
+
+    Call this before init_access_log(), so the access log still sees the
+    uncompressed body.
+    """
+    compressor = Compressor(**app.config['COMPRESSION'])
+    app.extensions['compressor'] = compressor
+
+    # Registered early, so it runs after the other after_request hooks
+    @app.after_request
+    def compress_response(response):
+        return compressor.compress_response(response)
+
+    def compression_stats():
+        return compressor.stats(), 200
+
+    app.add_url_rule('/compression', 'compression_stats', compression_stats, methods=['GET'])
+    return compressor
@@ -0,0 +1,314 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+
+import mysql.connector
+
+from common.metrics import add_span
+from common.serving import on_worker_start
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+def pool_config_from_env():
+    """Read connection pool settings from the environment."""
+    return {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        'max_uses': int(os.getenv('DB_POOL_MAX_USES', 1000)),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+        'checkout_timeout': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+        'health_check': os.getenv('DB_POOL_HEALTH_CHECK', 'true').lower() == 'true'
+    }
+
+
+class TimedCursor:
+    """Cursor proxy that records how long each execute() takes."""
+
+    def __init__(self, raw, histogram, pool_name):
+        self._raw = raw
+        self._histogram = histogram
+        self._pool_name = pool_name
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def _timed(self, method, operation, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            # The statement verb keeps the label set small
+            verb = operation.lstrip().split(None, 1)[0].upper() if operation.strip() else 'NONE'
+            self._histogram.observe(elapsed, self._pool_name, verb)
+            add_span('db_query', elapsed)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(self._raw.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._raw.executemany, operation, *args, **kwargs)
+
+
+class PooledConnection:
+    """Proxy around a raw MySQL connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        raw = self._raw.cursor(*args, **kwargs)
+        pool = self._pool
+        if pool is None or pool._query_histogram is None:
+            return raw
+        return TimedCursor(raw, pool._query_histogram, pool.name)
+
+    def close(self):
+        """Return the connection to its pool instead of closing the socket."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool._checkin(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with health checks and recycling."""
+
+    def __init__(self, connect_args, min_size=1, max_size=10, max_uses=1000,
+                 max_lifetime=3600, checkout_timeout=5, health_check=True,
+                 name='default', connect=None, metrics=None, prefill=True):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size: min=%s max=%s' % (min_size, max_size))
+
+        self.name = name
+        self.connect_args = dict(connect_args)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self._connect = connect or mysql.connector.connect
+
+        self._connect_histogram = self._query_histogram = None
+        if metrics is not None:
+            self._connect_histogram = metrics.histogram(
+                'db_connection_checkout_seconds',
+                'Time to get a connection from the pool, including waits and new connects.',
+                ('pool',)
+            )
+            self._query_histogram = metrics.histogram(
+                'db_query_duration_seconds', 'Time spent in cursor.execute, by statement type.',
+                ('pool', 'statement')
+            )
+
+        self._idle = deque()
+        self._size = 0
+        self._lock = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'reused': 0,
+            'created': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'errors': 0
+        }
+
+        if prefill:
+            self.fill_minimum()
+
+    def fill_minimum(self):
+        """Open min_size connections up front so the first requests skip the handshake."""
+        for _ in range(self.min_size):
+            with self._lock:
+                self._size += 1
+            try:
+                conn = self._open()
+            except mysql.connector.Error as err:
+                logger.warning("Pool %s could not pre-open connections: %s", self.name, err)
+                return
+            with self._lock:
+                self._idle.append(conn)
+
+    def _open(self):
+        """Open a connection for a slot the caller has already reserved in _size."""
+        try:
+            raw = self._connect(**self.connect_args)
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._stats['errors'] += 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._stats['created'] += 1
+        return PooledConnection(self, raw)
+
+    def _discard(self, conn):
+        try:
+            conn._raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+
+    def _expired(self, conn):
+        if self.max_uses and conn.uses >= self.max_uses:
+            return True
+        if self.max_lifetime and time.monotonic() - conn.created_at >= self.max_lifetime:
+            return True
+        return False
+
+    def _healthy(self, conn):
+        if not self.health_check:
+            return True
+        try:
+            return conn._raw.is_connected()
+        except Exception:
+            return False
+
+    def get_connection(self):
+        """Check out a connection, opening a new one if the pool has room."""
+        if self._connect_histogram is None:
+            return self._checkout()
+        start = time.perf_counter()
+        try:
+            return self._checkout()
+        finally:
+            elapsed = time.perf_counter() - start
+            self._connect_histogram.observe(elapsed, self.name)
+            add_span('db_connect', elapsed)
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._lock:
+            self._stats['checkouts'] += 1
+
+        while True:
+            conn = None
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            'Timed out waiting for a connection from pool %s' % self.name
+                        )
+                    self._stats['waits'] += 1
+                    self._lock.wait(remaining)
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if conn is None:
+                conn = self._open()
+            elif self._expired(conn):
+                with self._lock:
+                    self._stats['recycled'] += 1
+                self._discard(conn)
+                continue
+            elif not self._healthy(conn):
+                with self._lock:
+                    self._stats['health_check_failures'] += 1
+                self._discard(conn)
+                continue
+            else:
+                with self._lock:
+                    self._stats['reused'] += 1
+
+            conn.uses += 1
+            conn._pool = self
+            return conn
+
+    def _checkin(self, conn):
+        try:
+            # Never hand an open transaction (or its read snapshot) to the next caller
+            if conn._raw.in_transaction:
+                conn._raw.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        if self._expired(conn):
+            with self._lock:
+                self._stats['recycled'] += 1
+            self._discard(conn)
+            return
+
+        with self._lock:
+            self._idle.append(conn)
+            self._lock.notify()
+
+    def close(self):
+        """Close every idle connection held by the pool."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._stats
+            }
+
+
+def init_db_pool(app, name=None):
+    """Create the pool for a service from MYSQL_CONFIG / MYSQL_POOL and register it on the app."""
+    metrics = app.extensions.get('metrics')
+    pool = ConnectionPool(
+        app.config['MYSQL_CONFIG'],
+        name=name or app.import_name,
+        metrics=metrics,
+        prefill=False,
+        **app.config.get('MYSQL_POOL', {})
+    )
+    app.extensions['db_pool'] = pool
+    # Connections opened before a gunicorn fork would be shared by every worker
+    on_worker_start(app, pool.fill_minimum)
+
+    if metrics is not None:
+        def pool_connections():
+            stats = pool.stats()
+            return {(pool.name, state): stats[state] for state in ('idle', 'in_use')}
+
+        metrics.gauge('db_pool_connections', 'Open pool connections by state.',
+                      ('pool', 'state'), pool_connections)
+
+    def pool_stats():
+        return pool.stats(), 200
+
+    app.add_url_rule('/db/pool', 'db_pool_stats', pool_stats, methods=['GET'])
+    return pool
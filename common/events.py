@@ -0,0 +1,189 @@
+"""Per-user change events, published by the task service and streamed as SSE.
+
+Each subscriber gets a bounded queue. A publish puts the event on the queues
+of that user's subscribers only, and never blocks: a subscriber that falls
+behind is sent a 'resync' event and dropped. Its client then reloads the
+list once and reconnects.
+
+The memory broker only reaches subscribers in the same process. With several
+task service processes, set TASK_EVENTS_BACKEND=redis so that each process
+publishes to a Redis channel per user and relays from it.
+"""
+import os
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Put on a subscriber's queue to end its stream
+_CLOSE = object()
+
+
+def events_config_from_env():
+    """Read event broker settings from the environment."""
+    return {
+        'backend': os.getenv('TASK_EVENTS_BACKEND', 'memory'),
+        'queue_size': int(os.getenv('TASK_EVENTS_QUEUE_SIZE', 256)),
+        'keepalive': float(os.getenv('TASK_EVENTS_KEEPALIVE', 15)),
+        'redis_url': os.getenv('TASK_EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+    }
+
+
+def format_sse(event, data):
+    """One Server-Sent Events message; data is already a JSON string."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """One open event stream for a user."""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=queue_size)
+
+
+class EventBroker:
+    """In-process fan-out of user events to that user's subscribers."""
+
+    backend = 'memory'
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'delivered': 0, 'overflows': 0}
+
+    def start(self):
+        """Start any background relay; called once in each serving process."""
+
+    def stream(self, user_id, keepalive=15):
+        """Yield SSE messages for user_id, with a comment line every keepalive seconds.
+
+        The subscription exists only while the generator is being consumed,
+        so a client that disconnects is removed when the server closes it.
+        """
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        try:
+            yield format_sse('ready', '{}')
+            while True:
+                try:
+                    message = subscription.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    # Keeps proxies from timing out and detects closed clients
+                    yield ': keepalive\n\n'
+                    continue
+                if message is _CLOSE:
+                    yield format_sse('resync', '{}')
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event, data):
+        """Send event (e.g. 'task.created') with a JSON-serialised data string."""
+        with self._lock:
+            self._stats['published'] += 1
+        self._deliver(user_id, format_sse(event, data))
+
+    def _deliver(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+                delivered = True
+            except queue.Full:
+                delivered = False
+                self._overflow(subscription)
+            with self._lock:
+                self._stats['delivered' if delivered else 'overflows'] += 1
+
+    def _overflow(self, subscription):
+        """Cut off a subscriber that stopped reading; it resyncs on reconnect."""
+        self.unsubscribe(subscription)
+        while True:
+            try:
+                subscription.queue.get_nowait()
+            except queue.Empty:
+                break
+        subscription.queue.put_nowait(_CLOSE)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['users'] = len(self._subscribers)
+            stats['subscribers'] = sum(len(subs) for subs in self._subscribers.values())
+        stats['backend'] = self.backend
+        return stats
+
+
+class RedisEventBroker(EventBroker):
+    """Broker whose events travel through Redis pub/sub to every process."""
+
+    backend = 'redis'
+    CHANNEL_PREFIX = 'task_events:'
+
+    def __init__(self, queue_size=256, redis_url='redis://localhost:6379/0'):
+        import redis  # optional dependency, only needed for this backend
+
+        super().__init__(queue_size)
+        self._client = redis.Redis.from_url(redis_url)
+        self._stats['errors'] = 0
+        self._thread = None
+
+    def start(self):
+        """Subscribe and start the relay thread; its connection belongs to this process."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.psubscribe(f'{self.CHANNEL_PREFIX}*')
+            self._thread = threading.Thread(target=self._listen, name='task-events-redis', daemon=True)
+            self._thread.start()
+
+    def publish(self, user_id, event, data):
+        with self._lock:
+            self._stats['published'] += 1
+        try:
+            self._client.publish(f'{self.CHANNEL_PREFIX}{user_id}', format_sse(event, data))
+        except Exception as e:
+            logger.warning("Redis event publish failed: %s", e)
+            with self._lock:
+                self._stats['errors'] += 1
+
+    def _listen(self):
+        for message in self._pubsub.listen():
+            try:
+                user_id = message['channel'].decode('utf-8')[len(self.CHANNEL_PREFIX):]
+                self._deliver(user_id, message['data'].decode('utf-8'))
+            except Exception as e:
+                logger.warning("Redis event relay failed: %s", e)
+
+
+class NullEventBroker(EventBroker):
+    """Broker that drops every event, for turning events off."""
+
+    backend = 'none'
+
+    def publish(self, user_id, event, data):
+        pass
+
+
+def create_event_broker(backend='memory', queue_size=256, redis_url=None, **_):
+    """Build the broker selected in config ('memory', 'redis' or 'none')."""
+    if backend == 'redis':
+        return RedisEventBroker(queue_size, redis_url=redis_url)
+    if backend == 'none':
+        return NullEventBroker(queue_size)
+    return EventBroker(queue_size)
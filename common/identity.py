@@ -0,0 +1,20 @@
+"""Caller identity passed from the gateway to the backend services.
+
+The gateway verifies the JWT and sends the user_id from its claims in
+USER_ID_HEADER. Services only listen on localhost behind the gateway, so they
+trust the header as given. Direct calls without it keep the old behaviour.
+"""
+from flask import request
+
+USER_ID_HEADER = 'X-User-Id'
+
+
+def trusted_user_id():
+    """user_id the gateway verified for this request, or None when called directly."""
+    return request.headers.get(USER_ID_HEADER) or None
+
+
+def is_owner(user_id):
+    """True unless the gateway identified a caller other than user_id."""
+    caller = trusted_user_id()
+    return caller is None or caller == user_id
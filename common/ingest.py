@@ -0,0 +1,205 @@
+import os
+import json
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_config_from_env(prefix):
+    """Read queue settings such as <prefix>_FLUSH_INTERVAL from the environment."""
+    return {
+        'max_pending': int(os.getenv(f'{prefix}_MAX_PENDING', 10000)),
+        'max_batch': int(os.getenv(f'{prefix}_MAX_BATCH', 500)),
+        'flush_interval': float(os.getenv(f'{prefix}_FLUSH_INTERVAL', 1.0)),
+        'spool_path': os.getenv(f'{prefix}_SPOOL_PATH') or None
+    }
+
+
+class CoalescingQueue:
+    """Bounded in-process queue that folds repeated keys into counters.
+
+    Producers call add(key); a background thread periodically hands the
+    accumulated {key: delta} map to flush_fn in batches of at most max_batch
+    keys. With a spool_path, pending deltas are appended to a JSON-lines file
+    and replayed on startup, so a restart does not lose them.
+
+    A chunk that flush_fn rejects is split in half and each half sent again,
+    so a key the receiver always rejects is isolated and discarded instead of
+    holding back every key batched with it. When both halves fail too, the
+    receiver is taken to be down and the chunk waits for the next flush.
+    """
+
+    def __init__(self, flush_fn, max_pending=10000, max_batch=500,
+                 flush_interval=1.0, spool_path=None, name='ingest'):
+        self.flush_fn = flush_fn
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.name = name
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._spool = None
+        self._stats = {
+            'events': 0,
+            'dropped': 0,
+            'flushes': 0,
+            'flushed_keys': 0,
+            'flush_errors': 0,
+            'discarded': 0
+        }
+
+        self._thread = None
+
+    def start(self):
+        """Replay the spool and start the flusher; called lazily on first use.
+
+        Starting lazily keeps a debug-reloader parent process, which imports the
+        app but never serves requests, from replaying the same spool.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.spool_path:
+                self._replay_spool()
+                self._spool = open(self.spool_path, 'a', encoding='utf-8')
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-flusher', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, key, delta=1):
+        """Record an event without blocking; returns False if the queue is full."""
+        if not key:
+            return False
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                self._stats['dropped'] += 1
+                self._wakeup.set()
+                return False
+            self._pending[key] = self._pending.get(key, 0) + delta
+            self._stats['events'] += 1
+            if self._spool:
+                self._spool.write(json.dumps({'k': key, 'd': delta}) + '\n')
+                self._spool.flush()
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Hand everything pending to flush_fn; chunks that fail are re-queued or split."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            items = list(batch.items())
+            failed = {}
+            flushed = 0
+            for start in range(0, len(items), self.max_batch):
+                chunk = items[start:start + self.max_batch]
+                if self._send(chunk):
+                    flushed += len(chunk)
+                elif len(chunk) > 1:
+                    flushed += self._split_failed(chunk, failed)
+                else:
+                    failed.update(chunk)
+
+            with self._lock:
+                for key, delta in failed.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+                if self._spool:
+                    self._rewrite_spool()
+            return flushed
+
+    def _send(self, chunk):
+        """Pass a list of (key, delta) pairs to flush_fn; True if it was accepted."""
+        try:
+            self.flush_fn(dict(chunk))
+        except Exception as e:
+            logger.warning("%s flush of %d keys failed: %s", self.name, len(chunk), e)
+            with self._lock:
+                self._stats['flush_errors'] += 1
+            return False
+        with self._lock:
+            self._stats['flushes'] += 1
+            self._stats['flushed_keys'] += len(chunk)
+        return True
+
+    def _split_failed(self, chunk, failed):
+        """Bisect a rejected chunk; returns how many of its keys went through.
+
+        Keys that fail on their own while the other half succeeds are
+        discarded. If both halves fail, the chunk is added to failed.
+        """
+        if len(chunk) == 1:
+            key, delta = chunk[0]
+            logger.error("%s discarded %r (delta %d): rejected on its own", self.name, key, delta)
+            with self._lock:
+                self._stats['discarded'] += 1
+            return 0
+
+        middle = len(chunk) // 2
+        halves = [chunk[:middle], chunk[middle:]]
+        sent = [self._send(half) for half in halves]
+        if not any(sent):
+            failed.update(chunk)
+            return 0
+
+        flushed = 0
+        for half, ok in zip(halves, sent):
+            flushed += len(half) if ok else self._split_failed(half, failed)
+        return flushed
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _replay_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path, encoding='utf-8') as spool:
+            for line in spool:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash
+                self._pending[event['k']] = self._pending.get(event['k'], 0) + event['d']
+        logger.info("%s replayed %d pending keys from %s", self.name, len(self._pending), self.spool_path)
+
+    def _rewrite_spool(self):
+        """Compact the spool down to what is still pending (caller holds _lock)."""
+        tmp_path = f'{self.spool_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as tmp:
+            for key, delta in self._pending.items():
+                tmp.write(json.dumps({'k': key, 'd': delta}) + '\n')
+        self._spool.close()
+        os.replace(tmp_path, self.spool_path)
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+    def stats(self):
+        with self._lock:
+            return {'name': self.name, 'pending': len(self._pending), **self._stats}
+
+    def close(self):
+        """Stop the flusher and make a final flush attempt."""
+        if self._thread is None or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        if self._spool:
+            self._spool.close()
+            self._spool = None
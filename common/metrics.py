@@ -0,0 +1,167 @@
+"""In-process latency histograms exposed in Prometheus text format at /metrics.
+
+Each app owns one MetricsRegistry. Observing a value costs one bisect and one
+locked increment, and nothing is formatted until /metrics is scraped. Set
+METRICS_ENABLED=false to skip the instrumentation entirely.
+
+Time spent in upstream calls and the database is also added to per-request
+span totals. The access log reports those totals next to the request ID, so
+one slow request can be followed through the gateway and the service.
+"""
+import os
+import time
+import bisect
+import threading
+
+from flask import Response, g, has_request_context, request
+
+# Seconds; covers sub-millisecond cache hits up to upstream timeouts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_enabled_from_env():
+    return os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _series_order(item):
+    # A label can hold both ints and strings (status 200 and 'error'), which don't compare
+    return tuple(str(value) for value in item[0])
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count)
+                        for labels, (counts, total, count) in self._series.items()}
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(snapshot.items(), key=_series_order):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{le} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Histograms plus gauges read from callbacks at scrape time."""
+
+    def __init__(self, service):
+        self.service = service
+        self._histograms = {}
+        self._gauges = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Return the histogram called name, creating it on first use."""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, labelnames, buckets)
+            return self._histograms[name]
+
+    def gauge(self, name, help_text, labelnames, collect):
+        """Register a gauge whose samples collect() returns as {label_values: value}."""
+        with self._lock:
+            self._gauges.append((name, help_text, tuple(labelnames), collect))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = list(self._histograms.values())
+            gauges = list(self._gauges)
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        for name, help_text, labelnames, collect in gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in sorted(collect().items(), key=_series_order):
+                lines.append(f'{name}{_labels(labelnames, labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def add_span(name, seconds):
+    """Add seconds to the current request's total for name (e.g. 'db_query')."""
+    if has_request_context():
+        spans = g.setdefault('spans', {})
+        spans[name] = spans.get(name, 0.0) + seconds
+
+
+def request_spans():
+    """The current request's span totals in milliseconds, or None."""
+    spans = g.get('spans')
+    if not spans:
+        return None
+    return {name: round(seconds * 1000, 2) for name, seconds in spans.items()}
+
+
+def init_metrics(app, service):
+    """Create the app's registry, time every request by route and serve /metrics."""
+    if not app.config.get('METRICS_ENABLED', True):
+        app.extensions['metrics'] = None
+        return None
+
+    registry = MetricsRegistry(service)
+    app.extensions['metrics'] = registry
+    requests_histogram = registry.histogram(
+        'http_request_duration_seconds', 'Time to handle a request, by route.',
+        ('service', 'method', 'route', 'status')
+    )
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            # The route pattern, not the path, keeps the label set bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            requests_histogram.observe(
+                time.perf_counter() - start, service, request.method, route, response.status_code
+            )
+        return response
+
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', metrics, methods=['GET'])
+    return registry
@@ -0,0 +1,68 @@
+"""Running the services under gunicorn, and the hooks each worker process runs.
+
+The Flask development server remains the default for local work. With
+SERVE_MODE=production, manage_services.sh starts every service under gunicorn
+with gunicorn.conf.py from the project root.
+
+Anything that owns a socket or a thread must be set up in the worker that
+uses it, not in the gunicorn master before it forks. This covers pre-opened
+MySQL connections, the reminder scheduler, the Redis event listener and the
+suggestion index. Two processes writing to one inherited socket interleave
+their traffic, and a thread does not survive the fork. Such setup is
+registered with on_worker_start(). Under gunicorn it runs from the
+post_worker_init hook; anywhere else it runs immediately.
+
+State kept per process, such as the memory cache and event broker, is only
+correct with one worker. Apps using it call require_single_worker().
+"""
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def debug_from_env():
+    """Debug mode (reloader and interactive tracebacks) only when FLASK_DEBUG asks for it."""
+    return os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+
+
+def under_gunicorn():
+    """True in a gunicorn master or worker; the arbiter sets SERVER_SOFTWARE before loading the app."""
+    return 'gunicorn' in os.getenv('SERVER_SOFTWARE', '')
+
+
+def on_worker_start(app, fn):
+    """Run fn in every process that serves requests: now, or once a gunicorn worker has forked."""
+    if under_gunicorn():
+        app.extensions.setdefault('worker_start', []).append(fn)
+    else:
+        fn()
+
+
+def require_single_worker(app, reason):
+    """Mark an app whose in-process state is only correct when one worker serves it.
+
+    gunicorn.conf.py refuses to start such an app with more than one worker.
+    """
+    app.extensions.setdefault('single_worker', []).append(reason)
+
+
+def single_worker_reasons(app):
+    """Why an app must run in one worker process; empty if it may run in several."""
+    extensions = getattr(app, 'extensions', None)
+    if not isinstance(extensions, dict):
+        return []
+    return list(extensions.get('single_worker', ()))
+
+
+def start_worker(app):
+    """Run the functions registered with on_worker_start(); called by gunicorn.conf.py."""
+    extensions = getattr(app, 'extensions', None)
+    if not isinstance(extensions, dict):
+        return
+    for fn in extensions.get('worker_start', ()):
+        try:
+            fn()
+        except Exception:
+            # Warm-up is best effort; the worker still serves, as the dev server would
+            logger.exception("Worker start hook %s failed", getattr(fn, '__qualname__', fn))
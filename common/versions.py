@@ -0,0 +1,95 @@
+"""Per-key version counters behind the ETags on list and suggestion reads.
+
+A write advances the counter of the key it affects, such as a user_id. A read
+takes the counter value before it touches the database and uses it as a weak
+ETag. A later request whose If-None-Match matches the current value gets a 304
+without the database being queried.
+
+The memory counters prefix every value with a random per-process epoch. After
+a restart, or on another worker process, ETags therefore stop matching rather
+than matching data they do not describe. With several worker processes, the
+redis backend shares one counter per key so revalidation works on any worker.
+"""
+import uuid
+import logging
+import threading
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+
+class VersionCounter:
+    """In-process counters."""
+
+    backend = 'memory'
+
+    def __init__(self, name='versions'):
+        self.name = name
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def current(self, key):
+        """The key's version as an opaque string, or None if it cannot be read."""
+        with self._lock:
+            return f"{self.epoch}.{self._versions.get(key, 0)}"
+
+    def bump(self, key):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+
+class RedisVersionCounter:
+    """Counters shared by every worker process through a local Redis server."""
+
+    backend = 'redis'
+
+    def __init__(self, name='versions', redis_url='redis://localhost:6379/0'):
+        import redis  # optional dependency, only needed for this backend
+
+        self.name = name
+        self._client = redis.Redis.from_url(redis_url)
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def current(self, key):
+        try:
+            value = self._client.get(self._key(key))
+        except Exception as e:
+            # No version means no ETag, so the read is served in full
+            logger.warning("Redis version %s read failed: %s", self.name, e)
+            return None
+        return value.decode('ascii') if value is not None else '0'
+
+    def bump(self, key):
+        try:
+            self._client.incr(self._key(key))
+        except Exception as e:
+            logger.warning("Redis version %s bump failed: %s", self.name, e)
+
+
+def create_version_counter(name, backend='memory', redis_url=None, **_):
+    """Counters for the cache backend in use: shared with 'redis', in-process otherwise."""
+    if backend == 'redis':
+        return RedisVersionCounter(name, redis_url=redis_url)
+    return VersionCounter(name)
+
+
+def etag_matches(version):
+    """True when the request's If-None-Match already names this version."""
+    return version is not None and request.if_none_match.contains_weak(version)
+
+
+def not_modified(version, cache_control):
+    response = Response(status=304)
+    return with_etag(response, version, cache_control)
+
+
+def with_etag(response, version, cache_control):
+    """Attach the version's weak ETag and the Cache-Control policy to a response."""
+    if version is not None:
+        response.set_etag(version, weak=True)
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,226 @@
+"""Versioned schema migrations for todo_db.
+
+Migrations are the numbered files in database/migrations/ (NNNN_name.sql) and
+are applied in order. Each applied version is recorded in schema_migrations
+along with a checksum of its file.
+
+    python database/migrate.py status   # list applied and pending migrations
+    python database/migrate.py up       # apply every pending migration
+    python database/migrate.py check    # EXPLAIN each service query, fail if one scans
+
+Connection settings come from the same .env as the services (DB_HOST, DB_PORT,
+DB_USER, DB_PASSWORD, DB_NAME).
+"""
+import os
+import re
+import sys
+import hashlib
+import argparse
+
+import mysql.connector
+from dotenv import load_dotenv
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+# Queries issued by the services, with sample parameters for EXPLAIN. Keep in
+# step with the SQL in task_service/, suggestion_service/ and auth_service/.
+SERVICE_QUERIES = [
+    ('auth.user_by_email',
+     "SELECT * FROM users WHERE email = %s", ('user@example.com',)),
+    ('auth.refresh_token',
+     """SELECT r.token_id, r.family_id, r.user_id, r.token_hmac, r.expires_at,
+               r.revoked_at, r.replaced_by, u.email
+        FROM refresh_tokens r JOIN users u ON u.user_id = r.user_id
+        WHERE r.token_id = %s FOR UPDATE""", ('0' * 32,)),
+    ('auth.refresh_family',
+     """UPDATE refresh_tokens SET revoked_at = UTC_TIMESTAMP()
+        WHERE family_id = %s AND revoked_at IS NULL""", ('0' * 32,)),
+    ('task.by_id',
+     "SELECT * FROM tasks WHERE task_id = %s", ('00000000-0000-0000-0000-000000000000',)),
+    ('task.pending',
+     """SELECT * FROM tasks
+        WHERE user_id = %s AND is_completed = FALSE
+        ORDER BY created_at DESC""", ('00000000-0000-0000-0000-000000000000',)),
+    ('task.history',
+     """SELECT * FROM tasks
+        WHERE user_id = %s AND is_completed = TRUE
+        ORDER BY completed_at DESC""", ('00000000-0000-0000-0000-000000000000',)),
+    ('task.by_status',
+     """SELECT * FROM tasks
+        WHERE user_id = %s AND is_completed = %s
+        ORDER BY
+            CASE
+                WHEN deadline IS NOT NULL THEN deadline
+                ELSE created_at
+            END ASC""", ('00000000-0000-0000-0000-000000000000', False)),
+    ('task.pending_page',
+     """SELECT task_id, task_text, deadline, created_at AS sort_key FROM tasks
+        WHERE user_id = %s AND is_completed = %s
+        AND (created_at < %s OR (created_at = %s AND task_id < %s))
+        ORDER BY created_at DESC, task_id DESC LIMIT %s""",
+     ('00000000-0000-0000-0000-000000000000', False, '2030-01-01 00:00:00',
+      '2030-01-01 00:00:00', 'ffffffff', 51)),
+    ('task.by_status_page',
+     """SELECT *, CASE WHEN deadline IS NOT NULL THEN deadline ELSE created_at END AS sort_key
+        FROM tasks WHERE user_id = %s AND is_completed = %s
+        ORDER BY CASE WHEN deadline IS NOT NULL THEN deadline ELSE created_at END ASC, task_id ASC
+        LIMIT %s""", ('00000000-0000-0000-0000-000000000000', False, 51)),
+    ('task.export',
+     """SELECT * FROM tasks
+        WHERE user_id = %s
+        ORDER BY is_completed ASC, created_at ASC""", ('00000000-0000-0000-0000-000000000000',)),
+    ('task.reminder_window',
+     """SELECT task_id, reminder FROM tasks
+        WHERE is_completed = FALSE
+        AND (reminder > %s OR (reminder = %s AND task_id > %s))
+        AND reminder <= %s AND reminder_sent_at IS NULL
+        ORDER BY reminder, task_id LIMIT %s""",
+     ('2030-01-01 00:00:00', '2030-01-01 00:00:00', '', '2030-01-01 01:00:00', 10000)),
+    ('task.deadline_window',
+     """SELECT task_id, deadline FROM tasks
+        WHERE is_completed = FALSE
+        AND (deadline > %s OR (deadline = %s AND task_id > %s))
+        AND deadline <= %s AND deadline_sent_at IS NULL
+        ORDER BY deadline, task_id LIMIT %s""",
+     ('2030-01-01 00:00:00', '2030-01-01 00:00:00', '', '2030-01-01 01:00:00', 10000)),
+    ('suggestion.by_text',
+     "SELECT task_text, frequency FROM task_suggestions WHERE task_text = %s", ('buy milk',)),
+    ('suggestion.like_fallback',
+     """SELECT task_text, frequency
+        FROM task_suggestions
+        WHERE task_text LIKE %s
+        ORDER BY frequency DESC
+        LIMIT 10""", ('%milk%',)),
+]
+
+
+def get_connection():
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+    return mysql.connector.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', 3306)),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        database=os.getenv('DB_NAME', 'todo_db')
+    )
+
+
+def discover_migrations():
+    """Return [(version, name, path)] for every migration file, in version order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def split_statements(sql):
+    """Split a migration file into statements, dropping full-line comments."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+
+def checksum(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(16) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_migrations(cursor):
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def status(conn):
+    cursor = conn.cursor()
+    ensure_migrations_table(cursor)
+    applied = applied_migrations(cursor)
+    for version, name, path in discover_migrations():
+        if version not in applied:
+            state = 'pending'
+        elif applied[version] != checksum(path):
+            state = 'applied (file changed since)'
+        else:
+            state = 'applied'
+        print(f"{version} {name}: {state}")
+    cursor.close()
+    return 0
+
+
+def up(conn):
+    cursor = conn.cursor()
+    ensure_migrations_table(cursor)
+    applied = applied_migrations(cursor)
+    pending = [m for m in discover_migrations() if m[0] not in applied]
+
+    if not pending:
+        print("Database is up to date")
+    for version, name, path in pending:
+        print(f"Applying {version} {name}...")
+        with open(path) as f:
+            statements = split_statements(f.read())
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (version, name, checksum(path))
+            )
+            conn.commit()
+        except mysql.connector.Error as err:
+            # DDL commits implicitly in MySQL, so a failed migration may be half applied
+            conn.rollback()
+            print(f"Migration {version} failed: {err}")
+            return 1
+    cursor.close()
+    return 0
+
+
+def check(conn):
+    """EXPLAIN every service query and report any that scan or sort without an index."""
+    cursor = conn.cursor(dictionary=True)
+    failures = 0
+    for name, query, params in SERVICE_QUERIES:
+        cursor.execute(f"EXPLAIN {query}", params)
+        for row in cursor.fetchall():
+            extra = row.get('Extra') or ''
+            problems = []
+            if row.get('key') is None:
+                problems.append('no index used')
+            if row.get('type') == 'ALL':
+                problems.append('full table scan')
+            if 'Using filesort' in extra:
+                problems.append('filesort')
+            verdict = 'FAIL (' + ', '.join(problems) + ')' if problems else 'ok'
+            print(f"{name}: table={row.get('table')} type={row.get('type')} key={row.get('key')} {verdict}")
+            failures += bool(problems)
+    cursor.close()
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply and verify todo_db schema migrations.')
+    parser.add_argument('command', nargs='?', default='up', choices=['status', 'up', 'check'])
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        return {'status': status, 'up': up, 'check': check}[args.command](conn)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
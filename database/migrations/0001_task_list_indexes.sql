@@ -0,0 +1,15 @@
+-- Composite indexes matching the task_service list queries, so each one reads
+-- a single user's slice in index order instead of scanning and sorting.
+
+-- get_tasks: WHERE user_id = ? AND is_completed = FALSE ORDER BY created_at DESC
+CREATE INDEX idx_tasks_user_status_created
+    ON tasks (user_id, is_completed, created_at);
+
+-- get_task_history: WHERE user_id = ? AND is_completed = TRUE ORDER BY completed_at DESC
+CREATE INDEX idx_tasks_user_status_completed
+    ON tasks (user_id, is_completed, completed_at);
+
+-- get_tasks_by_status: ORDER BY CASE WHEN deadline IS NOT NULL THEN deadline ELSE created_at END
+-- Functional key part (MySQL 8.0.13+); the expression must match the query text.
+CREATE INDEX idx_tasks_user_status_due
+    ON tasks (user_id, is_completed, (CASE WHEN deadline IS NOT NULL THEN deadline ELSE created_at END));
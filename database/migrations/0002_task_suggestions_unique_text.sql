@@ -0,0 +1,20 @@
+-- add_suggestion relies on INSERT ... ON DUPLICATE KEY UPDATE, which only
+-- increments when task_text is a unique key. Without one every insert added a
+-- new row, so fold existing duplicates into the oldest row first.
+
+UPDATE task_suggestions s
+JOIN (
+    SELECT MIN(suggestion_id) AS keep_id, SUM(frequency) AS total
+    FROM task_suggestions
+    GROUP BY task_text
+    HAVING COUNT(*) > 1
+) d ON s.suggestion_id = d.keep_id
+SET s.frequency = d.total;
+
+DELETE s FROM task_suggestions s
+JOIN task_suggestions k
+    ON s.task_text = k.task_text AND s.suggestion_id > k.suggestion_id;
+
+ALTER TABLE task_suggestions
+    ADD UNIQUE KEY uq_task_suggestions_text (task_text),
+    ADD KEY idx_task_suggestions_frequency (frequency);
@@ -0,0 +1,20 @@
+-- Rotating refresh tokens for POST /refresh.
+--
+-- Only an HMAC of each token's secret is stored. token_id is the primary key,
+-- so a refresh is a single-row lookup. Tokens rotated from the same login
+-- share a family_id, so a reused token can revoke the whole family at once.
+-- Times are UTC.
+
+CREATE TABLE refresh_tokens (
+    token_id CHAR(32) PRIMARY KEY,
+    family_id CHAR(32) NOT NULL,
+    user_id VARCHAR(36) NOT NULL,
+    token_hmac CHAR(64) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NOT NULL,
+    revoked_at DATETIME NULL,
+    replaced_by CHAR(32) NULL,
+    INDEX idx_refresh_tokens_family (family_id),
+    INDEX idx_refresh_tokens_user (user_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
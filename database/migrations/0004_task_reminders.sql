@@ -0,0 +1,17 @@
+-- Server-side reminder and deadline events (task_service/reminders.py).
+--
+-- The scheduler reads the next window of due times with a range query on
+-- (is_completed, reminder) and (is_completed, deadline), so it never scans
+-- the table. *_sent_at records that an event fired. A worker claims an event
+-- by setting this column, so the event fires once across processes and
+-- restarts. Editing the time clears the column again. Times are UTC.
+
+ALTER TABLE tasks
+    ADD COLUMN reminder_sent_at DATETIME NULL,
+    ADD COLUMN deadline_sent_at DATETIME NULL;
+
+CREATE INDEX idx_tasks_status_reminder
+    ON tasks (is_completed, reminder);
+
+CREATE INDEX idx_tasks_status_deadline
+    ON tasks (is_completed, deadline);
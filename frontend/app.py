@@ -0,0 +1,91 @@
+"""Static file server for the frontend.
+
+Serves the pages and assets at the URLs `python -m http.server` used, e.g.
+/templates/login.html and /static/js/tasks.js. With FRONTEND_ASSETS=dist
+they come from the output of build.py. Fingerprinted assets are cached for
+a year without revalidation, and any file with a precompressed sibling is
+sent as br or gzip to the clients that accept it. With FRONTEND_ASSETS=source
+(the default) the files in the tree are served as they are and revalidated
+on every load, so edits show up without a build.
+"""
+import os
+import sys
+import mimetypes
+
+from flask import Flask, abort, redirect, request, send_file
+from werkzeug.security import safe_join
+from dotenv import load_dotenv
+
+FRONTEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(FRONTEND_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.compression import choose_encoding
+from common.serving import debug_from_env
+from build import DIST_DIR, FINGERPRINT, PRECOMPRESSED_SUFFIXES
+
+# A fingerprinted name never changes content, so it never needs revalidating
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Pages and unfingerprinted files: cached, but checked with If-Modified-Since on every use
+REVALIDATE = 'no-cache'
+
+
+def frontend_config_from_env():
+    """Read static file settings from the environment."""
+    assets = os.getenv('FRONTEND_ASSETS', 'source')
+    return {
+        'assets': assets,
+        'root': os.getenv('FRONTEND_DIST_DIR', DIST_DIR) if assets == 'dist' else FRONTEND_DIR
+    }
+
+
+def create_app():
+    load_dotenv()
+
+    app = Flask(__name__, static_folder=None)
+    app.debug = debug_from_env()
+    app.config['FRONTEND'] = frontend_config_from_env()
+    config = app.config['FRONTEND']
+    built = config['assets'] == 'dist'
+    if built and not os.path.isdir(config['root']):
+        raise RuntimeError(f"No frontend build in {config['root']}; run frontend/build.py first")
+
+    @app.route('/')
+    def index():
+        return redirect('/templates/login.html')
+
+    @app.route('/<path:path>')
+    def serve(path):
+        filename = safe_join(config['root'], path)
+        if filename is None or not os.path.isfile(filename):
+            abort(404)
+
+        # Only a build writes precompressed siblings
+        encodings = [
+            coding for coding, suffix in PRECOMPRESSED_SUFFIXES.items()
+            if built and os.path.isfile(filename + suffix)
+        ]
+        coding = choose_encoding(request.headers.get('Accept-Encoding'), encodings)
+        response = send_file(
+            filename + PRECOMPRESSED_SUFFIXES[coding] if coding else filename,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            download_name=os.path.basename(filename),
+            conditional=True
+        )
+        if coding:
+            response.headers['Content-Encoding'] = coding
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        fingerprinted = built and FINGERPRINT.search(path) is not None
+        response.headers['Cache-Control'] = IMMUTABLE if fingerprinted else REVALIDATE
+        return response
+
+    return app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    app.run(port=int(os.getenv('FRONTEND_PORT', 8080)), threaded=True)
@@ -0,0 +1,147 @@
+"""Build the frontend for production: minified, fingerprinted and precompressed.
+
+    python frontend/build.py [--out frontend/dist]
+
+Every file under static/ is copied to dist/static/ under a content-hash
+name, e.g. js/tasks.3f2a9c1b7d.js; JS and CSS are minified first. The pages
+in templates/ are rewritten to point at those names and copied to
+dist/templates/. A built asset's name changes exactly when its content
+does, so app.py can let browsers cache it for a year without revalidating.
+The pages themselves stay revalidated on every load.
+
+Text files also get .gz and, with brotli installed, .br siblings. They are
+compressed once at the highest level, so the server never compresses a
+static file per request. manifest.json maps each source path to its built
+name. Fingerprinted files from earlier builds are kept, so a page loaded
+just before a rebuild still finds its assets; delete dist/ to prune them.
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import posixpath
+
+FRONTEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(FRONTEND_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.compression import brotli_module
+
+DIST_DIR = os.path.join(FRONTEND_DIR, 'dist')
+
+HASH_LENGTH = 10
+
+# Matches the content hash build() puts in an asset's name, e.g. tasks.3f2a9c1b7d.js
+FINGERPRINT = re.compile(r'\.[0-9a-f]{%d}\.[^./]+$' % HASH_LENGTH)
+
+# Precompressed siblings written next to each text file, by content coding
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+TEXT_EXTENSIONS = ('.html', '.js', '.css', '.svg', '.json', '.txt')
+
+# Development tooling that lives under static/ but is never loaded by a page
+SKIP = ('generate-favicon.js',)
+
+ASSET_REFERENCE = re.compile(r'\b(src|href)="([^"#?]+)"')
+
+
+def minify(name, data):
+    """Minified JS or CSS; other files unchanged."""
+    if name.endswith('.js'):
+        import rjsmin  # build-time dependency, only needed for this step
+        return rjsmin.jsmin(data.decode('utf-8')).encode('utf-8')
+    if name.endswith('.css'):
+        import rcssmin  # build-time dependency, only needed for this step
+        return rcssmin.cssmin(data.decode('utf-8')).encode('utf-8')
+    return data
+
+
+def fingerprinted_name(path, data):
+    base, ext = posixpath.splitext(path)
+    return f'{base}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def write_precompressed(path, data):
+    """Write .gz and .br siblings for a text file when they are smaller."""
+    if not path.endswith(TEXT_EXTENSIONS):
+        return
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = brotli_module()
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    for coding, suffix in PRECOMPRESSED_SUFFIXES.items():
+        compressed = variants.get(coding)
+        if compressed is not None and len(compressed) < len(data):
+            write_file(path + suffix, compressed)
+        elif os.path.exists(path + suffix):
+            # Left by an earlier build of a page; it would be served in place of the new one
+            os.remove(path + suffix)
+
+
+def rewrite_references(html, page_url, manifest):
+    """Point a page's src and href attributes at the fingerprinted assets."""
+    def replace(match):
+        attribute, ref = match.groups()
+        if '://' in ref or ref.startswith('//'):
+            return match.group(0)
+        url = posixpath.normpath(posixpath.join(posixpath.dirname(page_url), ref))
+        built = manifest.get(url)
+        return f'{attribute}="{built}"' if built else match.group(0)
+
+    return ASSET_REFERENCE.sub(replace, html)
+
+
+def build(out_dir=DIST_DIR):
+    """Build static/ and templates/ into out_dir; return the manifest."""
+    manifest = {}
+    static_dir = os.path.join(FRONTEND_DIR, 'static')
+    for root, _, files in os.walk(static_dir):
+        for filename in sorted(files):
+            if filename in SKIP or filename.startswith('.'):
+                continue
+            source = os.path.join(root, filename)
+            path = posixpath.join('static', os.path.relpath(source, static_dir).replace(os.sep, '/'))
+            with open(source, 'rb') as f:
+                data = minify(filename, f.read())
+            built = fingerprinted_name(path, data)
+            target = os.path.join(out_dir, *built.split('/'))
+            write_file(target, data)
+            write_precompressed(target, data)
+            manifest['/' + path] = '/' + built
+
+    templates_dir = os.path.join(FRONTEND_DIR, 'templates')
+    for filename in sorted(os.listdir(templates_dir)):
+        if not filename.endswith('.html'):
+            continue
+        with open(os.path.join(templates_dir, filename), encoding='utf-8') as f:
+            html = rewrite_references(f.read(), f'/templates/{filename}', manifest)
+        target = os.path.join(out_dir, 'templates', filename)
+        data = html.encode('utf-8')
+        write_file(target, data)
+        write_precompressed(target, data)
+
+    write_file(os.path.join(out_dir, 'manifest.json'),
+               json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=DIST_DIR, help='output directory (default frontend/dist)')
+    args = parser.parse_args()
+    manifest = build(args.out)
+    print(f"Built {len(manifest)} assets into {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,78 @@
 // const API_URL = 'http://127.0.0.1:5000';
 
+// Refresh the access token this long before it expires
+const TOKEN_REFRESH_MARGIN_MS = 60 * 1000;
+
+let refreshInFlight = null;
+
+function storeTokens(data) {
+    localStorage.setItem('token', data.token);
+    localStorage.setItem('userId', data.user_id);
+    if (data.refresh_token) {
+        localStorage.setItem('refreshToken', data.refresh_token);
+        localStorage.setItem('tokenExpiresAt', String(Date.now() + data.expires_in * 1000));
+    }
+}
+
+function clearTokens() {
+    ['token', 'refreshToken', 'tokenExpiresAt', 'userId'].forEach(key => localStorage.removeItem(key));
+}
+
+// Exchange the refresh token for a new access token. Concurrent callers share one request.
+function refreshAccessToken() {
+    if (!refreshInFlight) {
+        refreshInFlight = (async () => {
+            const refreshToken = localStorage.getItem('refreshToken');
+            if (!refreshToken) {
+                return false;
+            }
+            const response = await fetch(`http://127.0.0.1:5000/auth/refresh`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ refresh_token: refreshToken })
+            });
+            if (!response.ok) {
+                // Another tab may have rotated the token first and stored the new one
+                return localStorage.getItem('refreshToken') !== refreshToken;
+            }
+            storeTokens(await response.json());
+            return true;
+        })().catch(() => false).finally(() => {
+            refreshInFlight = null;
+        });
+    }
+    return refreshInFlight;
+}
+
+// fetch() for gateway calls that need a token: refreshes silently before expiry and once on a 401
+async function authFetch(url, options = {}) {
+    const expiresAt = Number(localStorage.getItem('tokenExpiresAt') || 0);
+    if (expiresAt && Date.now() > expiresAt - TOKEN_REFRESH_MARGIN_MS) {
+        await refreshAccessToken();
+    }
+
+    const send = () => fetch(url, {
+        ...options,
+        headers: {
+            ...(options.headers || {}),
+            'Authorization': `Bearer ${localStorage.getItem('token')}`
+        }
+    });
+
+    let response = await send();
+    if (response.status === 401 && localStorage.getItem('refreshToken')) {
+        if (await refreshAccessToken()) {
+            response = await send();
+        } else {
+            clearTokens();
+            window.location.href = 'login.html';
+        }
+    }
+    return response;
+}
+
 // Login functionality
 document.getElementById('loginForm')?.addEventListener('submit', async (e) => {
     e.preventDefault();
@@ -22,8 +95,7 @@ document.getElementById('loginForm')?.addEventListener('submit', async (e) => {
         const data = await response.json();
 
         if (response.ok) {
-            localStorage.setItem('token', data.token);
-            localStorage.setItem('userId', data.user_id);
+            storeTokens(data);
             window.location.href = '/templates/index.html';
         } else {
             showError(data.error);
@@ -251,8 +323,19 @@ document.getElementById('logoutForm')?.addEventListener('submit', (e) => {
     // e.preventDefault();
     try{
         console.log('Logging out');
-        localStorage.removeItem('token');
-        localStorage.removeItem('userId');
+        const refreshToken = localStorage.getItem('refreshToken');
+        if (refreshToken) {
+            // Revoke the refresh token; keepalive lets the request outlive the page
+            fetch(`http://127.0.0.1:5000/auth/logout`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+                keepalive: true
+            });
+        }
+        clearTokens();
 
         window.location.href = 'login.html';
         console.log('Logged out');
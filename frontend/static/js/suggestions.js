@@ -20,12 +20,15 @@ async function fetchSuggestions() {
     const query = taskInput.value;
 
     try {
-        const response = await fetch(`http://127.0.0.1:5000/suggestions?q=${encodeURIComponent(query)}`, {
+        const response = await authFetch(`http://127.0.0.1:5000/suggestions?q=${encodeURIComponent(query)}`, {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
         });
 
+        // Rate limited by the gateway: keep the suggestions already shown
+        if (response.status === 429) return;
+
         const suggestions = await response.json();
         displaySuggestions(suggestions);
     } catch (error) {
@@ -15,7 +15,7 @@ async function fetchTasks() {
     const userId = localStorage.getItem('userId');
 
     try {
-        const response = await fetch(`http://127.0.0.1:5000/tasks/${userId}`, {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks/${userId}`, {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -47,12 +47,16 @@ function renderTasks(tasks) {
     });
 }
 
+// Rendered tasks by id, so a partial update event can redraw the whole row
+const renderedTasks = new Map();
+
 // Create task element
 function createTaskElement(task) {
     const taskElement = document.createElement('div');
     taskElement.className = 'task-item';
     taskElement.dataset.taskId = task.task_id;
     taskElement.dataset.deadline = task.deadline || '';
+    renderedTasks.set(task.task_id, task);
     
     const timeInfo = task.deadline ? calculateTimeRemaining(task.deadline, task.completed_at, task) : null;
     
@@ -209,7 +213,7 @@ document.getElementById('taskForm')?.addEventListener('submit', async (e) => {
     const userId = localStorage.getItem('userId');
 
     try {
-        const response = await fetch(`http://127.0.0.1:5000/tasks`, {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks`, {
             method: 'POST',
             headers: {
                 'Authorization': `Bearer ${token}`,
@@ -225,7 +229,9 @@ document.getElementById('taskForm')?.addEventListener('submit', async (e) => {
         if (response.ok) {
             document.getElementById('taskInput').value = '';
             document.getElementById('deadline').value = '';
-            fetchTasks();
+            // Shown from the response; the event stream may be served by another worker
+            applyTaskEvent('task.created', await response.json());
+            reloadIfNotLive(fetchTasks);
         }
     } catch (error) {
         console.error('Error adding task:', error);
@@ -237,7 +243,7 @@ async function toggleTaskComplete(taskId) {
     const token = checkAuth();
 
     try {
-        const response = await fetch(`http://127.0.0.1:5000/tasks/complete/${taskId}`, {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks/complete/${taskId}`, {
             method: 'PUT',
             headers: {
                 'Authorization': `Bearer ${token}`
@@ -245,7 +251,8 @@ async function toggleTaskComplete(taskId) {
         });
 
         if (response.ok) {
-            fetchTasks();
+            applyTaskEvent('task.completed', { task_id: taskId });
+            reloadIfNotLive(fetchTasks);
         }
     } catch (error) {
         console.error('Error toggling task:', error);
@@ -353,7 +360,7 @@ function createTaskForm() {
 // Modify the toggleTaskStatus function
 async function toggleTaskStatus(taskId) {
     try {
-        const response = await fetch(`http://127.0.0.1:5000/tasks/complete/${taskId}`, {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks/complete/${taskId}`, {
             method: 'PUT',
             headers: {
                 'Authorization': `Bearer ${localStorage.getItem('token')}`,
@@ -362,8 +369,9 @@ async function toggleTaskStatus(taskId) {
         });
 
         if (response.ok) {
+            applyTaskEvent('task.completed', { task_id: taskId });
             // Refresh the tasks
-            await fetchTasks();
+            await reloadIfNotLive(fetchTasks);
         } else {
             const data = await response.json();
             showError(data.error || 'Failed to update task status');
@@ -433,7 +441,7 @@ async function loadTasks(status) {
 
         tasksContainer.innerHTML = '<p class="loading">Loading tasks...</p>';
 
-        const response = await fetch(`http://127.0.0.1:5000/tasks?status=${status}&user_id=${userId}`, {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks?status=${status}&user_id=${userId}`, {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -475,8 +483,105 @@ async function loadTasks(status) {
 document.addEventListener('DOMContentLoaded', () => {
     // Load pending tasks by default
     switchTab('pending');
+    listenForTaskEvents();
 });
 
+// Live task updates. The gateway streams this user's task changes as
+// Server-Sent Events, and each one is applied to the rendered list instead of
+// reloading it. fetch() is used rather than EventSource so the request can
+// carry the Authorization header.
+const TASK_EVENTS_RETRY_MS = 3000;
+let taskEventsLive = false;
+
+// Without a live event stream, fall back to reloading the list after a write
+function reloadIfNotLive(reload) {
+    if (!taskEventsLive) {
+        return reload();
+    }
+}
+
+async function listenForTaskEvents() {
+    let connectedBefore = false;
+    while (localStorage.getItem('token')) {
+        try {
+            const response = await authFetch(`http://127.0.0.1:5000/tasks/events`, {
+                headers: { 'Accept': 'text/event-stream' }
+            });
+            if (!response.ok || !response.body) {
+                throw new Error(`Task event stream returned ${response.status}`);
+            }
+
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const message = parseServerSentEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                    if (message.event === 'ready') {
+                        taskEventsLive = true;
+                        // Changes made while disconnected were missed
+                        if (connectedBefore) loadTasks(getCurrentTab());
+                        connectedBefore = true;
+                    } else if (message.event === 'resync') {
+                        loadTasks(getCurrentTab());
+                    } else if (message.event) {
+                        applyTaskEvent(message.event, JSON.parse(message.data));
+                    }
+                }
+            }
+        } catch (error) {
+            console.error('Task event stream closed:', error);
+        }
+        taskEventsLive = false;
+        await new Promise(resolve => setTimeout(resolve, TASK_EVENTS_RETRY_MS));
+    }
+}
+
+function parseServerSentEvent(block) {
+    const message = { event: null, data: '' };
+    block.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) {
+            message.event = line.slice(7);
+        } else if (line.startsWith('data: ')) {
+            message.data += line.slice(6);
+        }
+    });
+    return message;
+}
+
+function findTaskElements(taskId) {
+    return document.querySelectorAll(`.task-item[data-task-id="${taskId}"]`);
+}
+
+// Apply one task change to the rendered lists. Writes apply their own
+// response too, so this must be idempotent: the stream may echo the change.
+function applyTaskEvent(event, data) {
+    const pendingContainer = document.getElementById('pendingTasks');
+
+    if (event === 'task.created') {
+        if (!pendingContainer || findTaskElements(data.task_id).length > 0) return;
+        pendingContainer.querySelector('.no-tasks')?.remove();
+        pendingContainer.prepend(createTaskElement(data));
+    } else if (event === 'task.updated') {
+        const task = renderedTasks.get(data.task_id);
+        if (!task) return;
+        Object.assign(task, data);
+        findTaskElements(data.task_id).forEach(element => {
+            element.replaceWith(createTaskElement(task));
+        });
+    } else if (event === 'task.completed') {
+        // The completed tab is reloaded when it is opened
+        pendingContainer?.querySelector(`.task-item[data-task-id="${data.task_id}"]`)?.remove();
+    } else if (event === 'task.deleted') {
+        findTaskElements(data.task_id).forEach(element => element.remove());
+        renderedTasks.delete(data.task_id);
+    }
+}
+
 // Function to handle bulk actions
 function createBulkActionButtons() {
     const bulkActionsDiv = document.createElement('div');
@@ -501,7 +606,7 @@ async function deleteTask(taskId, bulk_delete=false) {
     if (!bulk_delete && !confirm('Are you sure you want to delete this task?')) return;
 
     try {
-        const response = await fetch(`http://127.0.0.1:5000/tasks/${taskId}`, {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks/${taskId}`, {
             method: 'DELETE',
             headers: {
                 'Authorization': `Bearer ${localStorage.getItem('token')}`
@@ -509,7 +614,8 @@ async function deleteTask(taskId, bulk_delete=false) {
         });
 
         if (response.ok) {
-            await loadTasks(getCurrentTab());
+            applyTaskEvent('task.deleted', { task_id: taskId });
+            await reloadIfNotLive(() => loadTasks(getCurrentTab()));
         } else {
             const data = await response.json();
             showError(data.error || 'Failed to delete task');
@@ -533,10 +639,8 @@ async function completeBulkTasks() {
 
     if (!confirm(`Complete ${selectedTasks.length} selected tasks?`)) return;
 
-    for (const taskId of selectedTasks) {
-        await toggleTaskStatus(taskId);
-    }
-    await loadTasks(currentTab);
+    await runBatchAction('complete', selectedTasks);
+    await reloadIfNotLive(() => loadTasks(currentTab));
 }
 
 async function deleteBulkTasks() {
@@ -548,10 +652,41 @@ async function deleteBulkTasks() {
 
     if (!confirm(`Delete ${selectedTasks.length} selected tasks?`)) return;
 
-    for (const taskId of selectedTasks) {
-        await deleteTask(taskId, bulk_delete=true);
+    await runBatchAction('delete', selectedTasks);
+    await reloadIfNotLive(() => loadTasks(getCurrentTab()));
+}
+
+// Apply one action to many tasks with a single request
+async function runBatchAction(action, taskIds) {
+    try {
+        const response = await authFetch(`http://127.0.0.1:5000/tasks/batch/${action}`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('token')}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ task_ids: taskIds })
+        });
+
+        const data = await response.json();
+        if (!response.ok) {
+            showError(data.error || `Failed to ${action} tasks`);
+            return;
+        }
+
+        // Applied from the results; the event stream may be served by another worker
+        data.results
+            .filter(result => result.status < 400)
+            .forEach(result => applyTaskEvent(`task.${action}d`, { task_id: result.task_id }));
+
+        const failed = data.results.filter(result => result.status >= 400);
+        if (failed.length > 0) {
+            showError(`${failed.length} of ${taskIds.length} tasks could not be updated`);
+        }
+    } catch (error) {
+        showError(`An error occurred while trying to ${action} tasks`);
+        console.error('Error:', error);
     }
-    await loadTasks(getCurrentTab());
 }
 
 function getSelectedTasks() {
@@ -590,26 +725,39 @@ function updateSelectAllCheckbox() {
     selectAllCheckbox.checked = allChecked;
 }
 
+// Reminder and deadline notifications come from the server-side scheduler, so
+// this only redraws the countdowns, and only while the page is visible
+function refreshDeadlineProgress() {
+    document.querySelectorAll('.task-progress').forEach(progressElement => {
+        const taskElement = progressElement.closest('.task-item');
+        const deadlineText = progressElement.querySelector('small').textContent;
+        
+        if (deadlineText) {
+            const deadline = taskElement.dataset.deadline;
+            if (deadline) {
+                const timeInfo = calculateTimeRemaining(deadline);
+                progressElement.classList.toggle('late', timeInfo.isLate);
+                progressElement.querySelector('small').textContent = timeInfo.text;
+                progressElement.querySelector('small').classList.toggle('late-text', timeInfo.isLate);
+                progressElement.querySelector('.progress-bar-fill').style.width = 
+                    timeInfo.isLate ? '100%' : `${timeInfo.percentage}%`;
+            }
+        }
+    });
+}
+
 // Modified time updates function
 function startTimeUpdates() {
     setInterval(() => {
-        document.querySelectorAll('.task-progress').forEach(progressElement => {
-            const taskElement = progressElement.closest('.task-item');
-            const deadlineText = progressElement.querySelector('small').textContent;
-            
-            if (deadlineText) {
-                const deadline = taskElement.dataset.deadline;
-                if (deadline) {
-                    const timeInfo = calculateTimeRemaining(deadline);
-                    progressElement.classList.toggle('late', timeInfo.isLate);
-                    progressElement.querySelector('small').textContent = timeInfo.text;
-                    progressElement.querySelector('small').classList.toggle('late-text', timeInfo.isLate);
-                    progressElement.querySelector('.progress-bar-fill').style.width = 
-                        timeInfo.isLate ? '100%' : `${timeInfo.percentage}%`;
-                }
-            }
-        });
+        if (!document.hidden) {
+            refreshDeadlineProgress();
+        }
     }, 60000); // Update every minute
+    document.addEventListener('visibilitychange', () => {
+        if (!document.hidden) {
+            refreshDeadlineProgress();
+        }
+    });
 }
 
 // Call this when the page loads
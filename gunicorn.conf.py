@@ -0,0 +1,58 @@
+"""gunicorn settings shared by every service (SERVE_MODE=production in manage_services.sh).
+
+manage_services.sh passes --bind and --chdir per service; everything else is
+read from the environment here. Send SIGHUP to the master (manage_services.sh
+reload) to replace the workers gracefully: new workers start before the old
+ones finish their in-flight requests.
+"""
+import os
+import sys
+import multiprocessing
+
+
+def _flag(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+# WEB_CONCURRENCY is the conventional name most process managers set
+workers = int(os.getenv('GUNICORN_WORKERS') or os.getenv('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+
+# Each sync worker serves one request at a time; with threads, gthread workers
+# share one connection pool and cache per process between several requests
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import the app once in the master so workers share its memory pages. With
+# preload, a reload restarts the workers but does not pick up code changes.
+preload_app = _flag('GUNICORN_PRELOAD', 'false')
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers after this many requests (0 disables), jittered so they do not all restart together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# The services write their own structured access log
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def post_worker_init(worker):
+    """Open pools, start background threads and load indexes in the new worker."""
+    # Imported here: the service's own __init__ has put the project root on sys.path by now
+    from common.serving import single_worker_reasons, start_worker
+
+    reasons = single_worker_reasons(worker.wsgi)
+    if reasons and worker.cfg.workers > 1:
+        # A boot error makes the master shut down instead of respawning the worker
+        from gunicorn.arbiter import Arbiter
+        worker.log.error(
+            "Refusing to start %d workers: %s. Use the redis backends or one worker "
+            "(manage_services.sh runs the task service with TASK_SERVICE_WORKERS, default 1).",
+            worker.cfg.workers, '; '.join(reasons)
+        )
+        sys.exit(Arbiter.WORKER_BOOT_ERROR)
+    start_worker(worker.wsgi)
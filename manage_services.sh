@@ -11,7 +11,7 @@ paths=(
     "${PROJECT_ROOT}/auth_service/app.py"
     "${PROJECT_ROOT}/task_service/app.py"
     "${PROJECT_ROOT}/suggestion_service/app.py"
-    "${PROJECT_ROOT}/frontend"
+    "${PROJECT_ROOT}/frontend/app.py"
 )
 urls=(
     "http://localhost:5000"
@@ -21,6 +21,15 @@ urls=(
     "http://localhost:8080/templates/login.html"
 )
 
+# DEPLOY_MODE=monolith runs the gateway and every service as one process on the gateway port
+if [ "${DEPLOY_MODE}" = "monolith" ]; then
+    services=("monolith" "frontend")
+    ports=("5000" "8080")
+    paths=("${PROJECT_ROOT}/monolith.py" "${PROJECT_ROOT}/frontend/app.py")
+    urls=("http://localhost:5000" "http://localhost:8080/templates/login.html")
+fi
+frontend_url="${urls[${#urls[@]}-1]}"
+
 # Colors for output
 GREEN='\033[0;32m'
 BLUE='\033[0;34m'
@@ -73,16 +82,45 @@ start_service() {
     # Create a log directory if it doesn't exist
     mkdir -p "${PROJECT_ROOT}/logs"
     
-    # Start the service based on type
-    if [ "$service" = "frontend" ]; then
-        cd "${PROJECT_ROOT}/frontend" && \
-        python3 -m http.server $port --directory . > "${PROJECT_ROOT}/logs/${service}.log" 2>&1 &
+    # Production serves the minified, fingerprinted build of the frontend
+    if [ "$service" = "frontend" ] && [ "${SERVE_MODE}" = "production" ]; then
+        if ! python3 "${PROJECT_ROOT}/frontend/build.py" > "${PROJECT_ROOT}/logs/${service}-build.log" 2>&1; then
+            echo -e "${RED}Frontend build failed${NC}"
+            tail -n 5 "${PROJECT_ROOT}/logs/${service}-build.log"
+            return 1
+        fi
+        export FRONTEND_ASSETS="${FRONTEND_ASSETS:-dist}"
+    fi
+
+    local entry="$(basename "$path")"
+    # GATEWAY_MODE=async serves the gateway from the asyncio entry point
+    if [ "$service" = "api_gateway" ] && [ "${GATEWAY_MODE}" = "async" ]; then
+        entry="async_app.py"
+    fi
+    if [ "${SERVE_MODE}" = "production" ]; then
+        # gunicorn writes the master's pid itself, which reload signals
+        local target="${entry%.py}:app"
+        local worker_args=()
+        if [ "$entry" = "async_app.py" ]; then
+            target="async_app:create_async_app()"
+            worker_args=(--worker-class aiohttp.GunicornWebWorker)
+        fi
+        # The memory cache and event broker are per process: one worker unless both use redis.
+        # Its threads also hold the open event streams, so it gets more of them.
+        if [ "$service" = "task_service" ] || [ "$service" = "monolith" ]; then
+            worker_args+=(--workers "${TASK_SERVICE_WORKERS:-1}" --threads "${TASK_SERVICE_THREADS:-32}")
+        fi
+        gunicorn -c "${PROJECT_ROOT}/gunicorn.conf.py" "${worker_args[@]}" \
+            --chdir "$(dirname "$path")" --bind "127.0.0.1:$port" \
+            --pid /tmp/${service}.pid "$target" > "${PROJECT_ROOT}/logs/${service}.log" 2>&1 &
     else
         cd "$(dirname "$path")" && \
-        python3 "$(basename "$path")" > "${PROJECT_ROOT}/logs/${service}.log" 2>&1 &
+        python3 "$entry" > "${PROJECT_ROOT}/logs/${service}.log" 2>&1 &
     fi
     
-    echo $! > /tmp/${service}.pid
+    if [ "${SERVE_MODE}" != "production" ]; then
+        echo $! > /tmp/${service}.pid
+    fi
     sleep 2
     
     if check_service $service; then
@@ -119,6 +157,26 @@ stop_service() {
     echo -e "${GREEN}$service stopped${NC}"
 }
 
+# Function to reload a service without dropping requests
+reload_service() {
+    local service=$1
+    
+    # gunicorn starts new workers on SIGHUP and lets the old ones finish
+    if [ "${SERVE_MODE}" = "production" ] && [ -f /tmp/${service}.pid ]; then
+        echo -e "${YELLOW}Reloading $service...${NC}"
+        if [ "$service" = "frontend" ]; then
+            # Files are read per request; pages switch to the new assets as soon as they are built
+            python3 "${PROJECT_ROOT}/frontend/build.py" > "${PROJECT_ROOT}/logs/${service}-build.log" 2>&1
+        fi
+        kill -HUP $(cat /tmp/${service}.pid) 2>/dev/null
+        echo -e "${GREEN}$service reloaded${NC}"
+    else
+        stop_service $service
+        sleep 2
+        start_service $service
+    fi
+}
+
 # Function to check if service is running
 check_service() {
     local service=$1
@@ -146,7 +204,7 @@ case "$1" in
             start_service $service
         done
         echo -e "\n${GREEN}All services started. Access the application at:${NC}"
-        echo -e "${BLUE}${urls[4]}${NC}"
+        echo -e "${BLUE}${frontend_url}${NC}"
         ;;
     stop)
         for service in "${services[@]}"; do
@@ -160,13 +218,23 @@ case "$1" in
             start_service $service
         done
         echo -e "\n${GREEN}All services restarted. Access the application at:${NC}"
-        echo -e "${BLUE}${urls[4]}${NC}"
+        echo -e "${BLUE}${frontend_url}${NC}"
+        ;;
+    reload)
+        for service in "${services[@]}"; do
+            reload_service $service
+        done
         ;;
     status)
         for service in "${services[@]}"; do
             show_status $service
         done
         ;;
+    migrate)
+        # status | up (default) | check
+        python3 "${PROJECT_ROOT}/database/migrate.py" "${2:-up}"
+        exit $?
+        ;;
     logs)
         if [ -z "$2" ]; then
             echo "Usage: $0 logs <service_name>"
@@ -179,7 +247,7 @@ case "$1" in
         fi
         ;;
     *)
-        echo "Usage: $0 {start|stop|restart|status|logs}"
+        echo "Usage: $0 {start|stop|restart|reload|status|logs|migrate}"
         exit 1
         ;;
 esac
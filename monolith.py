@@ -0,0 +1,81 @@
+"""Single-process deployment: the gateway and the services in one process.
+
+The auth, task and suggestion apps are loaded next to the gateway. Each
+upstream whose transport is 'inprocess' (the default here) calls its app
+directly instead of over HTTP. A service set to 'http', e.g.
+TASK_SERVICE_TRANSPORT=http, is not loaded; the gateway reaches it at
+TASK_SERVICE_URL as in a split deployment.
+
+Run with `python monolith.py`, or `./manage_services.sh start` with
+DEPLOY_MODE=monolith. Under gunicorn, use `monolith:app`.
+"""
+import os
+import sys
+import importlib
+
+from dotenv import load_dotenv
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.access_log import access_log_config_from_env, configure_logging
+from common.serving import on_worker_start, require_single_worker, single_worker_reasons, start_worker
+
+SERVICES = {
+    'auth': 'auth_service',
+    'task': 'task_service',
+    'suggestion': 'suggestion_service'
+}
+
+
+def import_entry_point(directory, module='app'):
+    """Import a service's entry module as if the service were run from its own directory.
+
+    Every service has its own `__init__` and `app` modules, imported under
+    those bare names. They are dropped from sys.modules around each import
+    so the next service gets its own.
+    """
+    path = os.path.join(PROJECT_ROOT, directory)
+    for name in ('__init__', 'app', module):
+        sys.modules.pop(name, None)
+    sys.path.insert(0, path)
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(path)
+        for name in ('__init__', 'app', module):
+            sys.modules.pop(name, None)
+
+
+def create_monolith():
+    """Load the in-process services, then the gateway that calls them."""
+    load_dotenv()
+    os.environ.setdefault('SERVICE_TRANSPORT', 'inprocess')
+    # One JSON log for the whole process; access lines still name their service
+    configure_logging('monolith', access_log_config_from_env())
+
+    # Imported only once the gateway directory is on sys.path
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, 'api_gateway'))
+    from transport import IN_PROCESS, register_local_app, transport_from_env
+
+    service_apps = []
+    for name, directory in SERVICES.items():
+        if transport_from_env(name) == IN_PROCESS:
+            service_app = import_entry_point(directory).app
+            register_local_app(name, service_app)
+            service_apps.append(service_app)
+
+    gateway = import_entry_point('api_gateway', 'routes').app
+    # gunicorn starts the workers of the gateway app, which starts the services' in turn
+    for service_app in service_apps:
+        on_worker_start(gateway, lambda service_app=service_app: start_worker(service_app))
+        for reason in single_worker_reasons(service_app):
+            require_single_worker(gateway, reason)
+    return gateway
+
+
+app = create_monolith()
+
+if __name__ == '__main__':
+    app.run(port=int(os.getenv('GATEWAY_PORT', 5000)), threaded=True)
@@ -1,25 +1,60 @@
 from flask import Flask
 from flask_cors import CORS
 import os
+import sys
 from dotenv import load_dotenv
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.db_pool import init_db_pool, pool_config_from_env
+from common.access_log import access_log_config_from_env, init_access_log
+from common.json_provider import init_json_provider, json_config_from_env
+from common.metrics import init_metrics, metrics_enabled_from_env
+from common.serving import debug_from_env
+
 def create_app():
     load_dotenv()
     
     app = Flask(__name__)
     CORS(app)
+    app.debug = debug_from_env()
+
+    # orjson-backed jsonify() and get_json()
+    app.config['JSON'] = json_config_from_env()
+    init_json_provider(app)
+
+    # Structured JSON access log
+    app.config['ACCESS_LOG'] = access_log_config_from_env()
+    init_access_log(app, 'suggestion_service')
+
+    # Latency histograms served at /metrics
+    app.config['METRICS_ENABLED'] = metrics_enabled_from_env()
+    init_metrics(app, 'suggestion_service')
     
     # Database configuration
     app.config['MYSQL_CONFIG'] = {
         'host': os.getenv('DB_HOST'),
+        'port': int(os.getenv('DB_PORT', 3306)),
         'user': os.getenv('DB_USER'),
         'password': os.getenv('DB_PASSWORD'),
         'database': os.getenv('DB_NAME')
     }
+    app.config['MYSQL_POOL'] = pool_config_from_env()
+    # Seconds between reloads of the in-memory suggestion index (0 disables)
+    app.config['SUGGESTION_INDEX_REFRESH'] = float(os.getenv('SUGGESTION_INDEX_REFRESH', 300))
+    # Seconds a browser may reuse GET /suggestions before revalidating its ETag
+    app.config['SUGGESTIONS_MAX_AGE'] = int(os.getenv('SUGGESTIONS_MAX_AGE', 30))
+    init_db_pool(app, name='suggestion_service')
     
     return app
 
 # Utility functions for suggestion service
+
+# Width of task_suggestions.task_text; task texts are TEXT, so longer ones are not suggested
+MAX_SUGGESTION_LENGTH = 255
+
 def clean_suggestion_text(text):
     """Clean and standardize suggestion text."""
     return text.strip().lower()
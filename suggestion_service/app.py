@@ -1,19 +1,97 @@
-from __init__ import create_app, clean_suggestion_text, get_matching_score
+from __init__ import create_app, clean_suggestion_text, get_matching_score, MAX_SUGGESTION_LENGTH
 from flask import request, jsonify
-import mysql.connector
+from suggestion_index import SuggestionIndex
+from common.versions import VersionCounter, etag_matches, not_modified, with_etag
+from common.serving import on_worker_start
+import threading
+import time
 
 app = create_app()
 
+# In-memory copy of task_suggestions used to answer typeahead queries
+index_state = {'index': None, 'loaded_at': None, 'refreshing': False, 'rebuilds': []}
+# Reentrant: the first load runs under the lock and takes it again to swap the index in
+index_lock = threading.RLock()
+
+# Advanced whenever the index changes; GET /suggestions ETags are built from it
+index_versions = VersionCounter('suggestion_index')
+
 def get_db_connection():
-    return mysql.connector.connect(**app.config['MYSQL_CONFIG'])
+    return app.extensions['db_pool'].get_connection()
+
+def load_suggestion_index():
+    """Build a fresh index from the table and swap it in.
+
+    Increments recorded while the table is read are kept and replayed onto the
+    new index before the swap, so they are not lost with the old one. One that
+    committed before the read but was recorded after it is counted twice until
+    the next refresh, which over-ranks a text slightly instead of dropping it.
+    """
+    # Deltas recorded while this rebuild reads the table
+    rebuild_deltas = {}
+    with index_lock:
+        index_state['rebuilds'].append(rebuild_deltas)
+    index = SuggestionIndex()
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT task_text, frequency FROM task_suggestions")
+            index.load(cursor.fetchall())
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception:
+        with index_lock:
+            index_state['rebuilds'].remove(rebuild_deltas)
+        raise
+
+    with index_lock:
+        index_state['rebuilds'].remove(rebuild_deltas)
+        for task_text, delta in rebuild_deltas.items():
+            index.increment(task_text, delta)
+        index_state['index'] = index
+        index_state['loaded_at'] = time.monotonic()
+    index_versions.bump('index')
+    app.logger.info(f"Suggestion index loaded with {len(index)} entries")
+
+def refresh_suggestion_index():
+    try:
+        load_suggestion_index()
+    except Exception as e:
+        app.logger.warning(f"Suggestion index refresh failed: {e}")
+    finally:
+        index_state['refreshing'] = False
+
+def get_suggestion_index():
+    """Return the loaded index, or None if it cannot be built (callers then query MySQL)."""
+    if index_state['index'] is None:
+        with index_lock:
+            if index_state['index'] is None:
+                try:
+                    load_suggestion_index()
+                except Exception as e:
+                    app.logger.warning(f"Suggestion index unavailable: {e}")
+                    return None
+
+    # Other worker processes also write to the table, so reload periodically
+    refresh = app.config['SUGGESTION_INDEX_REFRESH']
+    if refresh and time.monotonic() - index_state['loaded_at'] > refresh:
+        with index_lock:
+            if not index_state['refreshing']:
+                index_state['refreshing'] = True
+                threading.Thread(target=refresh_suggestion_index, daemon=True).start()
+
+    return index_state['index']
+
+def fetch_candidates(query):
+    """Top 10 suggestions containing the query, ordered by frequency."""
+    index = get_suggestion_index()
+    if index is not None:
+        return index.candidates(query)
 
-@app.route('/suggestions', methods=['GET'])
-def get_suggestions():
-    query = clean_suggestion_text(request.args.get('q', ''))
-    
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-
     try:
         cursor.execute("""
             SELECT task_text, frequency 
@@ -22,7 +100,37 @@ def get_suggestions():
             ORDER BY frequency DESC 
             LIMIT 10
         """, (f"%{query}%",))
-        suggestions = cursor.fetchall()
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def record_increments(deltas):
+    """Apply committed frequency deltas to the in-memory index."""
+    with index_lock:
+        index = index_state['index']
+        if index is None and not index_state['rebuilds']:
+            return
+        for task_text, delta in deltas.items():
+            if index is not None:
+                index.increment(task_text, delta)
+            # A rebuild is reading the table; replay this onto the new index too
+            for rebuild_deltas in index_state['rebuilds']:
+                rebuild_deltas[task_text] = rebuild_deltas.get(task_text, 0) + delta
+    index_versions.bump('index')
+
+@app.route('/suggestions', methods=['GET'])
+def get_suggestions():
+    query = clean_suggestion_text(request.args.get('q', ''))
+    cache_control = f"private, max-age={app.config['SUGGESTIONS_MAX_AGE']}"
+
+    # Only answers from the index are versioned; the SQL fallback gets no ETag
+    version = index_versions.current('index') if get_suggestion_index() is not None else None
+    if etag_matches(version):
+        return not_modified(version, cache_control)
+
+    try:
+        suggestions = fetch_candidates(query)
         
         # Sort suggestions based on matching score
         scored_suggestions = [
@@ -31,17 +139,16 @@ def get_suggestions():
         ]
         scored_suggestions.sort(key=lambda x: (-x['score'], -x['frequency']))
         
-        return jsonify(scored_suggestions[:5]), 200
+        return with_etag(jsonify(scored_suggestions[:5]), version, cache_control), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 @app.route('/suggestions/add', methods=['POST'])
 def add_suggestion():
     data = request.get_json()
     task_text = clean_suggestion_text(data.get('task_text'))
+    if len(task_text) > MAX_SUGGESTION_LENGTH:
+        return jsonify({'message': 'Suggestion too long to store'}), 200
 
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -53,6 +160,7 @@ def add_suggestion():
             ON DUPLICATE KEY UPDATE frequency = frequency + 1
         """, (task_text,))
         conn.commit()
+        record_increments({task_text: 1})
         return jsonify({'message': 'Suggestion added/updated successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -60,5 +168,70 @@ def add_suggestion():
         cursor.close()
         conn.close()
 
+@app.route('/suggestions/batch', methods=['POST'])
+def add_suggestions_batch():
+    """Apply many frequency deltas in one multi-row upsert."""
+    data = request.get_json(silent=True) or {}
+    items = data.get('suggestions', []) if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return jsonify({'error': 'suggestions must be a list'}), 400
+
+    # Fold texts that only differ before cleaning into a single row
+    deltas = {}
+    skipped = 0
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('task_text'), str):
+            return jsonify({'error': 'Each suggestion needs a task_text string'}), 400
+        try:
+            delta = int(item.get('delta', 1))
+        except (TypeError, ValueError):
+            delta = 0
+        if delta < 1:
+            return jsonify({'error': 'delta must be a positive integer'}), 400
+
+        task_text = clean_suggestion_text(item['task_text'])
+        if len(task_text) > MAX_SUGGESTION_LENGTH:
+            # Would not fit the column, and under strict mode would fail the whole upsert
+            skipped += 1
+        elif task_text:
+            deltas[task_text] = deltas.get(task_text, 0) + delta
+
+    if not deltas:
+        return jsonify({'message': 'No suggestions to update', 'count': 0, 'skipped': skipped}), 200
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        placeholders = ', '.join(['(%s, %s)'] * len(deltas))
+        params = [value for pair in deltas.items() for value in pair]
+        cursor.execute(f"""
+            INSERT INTO task_suggestions (task_text, frequency) 
+            VALUES {placeholders} 
+            ON DUPLICATE KEY UPDATE frequency = frequency + VALUES(frequency)
+        """, params)
+        conn.commit()
+        record_increments(deltas)
+        return jsonify({
+            'message': 'Suggestions added/updated successfully',
+            'count': len(deltas),
+            'skipped': skipped
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+def warm_suggestion_index():
+    """Load the index before the first request; get_suggestion_index() retries if MySQL is not up yet."""
+    try:
+        load_suggestion_index()
+    except Exception as e:
+        app.logger.warning(f"Suggestion index not loaded at startup: {e}")
+
+# Loaded per gunicorn worker: the load would otherwise leave a pooled connection in the master
+on_worker_start(app, warm_suggestion_index)
+
 if __name__ == '__main__':
     app.run(port=5003) 
\ No newline at end of file
@@ -0,0 +1,119 @@
+import threading
+from collections import defaultdict
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class SuggestionIndex:
+    """In-memory substring index over task_suggestions.
+
+    candidates(query) returns the same rows as
+
+        SELECT task_text, frequency FROM task_suggestions
+        WHERE task_text LIKE '%query%' ORDER BY frequency DESC LIMIT top_k
+
+    (case-insensitive, ties broken by text). Every suffix of every text is
+    inserted into a trie up to max_depth characters, and each node keeps the
+    top_k texts containing that node's string. Frequencies only ever grow, so
+    those lists stay exact under increments. Queries longer than max_depth
+    fall back to a trigram index and a frequency sort of the verified matches.
+    """
+
+    def __init__(self, top_k=10, max_depth=6):
+        self.top_k = top_k
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._root = _Node()
+        self._frequency = {}  # lowercased text -> frequency
+        self._display = {}  # lowercased text -> text as stored
+        self._grams = defaultdict(set)
+
+    def _rank(self, key):
+        return (-self._frequency[key], key)
+
+    def _offer(self, node, key):
+        """Keep node.top the top_k keys by rank after key's frequency grew."""
+        top = node.top
+        if key in top:
+            top.sort(key=self._rank)
+        elif len(top) < self.top_k:
+            top.append(key)
+            top.sort(key=self._rank)
+        elif self._rank(key) < self._rank(top[-1]):
+            top[-1] = key
+            top.sort(key=self._rank)
+
+    def _update_paths(self, key):
+        self._offer(self._root, key)
+        seen = set()
+        for start in range(len(key)):
+            node = self._root
+            for char in key[start:start + self.max_depth]:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                node = child
+                if id(node) not in seen:
+                    seen.add(id(node))
+                    self._offer(node, key)
+
+    def _add(self, text, delta):
+        key = text.lower()
+        if key not in self._frequency:
+            self._frequency[key] = 0
+            self._display[key] = text
+            for i in range(len(key) - 2):
+                self._grams[key[i:i + 3]].add(key)
+        self._frequency[key] += delta
+        self._update_paths(key)
+
+    def load(self, rows):
+        """Rebuild the index from (task_text, frequency) rows."""
+        with self._lock:
+            self._reset()
+            for text, frequency in rows:
+                if text:
+                    self._add(text, frequency or 0)
+
+    def increment(self, text, delta=1):
+        """Mirror a frequency increment that has been committed to the table."""
+        if not text or delta <= 0:
+            return
+        with self._lock:
+            self._add(text, delta)
+
+    def candidates(self, query):
+        """Return [{'task_text', 'frequency'}] for the top_k most frequent substring matches."""
+        query = query.lower()
+        with self._lock:
+            if len(query) <= self.max_depth:
+                node = self._root
+                for char in query:
+                    node = node.children.get(char)
+                    if node is None:
+                        return []
+                keys = list(node.top)
+            else:
+                postings = sorted(
+                    (self._grams.get(query[i:i + 3], set()) for i in range(len(query) - 2)),
+                    key=len
+                )
+                matches = set.intersection(*postings) if postings[0] else set()
+                keys = sorted((key for key in matches if query in key), key=self._rank)[:self.top_k]
+
+            return [
+                {'task_text': self._display[key], 'frequency': self._frequency[key]}
+                for key in keys
+            ]
+
+    def __len__(self):
+        return len(self._frequency)
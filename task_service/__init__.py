@@ -1,25 +1,128 @@
 from flask import Flask
 from flask_cors import CORS
 import os
+import sys
+import json
+import base64
 from dotenv import load_dotenv
 from datetime import datetime
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from common.db_pool import init_db_pool, pool_config_from_env
+from common.cache import cache_config_from_env, create_cache
+from common.versions import create_version_counter
+from common.access_log import access_log_config_from_env, init_access_log
+from common.json_provider import init_json_provider, json_config_from_env
+from common.metrics import init_metrics, metrics_enabled_from_env
+from common.events import create_event_broker, events_config_from_env
+from common.serving import debug_from_env, on_worker_start, require_single_worker
+from reminders import ReminderScheduler, create_sink, reminder_config_from_env
+
 def create_app():
     load_dotenv()
     
     app = Flask(__name__)
     CORS(app)
+    app.debug = debug_from_env()
+
+    # orjson-backed jsonify() and get_json()
+    app.config['JSON'] = json_config_from_env()
+    init_json_provider(app)
+
+    # Structured JSON access log
+    app.config['ACCESS_LOG'] = access_log_config_from_env()
+    init_access_log(app, 'task_service')
+
+    # Latency histograms served at /metrics
+    app.config['METRICS_ENABLED'] = metrics_enabled_from_env()
+    init_metrics(app, 'task_service')
     
     # Database configuration
     app.config['MYSQL_CONFIG'] = {
         'host': os.getenv('DB_HOST'),
+        'port': int(os.getenv('DB_PORT', 3306)),
         'user': os.getenv('DB_USER'),
         'password': os.getenv('DB_PASSWORD'),
         'database': os.getenv('DB_NAME')
     }
-    app.debug = True
+    app.config['MYSQL_POOL'] = pool_config_from_env()
+    init_db_pool(app, name='task_service')
+
+    # Per-user task list cache
+    app.config['TASK_CACHE'] = cache_config_from_env('TASK_CACHE')
+    init_task_cache(app)
+
+    # Per-user change events streamed to clients through the gateway
+    app.config['TASK_EVENTS'] = events_config_from_env()
+    init_task_events(app)
+
+    # Reminder and deadline events, fired from a heap of the next due times
+    app.config['REMINDERS'] = reminder_config_from_env()
+    init_reminder_scheduler(app)
     return app
 
+def init_task_cache(app):
+    """Create the task list cache, the per-user list versions and the cache counters."""
+    cache = create_cache('task_lists', **app.config['TASK_CACHE'])
+    app.extensions['task_cache'] = cache
+    if app.config['TASK_CACHE']['backend'] == 'memory':
+        # Another worker's writes never reach this copy, which would serve stale lists
+        require_single_worker(app, 'TASK_CACHE_BACKEND=memory keeps a task list cache per process')
+    # ETags come from these, so they are shared exactly when the cache is
+    app.extensions['task_versions'] = create_version_counter('task_versions', **app.config['TASK_CACHE'])
+
+    def cache_stats():
+        return cache.stats(), 200
+
+    app.add_url_rule('/cache/stats', 'cache_stats', cache_stats, methods=['GET'])
+    return cache
+
+def init_task_events(app):
+    """Create the task event broker and expose its counters."""
+    broker = create_event_broker(**app.config['TASK_EVENTS'])
+    app.extensions['task_events'] = broker
+    if app.config['TASK_EVENTS']['backend'] == 'memory':
+        # A stream on one worker would never see the writes handled by another
+        require_single_worker(app, 'TASK_EVENTS_BACKEND=memory delivers events within one process')
+    on_worker_start(app, broker.start)
+
+    def task_event_stats():
+        return broker.stats(), 200
+
+    app.add_url_rule('/events/stats', 'task_event_stats', task_event_stats, methods=['GET'])
+    return broker
+
+def init_reminder_scheduler(app):
+    """Start the reminder scheduler and expose its counters at /reminders/stats."""
+    config = app.config['REMINDERS']
+    if not config['enabled']:
+        app.extensions['reminders'] = None
+        return None
+
+    scheduler = ReminderScheduler(
+        app.extensions['db_pool'].get_connection,
+        create_sink(config['sink'], config['webhook_url']),
+        horizon=config['horizon'],
+        batch_size=config['batch_size'],
+        catchup=config['catchup'],
+        retry_backoff=config['retry_backoff'],
+        max_retry_backoff=config['max_retry_backoff']
+    )
+    app.extensions['reminders'] = scheduler
+    # Under the debug reloader only the serving child runs the thread. Each
+    # gunicorn worker runs one; claiming a row before firing keeps events single.
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        on_worker_start(app, scheduler.start)
+
+    def reminder_stats():
+        return scheduler.stats(), 200
+
+    app.add_url_rule('/reminders/stats', 'reminder_stats', reminder_stats, methods=['GET'])
+    return scheduler
+
 # Utility functions for task service
 def calculate_time_remaining(deadline):
     """Calculate time remaining for a task."""
@@ -38,3 +141,55 @@ def format_task_response(task):
     if task.get('deadline'):
         task['time_remaining'] = calculate_time_remaining(task['deadline'])
     return task
+
+# Pagination and projection helpers for the task list endpoints
+TASK_FIELDS = (
+    'task_id', 'user_id', 'task_text', 'created_at', 'reminder',
+    'is_completed', 'completed_at', 'deadline'
+)
+MAX_PAGE_SIZE = 500
+
+# Largest number of items accepted by one batch request
+MAX_BATCH_SIZE = 500
+
+def parse_fields(value):
+    """Turn a fields=a,b,c parameter into a column list; task_id is always included."""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if 'task_id' not in fields:
+        fields.insert(0, 'task_id')
+    return fields
+
+def parse_limit(value):
+    """Validate the limit parameter, capped at MAX_PAGE_SIZE."""
+    if value is None:
+        return None
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(sort_value, task_id):
+    """Opaque keyset cursor pointing just past (sort_value, task_id)."""
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, task_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        sort_value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), task_id
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def parse_task_ids(data):
+    """Validate the task_ids list of a batch request, keeping order and dropping repeats."""
+    task_ids = (data or {}).get('task_ids')
+    if not isinstance(task_ids, list) or not task_ids:
+        raise ValueError('task_ids must be a non-empty list')
+    if len(task_ids) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} tasks per batch')
+    return list(dict.fromkeys(str(task_id) for task_id in task_ids))
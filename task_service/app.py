@@ -1,18 +1,250 @@
-from __init__ import create_app, calculate_time_remaining, format_task_response
-from flask import request, jsonify
-import mysql.connector
+from __init__ import (
+    create_app, calculate_time_remaining, format_task_response,
+    parse_fields, parse_limit, encode_cursor, decode_cursor,
+    parse_task_ids, MAX_BATCH_SIZE
+)
+from flask import request, jsonify, Response
+from common.identity import trusted_user_id, is_owner
+from common.versions import etag_matches, not_modified, with_etag
+from reminders import KIND_COLUMNS
 import uuid
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 app = create_app()
 
+# Views of a user's tasks that are cached; every write for that user drops them all
+CACHED_VIEWS = ('pending', 'history', 'status:pending', 'status:completed')
+
+# List reads are revalidated on every use: a matching ETag costs no database work
+LIST_CACHE_CONTROL = 'private, no-cache'
+
 def get_db_connection():
-    return mysql.connector.connect(**app.config['MYSQL_CONFIG'])
+    return app.extensions['db_pool'].get_connection()
+
+def fetch_user_tasks(user_id, view, query, params, version):
+    """Return the rows for one of a user's task lists, from the cache when possible.
+
+    version is the list_version() the caller read before this, and sends as the
+    ETag. Entries are keyed by it, so once a write bumps the version no read can
+    reach the rows cached before it, whatever order the bump and the cache
+    delete happen in.
+    """
+    if version is None:
+        # No version to key by (e.g. Redis down): read through without caching
+        cache = None
+    else:
+        cache = app.extensions['task_cache']
+        key = f"{user_id}:{view}:{version}"
+        tasks = cache.get(key)
+        if tasks is not None:
+            return tasks
+
+    versions = app.extensions['task_versions']
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        tasks = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    # A write that committed during the read may or may not be in these rows
+    if cache is not None and versions.current(user_id) == version:
+        cache.set(key, tasks)
+    return tasks
+
+def wants_page():
+    """True when the caller asked for pagination or projection (served uncached)."""
+    return any(arg in request.args for arg in ('limit', 'cursor', 'fields'))
+
+def fetch_task_page(user_id, is_completed, sort_expr, descending):
+    """Keyset-paginated, optionally projected read of one of a user's task lists.
+
+    Returns (rows, next_cursor). Rows are ordered by sort_expr then task_id, which
+    the (user_id, is_completed, <sort>) indexes serve directly because InnoDB
+    secondary indexes end with the primary key.
+    """
+    fields = parse_fields(request.args.get('fields'))
+    limit = parse_limit(request.args.get('limit'))
+    cursor_arg = request.args.get('cursor')
+
+    columns = ', '.join(fields) if fields else '*'
+    query = f"SELECT {columns}, {sort_expr} AS sort_key FROM tasks WHERE user_id = %s AND is_completed = %s"
+    params = [user_id, is_completed]
+
+    op = '<' if descending else '>'
+    if cursor_arg:
+        sort_value, last_task_id = decode_cursor(cursor_arg)
+        query += f" AND ({sort_expr} {op} %s OR ({sort_expr} = %s AND task_id {op} %s))"
+        params += [sort_value, sort_value, last_task_id]
+
+    direction = 'DESC' if descending else 'ASC'
+    query += f" ORDER BY {sort_expr} {direction}, task_id {direction}"
+    if limit:
+        # One extra row tells us whether another page exists
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['sort_key'], rows[-1]['task_id'])
+    for row in rows:
+        row.pop('sort_key', None)
+    return rows, next_cursor
+
+def page_response(body, next_cursor):
+    """A page has the same body as the unpaged list; the next page's cursor goes only in X-Next-Cursor."""
+    response = jsonify(body)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Rows pulled from the server per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+def stream_tasks(query, params, fmt, wrap_key=None):
+    """Stream query rows as NDJSON or as a chunked JSON array, one batch at a time.
+
+    The cursor is unbuffered and rows are serialized as they are fetched, so
+    memory stays flat however many tasks the user has.
+    """
+    if fmt not in ('ndjson', 'json'):
+        raise ValueError("format must be 'ndjson' or 'json'")
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    released = False
+
+    def release():
+        # Runs when the stream ends or when the response is closed, whichever
+        # comes first; a response closed before its first chunk never runs
+        # the generator's finally block
+        nonlocal released
+        if released:
+            return
+        released = True
+        try:
+            cursor.close()
+        except Exception:
+            pass  # unread rows after a client disconnect; the pool discards the connection
+        conn.close()
+
+    try:
+        cursor.execute(query, params)
+    except Exception:
+        release()
+        raise
+
+    def generate():
+        try:
+            if fmt == 'json':
+                yield f'{{"{wrap_key}": [' if wrap_key else '['
+            first = True
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    body = app.json.dumps(format_task_response(row))
+                    if fmt == 'ndjson':
+                        yield body + '\n'
+                    else:
+                        yield body if first else ',' + body
+                        first = False
+            if fmt == 'json':
+                yield ']}' if wrap_key else ']'
+        finally:
+            release()
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    response = Response(generate(), mimetype=mimetype)
+    response.call_on_close(release)
+    return response
+
+def invalidate_user_tasks(user_id):
+    """Drop every cached list for a user after a write."""
+    if not user_id:
+        return
+    versions = app.extensions['task_versions']
+    version = versions.current(user_id)
+    versions.bump(user_id)
+    # Already unreachable under the new version; deleted only to free the memory
+    if version is not None:
+        app.extensions['task_cache'].delete(*(f"{user_id}:{view}:{version}" for view in CACHED_VIEWS))
+
+def get_task_owner(cursor, task_id):
+    cursor.execute("SELECT user_id FROM tasks WHERE task_id = %s", (task_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def schedule_reminders(task_id, values):
+    """Tell the reminder scheduler about new or changed reminder/deadline times.
+
+    Called after the write has committed, so a failure here is logged and never
+    turns the write's response into an error; the scheduler's next window load
+    still finds the task.
+    """
+    scheduler = app.extensions.get('reminders')
+    if scheduler is None:
+        return
+    try:
+        for kind in KIND_COLUMNS:
+            if kind in values:
+                scheduler.schedule(task_id, kind, values[kind])
+    except Exception:
+        logger.exception("Could not schedule reminders for task %s", task_id)
+
+def cancel_reminders(task_ids):
+    scheduler = app.extensions.get('reminders')
+    if scheduler is None:
+        return
+    try:
+        for task_id in task_ids:
+            scheduler.cancel(task_id)
+    except Exception:
+        # The claim in the database still stops an event for a completed task
+        logger.exception("Could not cancel reminders for %d tasks", len(task_ids))
+
+def publish_task_event(user_id, event, payload):
+    """Push a task change (the row delta) to the user's open event streams.
+
+    Delivery is best effort and happens after the write has committed, so a
+    failure is logged rather than returned; clients resync on reconnect.
+    """
+    if not user_id:
+        return
+    try:
+        app.extensions['task_events'].publish(user_id, event, app.json.dumps(payload))
+    except Exception:
+        logger.exception("Could not publish %s for user %s", event, user_id)
+
+def list_version(user_id):
+    """Version of the user's task lists, read before the lists themselves."""
+    return app.extensions['task_versions'].current(user_id)
+
+def forbidden():
+    return jsonify({'error': 'Not allowed to access this user\'s tasks'}), 403
 
 @app.route('/tasks', methods=['POST'])
 def create_task():
     data = request.get_json()
-    user_id = data.get('user_id')
+    user_id = data.get('user_id') or trusted_user_id()
+    if not is_owner(user_id):
+        return forbidden()
     task_text = data.get('task_text')
     deadline = data.get('deadline')
     reminder = data.get('reminder')
@@ -28,11 +260,14 @@ def create_task():
             (task_id, user_id, task_text, deadline, reminder)
         )
         conn.commit()
+        invalidate_user_tasks(user_id)
+        schedule_reminders(task_id, {'deadline': deadline, 'reminder': reminder})
 
         # Fetch the created task
         cursor.execute("SELECT * FROM tasks WHERE task_id = %s", (task_id,))
-        task = cursor.fetchone()
-        return jsonify(format_task_response(task)), 201
+        task = format_task_response(cursor.fetchone())
+        publish_task_event(user_id, 'task.created', task)
+        return jsonify(task), 201
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -42,22 +277,30 @@ def create_task():
 
 @app.route('/tasks/<user_id>', methods=['GET'])
 def get_tasks(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    if not is_owner(user_id):
+        return forbidden()
+
+    version = list_version(user_id)
+    if etag_matches(version):
+        return not_modified(version, LIST_CACHE_CONTROL)
 
     try:
-        cursor.execute("""
+        if wants_page():
+            tasks, next_cursor = fetch_task_page(user_id, False, 'created_at', descending=True)
+            response = page_response([format_task_response(task) for task in tasks], next_cursor)
+            return with_etag(response, version, LIST_CACHE_CONTROL), 200
+
+        tasks = fetch_user_tasks(user_id, 'pending', """
             SELECT * FROM tasks 
             WHERE user_id = %s AND is_completed = FALSE
             ORDER BY created_at DESC
-        """, (user_id,))
-        tasks = cursor.fetchall()
-        return jsonify([format_task_response(task) for task in tasks]), 200
+        """, (user_id,), version)
+        response = jsonify([format_task_response(dict(task)) for task in tasks])
+        return with_etag(response, version, LIST_CACHE_CONTROL), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 @app.route('/tasks/complete/<task_id>', methods=['PUT'])
 def complete_task(task_id):
@@ -65,6 +308,9 @@ def complete_task(task_id):
     cursor = conn.cursor()
 
     try:
+        user_id = get_task_owner(cursor, task_id)
+        if user_id and not is_owner(user_id):
+            return forbidden()
         cursor.execute(
             """UPDATE tasks 
             SET is_completed = TRUE, completed_at = NOW() 
@@ -72,6 +318,9 @@ def complete_task(task_id):
             (task_id,)
         )
         conn.commit()
+        invalidate_user_tasks(user_id)
+        cancel_reminders([task_id])
+        publish_task_event(user_id, 'task.completed', {'task_id': task_id})
         return jsonify({'message': 'Task marked as complete'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -81,22 +330,35 @@ def complete_task(task_id):
 
 @app.route('/tasks/history/<user_id>', methods=['GET'])
 def get_task_history(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    if not is_owner(user_id):
+        return forbidden()
 
     try:
-        cursor.execute("""
+        if request.args.get('stream'):
+            return stream_tasks("""
+                SELECT * FROM tasks 
+                WHERE user_id = %s AND is_completed = TRUE 
+                ORDER BY completed_at DESC
+            """, (user_id,), request.args['stream'])
+
+        version = list_version(user_id)
+        if etag_matches(version):
+            return not_modified(version, LIST_CACHE_CONTROL)
+
+        if wants_page():
+            tasks, next_cursor = fetch_task_page(user_id, True, 'completed_at', descending=True)
+            return with_etag(page_response(tasks, next_cursor), version, LIST_CACHE_CONTROL), 200
+
+        tasks = fetch_user_tasks(user_id, 'history', """
             SELECT * FROM tasks 
             WHERE user_id = %s AND is_completed = TRUE 
             ORDER BY completed_at DESC
-        """, (user_id,))
-        tasks = cursor.fetchall()
-        return jsonify(tasks), 200
+        """, (user_id,), version)
+        return with_etag(jsonify(tasks), version, LIST_CACHE_CONTROL), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 @app.route('/tasks/<task_id>', methods=['PUT'])
 def update_task(task_id):
@@ -111,12 +373,24 @@ def update_task(task_id):
             if key in ['task_text', 'deadline', 'reminder']:
                 update_fields.append(f"{key} = %s")
                 params.append(value)
+            if key in KIND_COLUMNS:
+                # A moved reminder or deadline fires again at its new time
+                update_fields.append(f"{KIND_COLUMNS[key][1]} = NULL")
         
         params.append(task_id)
         query = f"UPDATE tasks SET {', '.join(update_fields)} WHERE task_id = %s"
         
+        user_id = get_task_owner(cursor, task_id)
+        if user_id and not is_owner(user_id):
+            return forbidden()
         cursor.execute(query, params)
         conn.commit()
+        invalidate_user_tasks(user_id)
+        schedule_reminders(task_id, data)
+        publish_task_event(user_id, 'task.updated', {
+            'task_id': task_id,
+            **{key: value for key, value in data.items() if key in ['task_text', 'deadline', 'reminder']}
+        })
         return jsonify({'message': 'Task updated successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -127,19 +401,46 @@ def update_task(task_id):
 @app.route('/tasks', methods=['GET'])
 def get_tasks_by_status():
     status = request.args.get('status', 'pending')
-    user_id = request.args.get('user_id')
+    user_id = request.args.get('user_id') or trusted_user_id()
     
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    if not is_owner(user_id):
+        return forbidden()
 
     try:
         # Convert status to boolean for is_completed field
         is_completed = status == 'completed'
+        view = 'status:completed' if is_completed else 'status:pending'
+
+        if request.args.get('stream'):
+            return stream_tasks("""
+                SELECT * FROM tasks 
+                WHERE user_id = %s AND is_completed = %s
+                ORDER BY 
+                    CASE 
+                        WHEN deadline IS NOT NULL THEN deadline 
+                        ELSE created_at 
+                    END ASC
+            """, (user_id, is_completed), request.args['stream'], wrap_key='tasks')
+
+        version = list_version(user_id)
+        if etag_matches(version):
+            return not_modified(version, LIST_CACHE_CONTROL)
+
+        if wants_page():
+            # Must match the functional index expression to be served from it
+            tasks, next_cursor = fetch_task_page(
+                user_id, is_completed,
+                'CASE WHEN deadline IS NOT NULL THEN deadline ELSE created_at END',
+                descending=False
+            )
+            response = page_response({
+                'tasks': [format_task_response(task) for task in tasks]
+            }, next_cursor)
+            return with_etag(response, version, LIST_CACHE_CONTROL), 200
         
-        cursor.execute("""
+        tasks = fetch_user_tasks(user_id, view, """
             SELECT * FROM tasks 
             WHERE user_id = %s AND is_completed = %s
             ORDER BY 
@@ -147,17 +448,46 @@ def get_tasks_by_status():
                     WHEN deadline IS NOT NULL THEN deadline 
                     ELSE created_at 
                 END ASC
-        """, (user_id, is_completed))
+        """, (user_id, is_completed), version)
         
-        tasks = cursor.fetchall()
-        return jsonify({
-            'tasks': [format_task_response(task) for task in tasks]
-        }), 200
+        response = jsonify({
+            'tasks': [format_task_response(dict(task)) for task in tasks]
+        })
+        return with_etag(response, version, LIST_CACHE_CONTROL), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+@app.route('/tasks/export/<user_id>', methods=['GET'])
+def export_tasks(user_id):
+    """Stream every task a user has, pending first, each group oldest first."""
+    if not is_owner(user_id):
+        return forbidden()
+
+    try:
+        # Ordered to walk idx_tasks_user_status_created without a filesort
+        return stream_tasks("""
+            SELECT * FROM tasks 
+            WHERE user_id = %s
+            ORDER BY is_completed ASC, created_at ASC
+        """, (user_id,), request.args.get('format', 'ndjson'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/tasks/events/<user_id>', methods=['GET'])
+def task_events(user_id):
+    """Server-Sent Events stream of the user's task changes."""
+    if not is_owner(user_id):
+        return forbidden()
+
+    stream = app.extensions['task_events'].stream(user_id, app.config['TASK_EVENTS']['keepalive'])
+    return Response(stream, content_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/tasks/<task_id>', methods=['DELETE'])
 def delete_task(task_id):
@@ -165,8 +495,14 @@ def delete_task(task_id):
     cursor = conn.cursor()
 
     try:
+        user_id = get_task_owner(cursor, task_id)
+        if user_id and not is_owner(user_id):
+            return forbidden()
         cursor.execute("DELETE FROM tasks WHERE task_id = %s", (task_id,))
         conn.commit()
+        invalidate_user_tasks(user_id)
+        cancel_reminders([task_id])
+        publish_task_event(user_id, 'task.deleted', {'task_id': task_id})
         return jsonify({'message': 'Task deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -174,5 +510,149 @@ def delete_task(task_id):
         cursor.close()
         conn.close()
 
+# Batch operations: one transaction and one multi-row statement per request,
+# with a result per item in request order
+def fetch_owners(cursor, task_ids):
+    """Map task_id -> user_id for the tasks that exist, locking them until commit."""
+    placeholders = ', '.join(['%s'] * len(task_ids))
+    cursor.execute(
+        f"SELECT task_id, user_id FROM tasks WHERE task_id IN ({placeholders}) FOR UPDATE",
+        task_ids
+    )
+    return dict(cursor.fetchall())
+
+def batch_result(task_id, owners, message):
+    if task_id not in owners:
+        return {'task_id': task_id, 'status': 404, 'error': 'Task not found'}
+    if not is_owner(owners[task_id]):
+        return {'task_id': task_id, 'status': 403, 'error': 'Not allowed to modify this task'}
+    return {'task_id': task_id, 'status': 200, 'message': message}
+
+@app.route('/tasks/batch/create', methods=['POST'])
+def create_tasks_batch():
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id') or trusted_user_id()
+    items = data.get('tasks')
+
+    if not user_id or not isinstance(items, list) or not items:
+        return jsonify({'error': 'user_id and a non-empty tasks list are required'}), 400
+    if not is_owner(user_id):
+        return forbidden()
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} tasks per batch'}), 400
+
+    results = [None] * len(items)
+    rows = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('task_text'):
+            results[index] = {'index': index, 'status': 400, 'error': 'task_text is required'}
+            continue
+        task_id = str(uuid.uuid4())
+        rows.append((index, task_id, (task_id, user_id, item['task_text'], item.get('deadline'), item.get('reminder'))))
+
+    if not rows:
+        return jsonify({'results': results}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))
+        cursor.execute(
+            f"""INSERT INTO tasks (task_id, user_id, task_text, deadline, reminder)
+            VALUES {placeholders}""",
+            [value for _, _, values in rows for value in values]
+        )
+        conn.commit()
+        invalidate_user_tasks(user_id)
+        for _, task_id, values in rows:
+            schedule_reminders(task_id, {'deadline': values[3], 'reminder': values[4]})
+
+        # Fetch the created tasks
+        task_ids = [task_id for _, task_id, _ in rows]
+        placeholders = ', '.join(['%s'] * len(task_ids))
+        cursor.execute(f"SELECT * FROM tasks WHERE task_id IN ({placeholders})", task_ids)
+        created = {task['task_id']: task for task in cursor.fetchall()}
+
+        for index, task_id, _ in rows:
+            task = format_task_response(created[task_id])
+            publish_task_event(user_id, 'task.created', task)
+            results[index] = {'index': index, 'status': 201, 'task': task}
+        return jsonify({'results': results}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/tasks/batch/complete', methods=['POST'])
+def complete_tasks_batch():
+    try:
+        task_ids = parse_task_ids(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        owners = fetch_owners(cursor, task_ids)
+        found = [task_id for task_id in task_ids if task_id in owners and is_owner(owners[task_id])]
+        if found:
+            placeholders = ', '.join(['%s'] * len(found))
+            cursor.execute(
+                f"""UPDATE tasks 
+                SET is_completed = TRUE, completed_at = NOW() 
+                WHERE task_id IN ({placeholders})""",
+                found
+            )
+            conn.commit()
+            for user_id in set(owners[task_id] for task_id in found):
+                invalidate_user_tasks(user_id)
+            cancel_reminders(found)
+            for task_id in found:
+                publish_task_event(owners[task_id], 'task.completed', {'task_id': task_id})
+
+        return jsonify({'results': [
+            batch_result(task_id, owners, 'Task marked as complete') for task_id in task_ids
+        ]}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/tasks/batch/delete', methods=['POST'])
+def delete_tasks_batch():
+    try:
+        task_ids = parse_task_ids(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        owners = fetch_owners(cursor, task_ids)
+        found = [task_id for task_id in task_ids if task_id in owners and is_owner(owners[task_id])]
+        if found:
+            placeholders = ', '.join(['%s'] * len(found))
+            cursor.execute(f"DELETE FROM tasks WHERE task_id IN ({placeholders})", found)
+            conn.commit()
+            for user_id in set(owners[task_id] for task_id in found):
+                invalidate_user_tasks(user_id)
+            cancel_reminders(found)
+            for task_id in found:
+                publish_task_event(owners[task_id], 'task.deleted', {'task_id': task_id})
+
+        return jsonify({'results': [
+            batch_result(task_id, owners, 'Task deleted successfully') for task_id in task_ids
+        ]}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 if __name__ == '__main__':
     app.run(port=5002)
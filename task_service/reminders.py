@@ -0,0 +1,365 @@
+import os
+import heapq
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Event kind -> (time column, column recording that the event was sent)
+KIND_COLUMNS = {
+    'reminder': ('reminder', 'reminder_sent_at'),
+    'deadline': ('deadline', 'deadline_sent_at')
+}
+
+
+def reminder_config_from_env():
+    """Read reminder scheduler settings from the environment."""
+    return {
+        'enabled': os.getenv('REMINDER_SCHEDULER', 'true').lower() in ('1', 'true', 'yes'),
+        'sink': os.getenv('REMINDER_SINK', 'log'),
+        'webhook_url': os.getenv('REMINDER_WEBHOOK_URL') or None,
+        'horizon': float(os.getenv('REMINDER_HORIZON', 3600)),
+        'batch_size': int(os.getenv('REMINDER_BATCH_SIZE', 10000)),
+        'catchup': float(os.getenv('REMINDER_CATCHUP', 300)),
+        'retry_backoff': float(os.getenv('REMINDER_RETRY_BACKOFF', 5)),
+        'max_retry_backoff': float(os.getenv('REMINDER_MAX_RETRY_BACKOFF', 300))
+    }
+
+
+class LogSink:
+    """Write due events to the service log."""
+
+    def emit(self, event):
+        logger.info("Task %s due: %s", event['type'], event['task_id'], extra={'event': event})
+
+
+class WebhookSink:
+    """POST each due event as JSON to a local webhook."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def emit(self, event):
+        response = self.session.post(self.url, json=event, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class QueueSink:
+    """Hand due events to in-process consumers through a bounded queue."""
+
+    def __init__(self, maxsize=10000):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def emit(self, event):
+        self.queue.put_nowait(event)
+
+
+def create_sink(kind='log', webhook_url=None):
+    """Build the sink selected in config ('log', 'webhook' or 'queue')."""
+    if kind == 'webhook':
+        if not webhook_url:
+            raise ValueError('REMINDER_WEBHOOK_URL is required for the webhook sink')
+        return WebhookSink(webhook_url)
+    if kind == 'queue':
+        return QueueSink()
+    return LogSink()
+
+
+def parse_due(value):
+    """Accept a datetime or an ISO-ish string from a request body; None if absent or unparseable.
+
+    Times with an offset ("...+02:00", "...Z") are converted to naive UTC, like
+    the DATETIME columns and the scheduler's window.
+    """
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ReminderScheduler:
+    """Fire reminder and deadline events when they come due.
+
+    Only the events due in the next `horizon` seconds are held, in a heap
+    ordered by due time. They are loaded with a range query on the
+    (is_completed, reminder) and (is_completed, deadline) indexes, at most
+    batch_size rows at a time. The thread sleeps until the earliest of the
+    next due event and the end of the loaded window. It never scans the
+    table, and memory does not depend on how many reminders exist in total.
+
+    Writes call schedule() and cancel() so the heap follows edits inside
+    the window; anything later is picked up when the window advances.
+    Before an event is emitted it is claimed by setting its *_sent_at
+    column. So each event fires once, even with several worker processes or
+    after a restart that replays the last `catchup` seconds. If the sink
+    fails, the claim is cleared again and the event is retried with
+    exponential backoff, so a sink outage delays reminders instead of
+    dropping them.
+    """
+
+    def __init__(self, connect, sink, horizon=3600, batch_size=10000, catchup=300,
+                 retry_backoff=5, max_retry_backoff=300, clock=datetime.utcnow):
+        self.connect = connect
+        self.sink = sink
+        self.horizon = timedelta(seconds=horizon)
+        self.batch_size = batch_size
+        self.catchup = timedelta(seconds=catchup)
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.clock = clock
+
+        self._heap = []
+        self._scheduled = {}  # (task_id, kind) -> due time currently in force
+        self._loaded_until = {}  # kind -> due time up to which the heap is complete
+        self._cursor = {}  # kind -> (due, task_id) keyset position of the last load
+        self._retrying = {}  # (task_id, kind) -> (original due time, failed attempts)
+        self._lock = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stats = {
+            'loaded': 0,
+            'fired': 0,
+            'skipped': 0,
+            'sink_errors': 0,
+            'unclaim_errors': 0,
+            'load_errors': 0
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            start = self.clock() - self.catchup
+            for kind in KIND_COLUMNS:
+                self._loaded_until[kind] = start
+                self._cursor[kind] = (start, '')
+            self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            self._lock.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def schedule(self, task_id, kind, due):
+        """Record a new or changed reminder/deadline time for a task."""
+        due = parse_due(due)
+        with self._lock:
+            self._retrying.pop((task_id, kind), None)
+            if due is None or kind not in self._loaded_until or due > self._loaded_until[kind]:
+                # Outside the loaded window: the window load will find it
+                self._scheduled.pop((task_id, kind), None)
+                return
+            self._scheduled[(task_id, kind)] = due
+            heapq.heappush(self._heap, (due, task_id, kind))
+            self._lock.notify()
+
+    def cancel(self, task_id):
+        """Forget a task's pending events (completed or deleted)."""
+        with self._lock:
+            for kind in KIND_COLUMNS:
+                self._scheduled.pop((task_id, kind), None)
+                self._retrying.pop((task_id, kind), None)
+
+    def _load(self, kind, now):
+        """Load the next slice of kind's events into the heap via the index."""
+        column, sent_column = KIND_COLUMNS[kind]
+        after_due, after_id = self._cursor[kind]
+        window_end = now + self.horizon
+
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""SELECT task_id, {column} FROM tasks
+                WHERE is_completed = FALSE
+                AND ({column} > %s OR ({column} = %s AND task_id > %s))
+                AND {column} <= %s AND {sent_column} IS NULL
+                ORDER BY {column}, task_id LIMIT %s""",
+                (after_due, after_due, after_id, window_end, self.batch_size)
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            for task_id, due in rows:
+                self._scheduled[(task_id, kind)] = due
+                heapq.heappush(self._heap, (due, task_id, kind))
+            self._stats['loaded'] += len(rows)
+            if len(rows) == self.batch_size:
+                # More rows inside the window; continue from the last one next time
+                self._cursor[kind] = (rows[-1][1], rows[-1][0])
+                self._loaded_until[kind] = rows[-1][1]
+            else:
+                self._cursor[kind] = (window_end, '')
+                self._loaded_until[kind] = window_end
+
+    def _take_due(self, now):
+        """Pop every event due by now that is still current."""
+        due_events = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, task_id, kind = heapq.heappop(self._heap)
+                if self._scheduled.get((task_id, kind)) == due:
+                    del self._scheduled[(task_id, kind)]
+                    # A retry is queued at its retry time but claimed by its due time
+                    due = self._retrying.get((task_id, kind), (due, 0))[0]
+                    due_events.append((task_id, kind, due))
+        return due_events
+
+    def _fire(self, due_events):
+        """Claim each event in the database, then emit the ones this process won."""
+        conn = self.connect()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            claimed = []
+            for task_id, kind, due in due_events:
+                column, sent_column = KIND_COLUMNS[kind]
+                cursor.execute(
+                    f"""UPDATE tasks SET {sent_column} = UTC_TIMESTAMP()
+                    WHERE task_id = %s AND {column} = %s
+                    AND is_completed = FALSE AND {sent_column} IS NULL""",
+                    (task_id, due)
+                )
+                if cursor.rowcount == 1:
+                    claimed.append((task_id, kind, due))
+            conn.commit()
+
+            tasks = {}
+            if claimed:
+                task_ids = list({task_id for task_id, _, _ in claimed})
+                placeholders = ', '.join(['%s'] * len(task_ids))
+                cursor.execute(
+                    f"SELECT task_id, user_id, task_text FROM tasks WHERE task_id IN ({placeholders})",
+                    task_ids
+                )
+                tasks = {row['task_id']: row for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            self._stats['skipped'] += len(due_events) - len(claimed)
+            for task_id, kind, due in due_events:
+                if (task_id, kind, due) not in claimed:
+                    self._retrying.pop((task_id, kind), None)
+
+        failed = []
+        for task_id, kind, due in claimed:
+            task = tasks.get(task_id)
+            if task is None:
+                with self._lock:
+                    self._retrying.pop((task_id, kind), None)
+                continue
+            event = {
+                'type': kind,
+                'task_id': task_id,
+                'user_id': task['user_id'],
+                'task_text': task['task_text'],
+                'due_at': due.isoformat()
+            }
+            try:
+                self.sink.emit(event)
+                with self._lock:
+                    self._stats['fired'] += 1
+                    self._retrying.pop((task_id, kind), None)
+            except Exception as e:
+                logger.warning("Reminder sink failed for task %s: %s", task_id, e)
+                with self._lock:
+                    self._stats['sink_errors'] += 1
+                failed.append((task_id, kind, due))
+
+        if failed:
+            self._unclaim(failed)
+            self._retry_later(failed)
+
+    def _unclaim(self, events):
+        """Clear the *_sent_at claim of events the sink did not take."""
+        try:
+            conn = self.connect()
+            cursor = conn.cursor()
+            try:
+                for task_id, kind, due in events:
+                    column, sent_column = KIND_COLUMNS[kind]
+                    cursor.execute(
+                        f"""UPDATE tasks SET {sent_column} = NULL
+                        WHERE task_id = %s AND {column} = %s""",
+                        (task_id, due)
+                    )
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+        except Exception as e:
+            # The retries below then lose their claim and are skipped
+            logger.error("Could not release %d undelivered reminder claims: %s", len(events), e)
+            with self._lock:
+                self._stats['unclaim_errors'] += 1
+
+    def _retry_later(self, events):
+        """Queue undelivered events again, backing off after each failure."""
+        now = self.clock()
+        with self._lock:
+            for task_id, kind, due in events:
+                key = (task_id, kind)
+                if key in self._scheduled:
+                    continue  # rescheduled while it was being sent
+                attempts = self._retrying.get(key, (due, 0))[1] + 1
+                delay = min(self.retry_backoff * 2 ** (attempts - 1), self.max_retry_backoff)
+                retry_at = now + timedelta(seconds=delay)
+                self._retrying[key] = (due, attempts)
+                self._scheduled[key] = retry_at
+                heapq.heappush(self._heap, (retry_at, task_id, kind))
+            self._lock.notify()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            now = self.clock()
+            try:
+                for kind in KIND_COLUMNS:
+                    if now >= self._loaded_until[kind]:
+                        self._load(kind, now)
+                due_events = self._take_due(now)
+                if due_events:
+                    self._fire(due_events)
+            except Exception as e:
+                logger.warning("Reminder scheduler pass failed: %s", e)
+                with self._lock:
+                    self._stats['load_errors'] += 1
+                self._stopped.wait(5)
+                continue
+
+            with self._lock:
+                wake_at = min(self._loaded_until.values())
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                timeout = (wake_at - self.clock()).total_seconds()
+                if timeout > 0 and not self._stopped.is_set():
+                    self._lock.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['scheduled'] = len(self._scheduled)
+            stats['retrying'] = len(self._retrying)
+            stats['loaded_until'] = {
+                kind: until.isoformat() for kind, until in self._loaded_until.items()
+            }
+        stats['sink'] = type(self.sink).__name__
+        return stats
@@ -0,0 +1,48 @@
+"""Import helpers for the unit tests.
+
+The services import their sibling modules by bare name (`from reminders import
+...`) and each has its own `__init__` module, so service modules are loaded by
+path under a unique name, with their directory briefly on sys.path.
+"""
+import os
+import sys
+import importlib.util
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def load_module(directory, filename, name):
+    """Import directory/filename as module `name`, as if run from the service's directory."""
+    if name in sys.modules:
+        return sys.modules[name]
+    path = os.path.join(PROJECT_ROOT, directory)
+    before = set(sys.modules)
+    sys.path.insert(0, path)
+    try:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(path, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        sys.path.remove(path)
+        # Drop sibling modules imported by bare name (every service has an `__init__`)
+        for module_name in set(sys.modules) - before - {name}:
+            module_file = getattr(sys.modules[module_name], '__file__', None) or ''
+            if os.path.dirname(os.path.abspath(module_file)) == path:
+                del sys.modules[module_name]
+
+
+class FakeClock:
+    """A clock the test moves by hand; returns whatever `now` is set to."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, delta):
+        self.now += delta
@@ -0,0 +1,104 @@
+from conftest import FakeClock, load_module
+
+circuit_breaker = load_module('api_gateway', 'circuit_breaker.py', 'gateway_circuit_breaker')
+CircuitBreaker = circuit_breaker.CircuitBreaker
+
+
+def make_breaker(**options):
+    clock = FakeClock(100.0)
+    settings = dict(window=10, min_calls=4, error_rate=0.5, slow_call_ms=1000,
+                    slow_rate=0.8, open_seconds=10, half_open_calls=2)
+    settings.update(options)
+    return CircuitBreaker('task', clock=clock, **settings), clock
+
+
+def record_calls(breaker, outcomes, elapsed=0.01):
+    for failed in outcomes:
+        assert breaker.allow()
+        breaker.record(failed, elapsed)
+
+
+def test_stays_closed_below_min_calls():
+    breaker, _ = make_breaker()
+    record_calls(breaker, [True, True, True])
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.allow()
+
+
+def test_opens_at_error_rate_and_rejects():
+    breaker, _ = make_breaker()
+    record_calls(breaker, [False, True, False, True])
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_opens_on_slow_calls():
+    breaker, _ = make_breaker()
+    record_calls(breaker, [False] * 4, elapsed=2.0)
+    assert breaker.state == circuit_breaker.OPEN
+
+
+def test_retry_after_counts_down_while_open():
+    breaker, clock = make_breaker()
+    record_calls(breaker, [True] * 4)
+    clock.advance(4)
+    assert breaker.retry_after() == 6
+    clock.advance(10)
+    assert not breaker.is_open()
+
+
+def test_half_open_closes_after_successful_trials():
+    breaker, clock = make_breaker()
+    record_calls(breaker, [True] * 4)
+    clock.advance(10)
+
+    assert breaker.allow()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert breaker.allow()
+    # Only half_open_calls trials go through
+    assert not breaker.allow()
+
+    breaker.record(False, 0.01)
+    breaker.record(False, 0.01)
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_reopens_on_a_failed_trial():
+    breaker, clock = make_breaker()
+    record_calls(breaker, [True] * 4)
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record(True, 0.01)
+    assert breaker.state == circuit_breaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_rearms_trials_that_never_report():
+    breaker, clock = make_breaker()
+    record_calls(breaker, [True] * 4)
+    clock.advance(10)
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()
+    # The two trials were cancelled and never recorded
+    clock.advance(10)
+    assert breaker.allow()
+
+
+def test_calls_started_before_opening_are_ignored():
+    breaker, _ = make_breaker()
+    record_calls(breaker, [True] * 4)
+    breaker.record(False, 0.01)
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.stats()['recent_calls'] == 0
+
+
+def test_disabled_breaker_always_allows():
+    breaker, _ = make_breaker(enabled=False)
+    for _ in range(20):
+        assert breaker.allow()
+        breaker.record(True, 5.0)
+    assert not breaker.is_open()
+    assert breaker.stats()['state'] == 'disabled'
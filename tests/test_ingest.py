@@ -0,0 +1,139 @@
+import json
+
+from conftest import load_module  # noqa: F401  (puts the project root on sys.path)
+from common.ingest import CoalescingQueue
+
+
+class Recorder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, batch):
+        if self.fail:
+            raise RuntimeError('service down')
+        self.batches.append(batch)
+
+
+def make_queue(flush_fn, **options):
+    queue = CoalescingQueue(flush_fn, flush_interval=3600, **options)
+    # Keep the background flusher out of the way; tests flush by hand
+    queue._thread = object()
+    return queue
+
+
+def test_repeated_keys_are_coalesced():
+    recorder = Recorder()
+    queue = make_queue(recorder)
+    for key in ('milk', 'milk', 'bread', 'milk'):
+        assert queue.add(key)
+    assert queue.flush() == 2
+    assert recorder.batches == [{'milk': 3, 'bread': 1}]
+    assert queue.flush() == 0
+
+
+def test_flush_splits_into_max_batch_chunks():
+    recorder = Recorder()
+    queue = make_queue(recorder, max_batch=2)
+    for key in 'abcde':
+        queue.add(key)
+    queue.flush()
+    assert [len(batch) for batch in recorder.batches] == [2, 2, 1]
+
+
+def test_full_queue_drops_new_keys_but_counts_known_ones():
+    queue = make_queue(Recorder(), max_pending=2)
+    assert queue.add('a') and queue.add('b')
+    assert not queue.add('c')
+    assert queue.add('a')
+    stats = queue.stats()
+    assert stats['dropped'] == 1
+    assert stats['pending'] == 2
+
+
+def test_empty_keys_are_ignored():
+    queue = make_queue(Recorder())
+    assert not queue.add('')
+    assert not queue.add(None)
+
+
+def test_failed_batches_are_requeued():
+    recorder = Recorder(fail=True)
+    queue = make_queue(recorder)
+    queue.add('a')
+    queue.add('a')
+    assert queue.flush() == 0
+    assert queue.stats()['flush_errors'] == 1
+
+    recorder.fail = False
+    queue.add('a')
+    queue.flush()
+    assert recorder.batches == [{'a': 3}]
+
+
+def test_spool_is_replayed_and_compacted(tmp_path):
+    spool = tmp_path / 'ingest.jsonl'
+    spool.write_text(
+        json.dumps({'k': 'a', 'd': 2}) + '\n' + '{"k": "torn' + '\n' + json.dumps({'k': 'b', 'd': 1}) + '\n'
+    )
+    recorder = Recorder(fail=True)
+    queue = CoalescingQueue(recorder, flush_interval=3600, spool_path=str(spool))
+    queue.start()
+    try:
+        queue.add('a')
+        assert queue.stats()['pending'] == 2
+        queue.flush()
+        # Still pending after the failed flush, rewritten as one line per key
+        lines = [json.loads(line) for line in spool.read_text().splitlines()]
+        assert sorted((line['k'], line['d']) for line in lines) == [('a', 3), ('b', 1)]
+    finally:
+        recorder.fail = False
+        queue.close()
+    assert recorder.batches == [{'a': 3, 'b': 1}]
+
+
+class RejectKeys(Recorder):
+    """Accepts any batch that holds none of the rejected keys."""
+
+    def __init__(self, rejected):
+        super().__init__()
+        self.rejected = set(rejected)
+        self.calls = 0
+
+    def __call__(self, batch):
+        self.calls += 1
+        if self.rejected & set(batch):
+            raise RuntimeError('Data too long for column task_text')
+        self.batches.append(batch)
+
+
+def test_a_rejected_key_is_isolated_and_discarded():
+    recorder = RejectKeys({'k5'})
+    queue = make_queue(recorder)
+    for i in range(8):
+        queue.add(f'k{i}')
+    assert queue.flush() == 7
+
+    delivered = {key for batch in recorder.batches for key in batch}
+    assert delivered == {f'k{i}' for i in range(8)} - {'k5'}
+    stats = queue.stats()
+    assert (stats['discarded'], stats['pending']) == (1, 0)
+
+
+def test_a_down_receiver_keeps_the_whole_chunk():
+    recorder = Recorder(fail=True)
+    queue = make_queue(recorder)
+    for i in range(8):
+        queue.add(f'k{i}')
+    assert queue.flush() == 0
+    stats = queue.stats()
+    # The chunk and its two halves, then no further splitting
+    assert (stats['flush_errors'], stats['discarded'], stats['pending']) == (3, 0, 8)
+
+
+def test_rejected_keys_in_both_halves_wait_for_another_mix():
+    queue = make_queue(RejectKeys({'k0', 'k7'}))
+    for i in range(8):
+        queue.add(f'k{i}')
+    assert queue.flush() == 0
+    assert queue.stats()['pending'] == 8
@@ -0,0 +1,33 @@
+from conftest import load_module  # noqa: F401  (puts the project root on sys.path)
+from common.metrics import MetricsRegistry
+
+
+def test_render_with_mixed_status_labels():
+    registry = MetricsRegistry('gateway')
+    histogram = registry.histogram(
+        'upstream_request_duration_seconds', 'Upstream latency.', ('upstream', 'method', 'status')
+    )
+    histogram.observe(0.02, 'task', 'GET', 200)
+    histogram.observe(2.0, 'task', 'GET', 'error')
+    histogram.observe(0.01, 'task', 'GET', 404)
+    registry.gauge('pool_connections', 'Connections.', ('state',), lambda: {(1,): 3, ('idle',): 2})
+
+    text = registry.render()
+    counts = [line for line in text.splitlines() if line.startswith('upstream_request_duration_seconds_count')]
+    assert counts == [
+        'upstream_request_duration_seconds_count{upstream="task",method="GET",status="200"} 1',
+        'upstream_request_duration_seconds_count{upstream="task",method="GET",status="404"} 1',
+        'upstream_request_duration_seconds_count{upstream="task",method="GET",status="error"} 1'
+    ]
+    assert 'pool_connections{state="idle"} 2' in text
+
+
+def test_buckets_are_cumulative():
+    registry = MetricsRegistry('task')
+    histogram = registry.histogram('db_query_duration_seconds', 'Query time.', ('statement',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, 'select')
+    lines = registry.render().splitlines()
+    assert 'db_query_duration_seconds_bucket{statement="select",le="0.1"} 1' in lines
+    assert 'db_query_duration_seconds_bucket{statement="select",le="1"} 2' in lines
+    assert 'db_query_duration_seconds_bucket{statement="select",le="+Inf"} 3' in lines
@@ -0,0 +1,121 @@
+import pytest
+
+from conftest import FakeClock, load_module
+
+rate_limit = load_module('api_gateway', 'rate_limit.py', 'gateway_rate_limit')
+
+
+def test_parse_route_limits():
+    assert rate_limit.parse_route_limits('login=0.2:5, get_suggestions=5,,register=0:3') == {
+        'login': (0.2, 5.0),
+        'get_suggestions': (5.0, 5.0)
+    }
+
+
+def test_default_route_limits_parse():
+    limits = rate_limit.parse_route_limits(rate_limit.DEFAULT_ROUTE_LIMITS)
+    assert limits['login'] == (0.2, 5.0)
+
+
+@pytest.mark.parametrize('seconds, header', [(0.01, '1'), (1.0, '1'), (1.2, '2'), (30, '30')])
+def test_retry_after_header_rounds_up(seconds, header):
+    assert rate_limit.retry_after_header(seconds) == header
+
+
+def test_bucket_allows_burst_then_waits_for_refill():
+    clock = FakeClock()
+    store = rate_limit.MemoryBucketStore(clock=clock)
+    assert [store.take('k', 2, 3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take('k', 2, 3) == pytest.approx(0.5)
+
+    clock.advance(0.5)
+    assert store.take('k', 2, 3) == 0.0
+
+
+def test_bucket_refill_is_capped_at_burst():
+    clock = FakeClock()
+    store = rate_limit.MemoryBucketStore(clock=clock)
+    store.take('k', 1, 2)
+    clock.advance(3600)
+    assert [store.take('k', 1, 2) for _ in range(3)][:2] == [0.0, 0.0]
+    assert store.take('k', 1, 2) > 0
+
+
+def test_store_evicts_least_recently_used():
+    store = rate_limit.MemoryBucketStore(max_keys=2, clock=FakeClock())
+    store.take('a', 1, 1)
+    store.take('b', 1, 1)
+    store.take('a', 1, 1)
+    store.take('c', 1, 1)
+    assert len(store) == 2
+    # b was evicted, so it comes back with a full bucket
+    assert store.take('b', 1, 1) == 0.0
+
+
+def test_limiter_applies_route_then_user_limit():
+    store = rate_limit.MemoryBucketStore(clock=FakeClock())
+    limiter = rate_limit.RateLimiter(store, user_rate=1, user_burst=3, routes={'login': (1, 1)})
+
+    assert limiter.check('login', 'ip:1') == 0.0
+    assert limiter.check('login', 'ip:1') > 0
+    # The rejected login took no user token, so two are left for other routes
+    assert limiter.check('get_tasks', 'ip:1') == 0.0
+    assert limiter.check('get_tasks', 'ip:1') == 0.0
+    assert limiter.check('get_tasks', 'ip:1') > 0
+    # Subjects do not share buckets
+    assert limiter.check('login', 'ip:2') == 0.0
+
+    stats = limiter.stats()
+    assert stats['limited_route'] == 1
+    assert stats['limited_user'] == 1
+    assert stats['allowed'] == 4
+
+
+def test_disabled_limiter_admits_everything():
+    limiter = rate_limit.create_rate_limiter(enabled=False)
+    assert all(limiter.check('login', 'ip:1') == 0.0 for _ in range(100))
+
+
+def test_concurrency_limit_sheds_beyond_cap():
+    limit = rate_limit.ConcurrencyLimit(max_concurrency=2)
+    assert limit.acquire() and limit.acquire()
+    assert not limit.acquire()
+    limit.release()
+    assert limit.acquire()
+    stats = limit.stats()
+    assert stats['shed'] == 1
+    assert stats['in_flight'] == 2
+    assert stats['in_flight_max'] == 2
+
+
+def test_concurrency_limit_of_zero_is_unlimited():
+    limit = rate_limit.ConcurrencyLimit(max_concurrency=0)
+    assert all(limit.acquire() for _ in range(1000))
+
+
+def test_a_request_rejected_by_the_user_limit_keeps_its_route_token():
+    clock = FakeClock()
+    store = rate_limit.MemoryBucketStore(clock=clock)
+    limiter = rate_limit.RateLimiter(store, user_rate=1, user_burst=1, routes={'login': (0.1, 2)})
+
+    assert limiter.check('get_tasks', 'ip:1') == 0.0
+    # Over the user limit: both of these are rejected without spending login tokens
+    assert limiter.check('login', 'ip:1') > 0
+    assert limiter.check('login', 'ip:1') > 0
+
+    clock.advance(1)
+    assert limiter.check('login', 'ip:1') == 0.0
+    clock.advance(1)
+    assert limiter.check('login', 'ip:1') == 0.0
+    assert limiter.stats()['limited_route'] == 0
+
+
+def test_refund_is_capped_at_burst():
+    store = rate_limit.MemoryBucketStore(clock=FakeClock())
+    store.take('k', 1, 2)
+    store.refund('k', 1, 2)
+    store.refund('k', 1, 2)
+    store.refund('missing', 1, 2)
+    assert [store.take('k', 1, 2) for _ in range(3)][:2] == [0.0, 0.0]
+    assert store.take('k', 1, 2) > 0
+    assert len(store) == 1
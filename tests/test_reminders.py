@@ -0,0 +1,260 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import FakeClock, load_module
+
+reminders = load_module('task_service', 'reminders.py', 'task_service_reminders')
+ReminderScheduler = reminders.ReminderScheduler
+
+NOW = datetime(2025, 11, 14, 12, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, query, params):
+        self.db.queries.append((' '.join(query.split()), params))
+        if 'SET' in query and '= NULL' in query:
+            # Claim released after a sink failure
+            self.db.claimable.add(params[0])
+        elif query.lstrip().startswith('UPDATE'):
+            task_id = params[0]
+            self.rowcount = 1 if task_id in self.db.claimable else 0
+            self.db.claimable.discard(task_id)
+        elif 'IN (' in query:
+            self._rows = [self.db.tasks[task_id] for task_id in params if task_id in self.db.tasks]
+        else:
+            self._rows = self.db.load_rows.pop(0)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Stands in for mysql.connector: records queries and answers from canned rows."""
+
+    def __init__(self, load_rows=None, claimable=(), tasks=None):
+        self.load_rows = list(load_rows or [])
+        self.claimable = set(claimable)
+        self.tasks = tasks or {}
+        self.queries = []
+        self.commits = 0
+
+    def __call__(self):
+        return self
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class ListSink:
+    def __init__(self, fail=False):
+        self.events = []
+        self.fail = fail
+
+    def emit(self, event):
+        if self.fail:
+            raise RuntimeError('webhook down')
+        self.events.append(event)
+
+
+def make_scheduler(db=None, sink=None, clock=lambda: NOW, **options):
+    scheduler = ReminderScheduler(db or FakeDatabase(), sink or ListSink(), horizon=3600,
+                                  clock=clock, **options)
+    # What start() sets up, without the thread
+    for kind in reminders.KIND_COLUMNS:
+        scheduler._loaded_until[kind] = NOW
+        scheduler._cursor[kind] = (NOW, '')
+    return scheduler
+
+
+@pytest.mark.parametrize('value', [
+    '2025-11-14T10:00:00',
+    '2025-11-14T10:00:00Z',
+    '2025-11-14T10:00:00+00:00',
+    '2025-11-14T12:00:00+02:00',
+    datetime(2025, 11, 14, 10, 0, 0)
+])
+def test_parse_due_returns_naive_utc(value):
+    assert reminders.parse_due(value) == datetime(2025, 11, 14, 10, 0, 0)
+
+
+@pytest.mark.parametrize('value', [None, '', 'tomorrow'])
+def test_parse_due_rejects_missing_or_bad_values(value):
+    assert reminders.parse_due(value) is None
+
+
+def test_schedule_inside_the_window_is_held():
+    scheduler = make_scheduler()
+    scheduler._loaded_until['reminder'] = NOW + timedelta(hours=1)
+    scheduler.schedule('t1', 'reminder', NOW + timedelta(minutes=5))
+    assert scheduler._scheduled == {('t1', 'reminder'): NOW + timedelta(minutes=5)}
+
+
+def test_schedule_outside_the_window_is_left_to_the_next_load():
+    scheduler = make_scheduler()
+    scheduler._loaded_until['reminder'] = NOW + timedelta(hours=1)
+    scheduler.schedule('t1', 'reminder', NOW + timedelta(minutes=5))
+    # Moved beyond the window: the old time must not fire
+    scheduler.schedule('t1', 'reminder', NOW + timedelta(hours=2))
+    assert scheduler._scheduled == {}
+    assert scheduler._take_due(NOW + timedelta(minutes=10)) == []
+
+
+def test_rescheduled_and_cancelled_events_are_skipped():
+    scheduler = make_scheduler()
+    scheduler._loaded_until['reminder'] = NOW + timedelta(hours=1)
+    scheduler._loaded_until['deadline'] = NOW + timedelta(hours=1)
+    scheduler.schedule('t1', 'reminder', NOW + timedelta(minutes=1))
+    scheduler.schedule('t1', 'reminder', NOW + timedelta(minutes=3))
+    scheduler.schedule('t2', 'deadline', NOW + timedelta(minutes=2))
+    scheduler.schedule('t3', 'reminder', NOW + timedelta(minutes=2))
+    scheduler.cancel('t3')
+
+    assert scheduler._take_due(NOW + timedelta(minutes=2)) == [
+        ('t2', 'deadline', NOW + timedelta(minutes=2))
+    ]
+    assert scheduler._take_due(NOW + timedelta(minutes=5)) == [
+        ('t1', 'reminder', NOW + timedelta(minutes=3))
+    ]
+    assert scheduler._heap == []
+
+
+def test_load_fills_the_window_when_the_batch_is_short():
+    due = NOW + timedelta(minutes=10)
+    db = FakeDatabase(load_rows=[[('t1', due)]])
+    scheduler = make_scheduler(db, batch_size=10)
+    scheduler._load('reminder', NOW)
+
+    query, params = db.queries[0]
+    assert 'ORDER BY reminder, task_id LIMIT %s' in query
+    assert 'reminder_sent_at IS NULL' in query
+    assert params == (NOW, NOW, '', NOW + timedelta(hours=1), 10)
+    assert scheduler._loaded_until['reminder'] == NOW + timedelta(hours=1)
+    assert scheduler._cursor['reminder'] == (NOW + timedelta(hours=1), '')
+    assert scheduler._scheduled == {('t1', 'reminder'): due}
+
+
+def test_load_continues_from_the_last_row_of_a_full_batch():
+    first = NOW + timedelta(minutes=1)
+    second = NOW + timedelta(minutes=2)
+    db = FakeDatabase(load_rows=[[('t1', first), ('t2', second)], [('t3', second)]])
+    scheduler = make_scheduler(db, batch_size=2)
+
+    scheduler._load('reminder', NOW)
+    assert scheduler._loaded_until['reminder'] == second
+    assert scheduler._cursor['reminder'] == (second, 't2')
+    # A write just past the partial window is left to the next load
+    scheduler.schedule('t4', 'reminder', second + timedelta(seconds=1))
+    assert ('t4', 'reminder') not in scheduler._scheduled
+
+    scheduler._load('reminder', NOW)
+    assert db.queries[1][1][:3] == (second, second, 't2')
+    assert scheduler._loaded_until['reminder'] == NOW + timedelta(hours=1)
+    assert [task_id for _, task_id, _ in sorted(scheduler._heap)] == ['t1', 't2', 't3']
+
+
+def test_fire_emits_only_claimed_events():
+    due = NOW - timedelta(seconds=1)
+    db = FakeDatabase(
+        claimable={'t1'},
+        tasks={
+            't1': {'task_id': 't1', 'user_id': 'u1', 'task_text': 'Pay rent'},
+            't2': {'task_id': 't2', 'user_id': 'u1', 'task_text': 'Call mom'}
+        }
+    )
+    sink = ListSink()
+    scheduler = make_scheduler(db, sink)
+    scheduler._fire([('t1', 'reminder', due), ('t2', 'deadline', due)])
+
+    assert sink.events == [{
+        'type': 'reminder',
+        'task_id': 't1',
+        'user_id': 'u1',
+        'task_text': 'Pay rent',
+        'due_at': due.isoformat()
+    }]
+    updates = [query for query, _ in db.queries if query.startswith('UPDATE')]
+    assert 'SET reminder_sent_at = UTC_TIMESTAMP()' in updates[0]
+    assert 'deadline_sent_at IS NULL' in updates[1]
+    assert db.commits == 1
+    stats = scheduler.stats()
+    assert (stats['fired'], stats['skipped']) == (1, 1)
+
+
+def test_fire_skips_the_lookup_when_nothing_is_claimed():
+    db = FakeDatabase()
+    sink = ListSink()
+    scheduler = make_scheduler(db, sink)
+    scheduler._fire([('t1', 'reminder', NOW)])
+    assert sink.events == []
+    assert not any('IN (' in query for query, _ in db.queries)
+    assert scheduler.stats()['skipped'] == 1
+
+
+def test_sink_errors_are_counted_not_raised():
+    db = FakeDatabase(claimable={'t1'}, tasks={'t1': {'task_id': 't1', 'user_id': 'u1', 'task_text': 'x'}})
+    scheduler = make_scheduler(db, ListSink(fail=True))
+    scheduler._fire([('t1', 'reminder', NOW)])
+    stats = scheduler.stats()
+    assert (stats['fired'], stats['sink_errors'], stats['retrying']) == (0, 1, 1)
+
+
+def test_undelivered_events_are_unclaimed_and_retried_with_backoff():
+    due = NOW - timedelta(seconds=1)
+    db = FakeDatabase(claimable={'t1'}, tasks={'t1': {'task_id': 't1', 'user_id': 'u1', 'task_text': 'x'}})
+    sink = ListSink(fail=True)
+    clock = FakeClock(NOW)
+    scheduler = make_scheduler(db, sink, clock=clock, retry_backoff=5)
+
+    scheduler._fire([('t1', 'reminder', due)])
+    unclaim = db.queries[-1]
+    assert unclaim[0].startswith('UPDATE tasks SET reminder_sent_at = NULL')
+    assert unclaim[1] == ('t1', due)
+    assert 't1' in db.claimable
+
+    # Not before the backoff, then claimed again by its original due time
+    assert scheduler._take_due(NOW + timedelta(seconds=4)) == []
+    clock.now = NOW + timedelta(seconds=5)
+    retry = scheduler._take_due(clock.now)
+    assert retry == [('t1', 'reminder', due)]
+
+    # A second failure doubles the wait
+    scheduler._fire(retry)
+    assert scheduler._take_due(NOW + timedelta(seconds=14)) == []
+    clock.now = NOW + timedelta(seconds=15)
+    retry = scheduler._take_due(clock.now)
+    assert retry == [('t1', 'reminder', due)]
+
+    sink.fail = False
+    scheduler._fire(retry)
+    assert [event['due_at'] for event in sink.events] == [due.isoformat()]
+    stats = scheduler.stats()
+    assert (stats['fired'], stats['sink_errors'], stats['retrying']) == (1, 2, 0)
+
+
+def test_rescheduling_drops_a_pending_retry():
+    db = FakeDatabase(claimable={'t1'}, tasks={'t1': {'task_id': 't1', 'user_id': 'u1', 'task_text': 'x'}})
+    scheduler = make_scheduler(db, ListSink(fail=True))
+    scheduler._loaded_until['reminder'] = NOW + timedelta(hours=1)
+    scheduler._fire([('t1', 'reminder', NOW)])
+
+    scheduler.schedule('t1', 'reminder', NOW + timedelta(minutes=30))
+    assert scheduler.stats()['retrying'] == 0
+    assert scheduler._take_due(NOW + timedelta(minutes=10)) == []
+    assert scheduler._take_due(NOW + timedelta(minutes=30)) == [
+        ('t1', 'reminder', NOW + timedelta(minutes=30))
+    ]
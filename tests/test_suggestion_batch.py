@@ -0,0 +1,34 @@
+import pytest
+
+from conftest import load_module
+
+suggestion_app = load_module('suggestion_service', 'app.py', 'suggestion_app')
+
+
+@pytest.fixture
+def client():
+    return suggestion_app.app.test_client()
+
+
+@pytest.mark.parametrize('body, error', [
+    ([1], 'suggestions must be a list'),
+    ({'suggestions': {}}, 'suggestions must be a list'),
+    ({'suggestions': ['buy milk']}, 'Each suggestion needs a task_text string'),
+    ({'suggestions': [{'task_text': 7}]}, 'Each suggestion needs a task_text string'),
+    ({'suggestions': [{'task_text': 'buy milk', 'delta': 'two'}]}, 'delta must be a positive integer'),
+    ({'suggestions': [{'task_text': 'buy milk', 'delta': 0}]}, 'delta must be a positive integer')
+])
+def test_malformed_items_are_rejected(client, body, error):
+    response = client.post('/suggestions/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_texts_too_long_for_the_column_are_skipped(client):
+    response = client.post('/suggestions/batch', json={'suggestions': [
+        {'task_text': 'x' * (suggestion_app.MAX_SUGGESTION_LENGTH + 1)},
+        {'task_text': '   '}
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()['skipped'] == 1
+    assert response.get_json()['count'] == 0
@@ -0,0 +1,60 @@
+import random
+
+from conftest import load_module
+
+suggestion_index = load_module('suggestion_service', 'suggestion_index.py', 'suggestion_index')
+SuggestionIndex = suggestion_index.SuggestionIndex
+
+
+def like_query(rows, query, top_k):
+    """What the SQL the index replaces would return for rows."""
+    matches = [(text, frequency) for text, frequency in rows.items() if query.lower() in text.lower()]
+    matches.sort(key=lambda row: (-row[1], row[0].lower()))
+    return [{'task_text': text, 'frequency': frequency} for text, frequency in matches[:top_k]]
+
+
+def test_matches_substrings_by_frequency():
+    index = SuggestionIndex(top_k=2)
+    index.load([('Buy milk', 5), ('Milk the cow', 1), ('Call mom', 3), ('buy bread', 3)])
+    assert index.candidates('MILK') == [
+        {'task_text': 'Buy milk', 'frequency': 5},
+        {'task_text': 'Milk the cow', 'frequency': 1}
+    ]
+    assert [row['task_text'] for row in index.candidates('b')] == ['Buy milk', 'buy bread']
+    assert index.candidates('xyz') == []
+    assert len(index) == 4
+
+
+def test_increment_reorders_and_adds():
+    index = SuggestionIndex(top_k=2)
+    index.load([('Buy milk', 5), ('Buy bread', 3)])
+    index.increment('Buy bread', 3)
+    index.increment('Buy eggs')
+    assert index.candidates('buy') == [
+        {'task_text': 'Buy bread', 'frequency': 6},
+        {'task_text': 'Buy milk', 'frequency': 5}
+    ]
+    index.increment('Buy eggs', 0)
+    assert index.candidates('eggs') == [{'task_text': 'Buy eggs', 'frequency': 1}]
+
+
+def test_long_queries_use_the_trigram_fallback():
+    index = SuggestionIndex(max_depth=3)
+    index.load([('Renew passport', 2), ('Passport photos', 4)])
+    assert [row['task_text'] for row in index.candidates('passport')] == ['Passport photos', 'Renew passport']
+    assert index.candidates('passports') == []
+
+
+def test_agrees_with_like_query_under_increments():
+    rng = random.Random(7)
+    words = ['buy', 'milk', 'call', 'mom', 'pay', 'rent', 'walk', 'dog', 'email', 'boss']
+    rows = {}
+    index = SuggestionIndex(top_k=5, max_depth=4)
+    for _ in range(300):
+        text = ' '.join(rng.sample(words, rng.randint(1, 3)))
+        delta = rng.randint(1, 4)
+        rows[text] = rows.get(text, 0) + delta
+        index.increment(text, delta)
+
+    for query in ['b', 'bu', 'mil', 'o', 'al', 'ay r', 'email', 'dog walk', 'zzz']:
+        assert index.candidates(query) == like_query(rows, query, 5), query
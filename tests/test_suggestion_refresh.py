@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import load_module
+
+suggestion_app = load_module('suggestion_service', 'app.py', 'suggestion_app')
+
+
+class RacingConnection:
+    """Returns rows read before `during_read` commits and records its increments."""
+
+    def __init__(self, rows, during_read):
+        self.rows = rows
+        self.during_read = during_read
+
+    def cursor(self):
+        return self
+
+    def execute(self, query):
+        self.during_read()
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def test_increments_made_during_a_rebuild_survive_the_swap(monkeypatch):
+    state = suggestion_app.index_state
+    monkeypatch.setitem(state, 'index', None)
+    rows = [('buy milk', 5), ('call mom', 2)]
+    monkeypatch.setattr(suggestion_app, 'get_db_connection', lambda: RacingConnection(rows, lambda: None))
+    suggestion_app.load_suggestion_index()
+
+    # The refresh reads the table, then a write commits and is recorded before the swap
+    monkeypatch.setattr(suggestion_app, 'get_db_connection', lambda: RacingConnection(
+        rows, lambda: suggestion_app.record_increments({'call mom': 4, 'pay rent': 1})
+    ))
+    version = suggestion_app.index_versions.current('index')
+    suggestion_app.load_suggestion_index()
+
+    assert state['index'].candidates('m') == [
+        {'task_text': 'call mom', 'frequency': 6},
+        {'task_text': 'buy milk', 'frequency': 5}
+    ]
+    assert state['index'].candidates('rent') == [{'task_text': 'pay rent', 'frequency': 1}]
+    assert state['rebuilds'] == []
+    assert suggestion_app.index_versions.current('index') != version
+
+
+def test_a_failed_rebuild_stops_recording(monkeypatch):
+    def failing_connection():
+        raise RuntimeError('MySQL is down')
+
+    monkeypatch.setattr(suggestion_app, 'get_db_connection', failing_connection)
+    with pytest.raises(RuntimeError):
+        suggestion_app.load_suggestion_index()
+    assert suggestion_app.index_state['rebuilds'] == []
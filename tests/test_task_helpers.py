@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import load_module
+
+task_service = load_module('task_service', '__init__.py', 'task_service_helpers')
+
+
+@pytest.mark.parametrize('sort_value, task_id', [
+    (datetime(2025, 11, 14, 17, 0, 0), 'a1b2'),
+    (datetime(2025, 11, 14, 17, 0, 0, 123456), 'c3d4'),
+    (None, 'e5f6')
+])
+def test_cursor_round_trip(sort_value, task_id):
+    cursor = task_service.encode_cursor(sort_value, task_id)
+    assert task_service.decode_cursor(cursor) == (sort_value, task_id)
+
+
+def test_cursor_is_url_safe():
+    cursor = task_service.encode_cursor(datetime(2025, 1, 1), '>>>???' * 10)
+    assert not set(cursor) & set('+/')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    'é',
+    'bm90IGpzb24=',  # "not json"
+    'WzEsMiwzXQ==',  # [1,2,3]
+    'MTIz',  # 123
+    'WyJub3QgYSBkYXRlIiwgIngiXQ=='  # ["not a date", "x"]
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        task_service.decode_cursor(cursor)
+
+
+def test_parse_fields_always_includes_task_id():
+    assert task_service.parse_fields(None) is None
+    assert task_service.parse_fields('') is None
+    assert task_service.parse_fields('task_text, deadline,') == ['task_id', 'task_text', 'deadline']
+    assert task_service.parse_fields('deadline,task_id') == ['deadline', 'task_id']
+
+
+def test_parse_fields_rejects_unknown_columns():
+    with pytest.raises(ValueError, match='password'):
+        task_service.parse_fields('task_text,password')
+
+
+def test_parse_limit():
+    assert task_service.parse_limit(None) is None
+    assert task_service.parse_limit('20') == 20
+    assert task_service.parse_limit(10 ** 6) == task_service.MAX_PAGE_SIZE
+    for value in ('0', '-5', 'ten'):
+        with pytest.raises(ValueError):
+            task_service.parse_limit(value)
+
+
+def test_parse_task_ids_keeps_order_and_drops_repeats():
+    assert task_service.parse_task_ids({'task_ids': ['b', 'a', 'b', 3]}) == ['b', 'a', '3']
+    for data in (None, {}, {'task_ids': []}, {'task_ids': 'abc'},
+                 {'task_ids': ['x'] * (task_service.MAX_BATCH_SIZE + 1)}):
+        with pytest.raises(ValueError):
+            task_service.parse_task_ids(data)
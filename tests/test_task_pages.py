@@ -0,0 +1,62 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import load_module
+
+os.environ.setdefault('DB_POOL_MIN_SIZE', '0')
+os.environ.setdefault('REMINDER_SCHEDULER', 'false')
+task_app = load_module('task_service', 'app.py', 'task_app')
+
+START = datetime(2025, 11, 14, 9, 0, 0)
+
+
+class PageConnection:
+    """Answers every query with the same rows, as a LIMIT limit+1 read would."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def execute(self, query, params):
+        self.limit = params[-1] if 'LIMIT' in query else None
+
+    def fetchall(self):
+        rows = [dict(row) for row in self.rows]
+        return rows[:self.limit] if self.limit else rows
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    rows = [
+        {'task_id': f't{i}', 'task_text': f'Task {i}', 'deadline': None,
+         'sort_key': START + timedelta(minutes=i)}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(task_app, 'get_db_connection', lambda: PageConnection(rows))
+    return task_app.app.test_client()
+
+
+@pytest.mark.parametrize('path, items', [
+    ('/tasks/u1', lambda body: body),
+    ('/tasks/history/u1', lambda body: body),
+    ('/tasks?status=pending&user_id=u1', lambda body: body['tasks'])
+])
+def test_every_list_pages_through_the_header(client, path, items):
+    separator = '&' if '?' in path else '?'
+    response = client.get(f'{path}{separator}limit=2&fields=task_id,task_text')
+    assert response.status_code == 200
+    page = items(response.get_json())
+    assert [task['task_id'] for task in page] == ['t0', 't1']
+    assert 'next_cursor' not in response.get_json()
+    assert task_app.decode_cursor(response.headers['X-Next-Cursor']) == (START + timedelta(minutes=1), 't1')
+
+    last = client.get(f'{path}{separator}limit=5')
+    assert len(items(last.get_json())) == 3
+    assert 'X-Next-Cursor' not in last.headers
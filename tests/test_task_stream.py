@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from conftest import load_module
+
+# No MySQL here: open no connections up front and keep the scheduler thread off
+os.environ.setdefault('DB_POOL_MIN_SIZE', '0')
+os.environ.setdefault('REMINDER_SCHEDULER', 'false')
+task_app = load_module('task_service', 'app.py', 'task_app')
+
+
+class StreamCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.closed = False
+
+    def execute(self, query, params):
+        pass
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class StreamConnection:
+    def __init__(self, rows):
+        self.cursor_obj = StreamCursor(rows)
+        self.closes = 0
+
+    def cursor(self, dictionary=False):
+        return self.cursor_obj
+
+    def close(self):
+        self.closes += 1
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    conn = StreamConnection([{'task_id': 't1', 'task_text': 'Pay rent', 'deadline': None}])
+    monkeypatch.setattr(task_app, 'get_db_connection', lambda: conn)
+    return conn
+
+
+def test_connection_is_released_once_the_stream_ends(connection):
+    with task_app.app.app_context():
+        response = task_app.stream_tasks('SELECT', (), 'ndjson')
+        body = b''.join(response.iter_encoded())
+        response.close()
+    assert b'"t1"' in body
+    assert connection.cursor_obj.closed
+    assert connection.closes == 1
+
+
+def test_connection_is_released_when_the_response_is_never_read(connection):
+    with task_app.app.app_context():
+        response = task_app.stream_tasks('SELECT', (), 'json')
+        response.close()
+    assert connection.cursor_obj.closed
+    assert connection.closes == 1